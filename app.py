@@ -1,8 +1,10 @@
 # Este archivo es un punto de entrada para Gunicorn en Render
 # Importa la aplicación desde app_final.py
 
-from app_final import app
+from app_final import app, arrancar
 
-# Si este archivo se ejecuta directamente, inicia la aplicación
+# Si este archivo se ejecuta directamente, prepara la base, retoma las fotos pendientes e inicia
+# la aplicación (importarlo, como hace build.sh, no tiene efectos)
 if __name__ == '__main__':
+    arrancar()
     app.run(host='0.0.0.0', port=5000, debug=True)
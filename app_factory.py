@@ -3,6 +3,9 @@ from models import db, Usuario, Auto, EstadoAuto
 from werkzeug.security import generate_password_hash
 from config.config import config
 from utils.helpers import formato_precio, formato_numero
+from utils.imagenes import url_foto, srcset_foto
+from utils.procesamiento_fotos import cola_fotos
+from utils.estaticos import configurar_estaticos
 import os
 
 # Importar blueprints
@@ -25,6 +28,12 @@ def create_app(config_name='default'):
     # Inicializar la base de datos
     db.init_app(app)
     
+    # Procesamiento de fotos en segundo plano
+    cola_fotos.configurar(app, app.config['FOTOS_PENDIENTES_DIR'], hilos=app.config['FOTOS_HILOS'])
+    
+    # Archivos de static con huella en la URL, cache de un año y envío delegado opcional
+    configurar_estaticos(app)
+    
     # Registrar blueprints
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(autos_bp, url_prefix='/autos')
@@ -35,6 +44,8 @@ def create_app(config_name='default'):
     # Registrar filtros personalizados
     app.jinja_env.filters['formato_precio'] = formato_precio
     app.jinja_env.filters['number_format'] = formato_numero
+    app.jinja_env.globals['url_foto'] = url_foto
+    app.jinja_env.globals['srcset_foto'] = srcset_foto
     
     # Crear tablas y datos iniciales
     with app.app_context():
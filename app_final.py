@@ -1,10 +1,24 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from models import db, Auto, EstadoAuto, Usuario, Venta, EstadoPago, FotoAuto
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, stream_with_context
+from models import db, Auto, EstadoAuto, Usuario, Venta, EstadoPago, FotoAuto, VentaResumenMensual
+from utils.reportes import calcular_estadisticas, obtener_serie, METRICAS_SERIE, AGRUPACIONES_SERIE, MAX_MESES_SERIE, MONEDAS
+from utils.resumen_ventas import reconstruir_resumen
+from utils.migraciones import aplicar_migraciones
+from utils.helpers import rango_fechas, parsear_mes, periodo_desde_args, generar_url_compartir
+from utils.cache import cache_estadisticas, obtener_version
+from utils.paginacion import paginar, parametros_pagina
+from utils.busqueda import buscar_autos
+from utils.facetas import obtener_facetas
+from utils.cache_http import respuesta_condicional, cache_paginas
+from utils.similares import autos_similares, sellos_similares
+from utils.imagenes import archivos_foto, url_foto, srcset_foto
+from utils.procesamiento_fotos import cola_fotos
+from utils.estaticos import configurar_estaticos
+from utils.exportacion import consulta_exportacion, filas_exportacion, generar_csv_ventas, comprimir_gzip
+from config.config import Config
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 import os
-import uuid
 import hashlib
+import json
 from datetime import datetime
 from functools import wraps
 
@@ -153,10 +167,42 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app.config['UPLOAD_FOLDER'] = os.path.join(basedir, 'static', 'uploads')
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB máximo
+app.config['PAGINA_TAMANIO'] = Config.PAGINA_TAMANIO  # Autos por página en catálogo y stock
+
+# Cache HTTP de las páginas públicas del catálogo: se revalidan siempre con ETag (304 si no cambiaron).
+# Se puede cambiar la política por endpoint, p. ej. 'public, max-age=60' para aceptar un minuto de atraso
+app.config['CACHE_CONTROL'] = {
+    'autos': 'public, no-cache',
+    'api_autos': 'public, no-cache',
+    'detalle_auto': 'public, no-cache',
+}
+# URL pública del sitio, para completar las URL para compartir de autos viejos (ver migraciones)
+app.config['URL_PUBLICA'] = os.environ.get('URL_PUBLICA') or os.environ.get('RENDER_EXTERNAL_URL')
+
+# Cambia los ETag en cada despliegue (las plantillas pueden haber cambiado)
+app.config['VERSION_DESPLIEGUE'] = os.environ.get('RENDER_GIT_COMMIT', '')
+
+# Cache de páginas completas para visitantes anónimos: memoria por worker y, si se configura
+# un directorio, un segundo nivel en disco compartido entre los workers
+app.config['CACHE_PAGINAS_MAX_BYTES'] = int(os.environ.get('CACHE_PAGINAS_MAX_BYTES', 32 * 1024 * 1024))
+app.config['CACHE_PAGINAS_DIR'] = os.environ.get('CACHE_PAGINAS_DIR') or None
+cache_paginas.configurar(max_bytes=app.config['CACHE_PAGINAS_MAX_BYTES'], directorio=app.config['CACHE_PAGINAS_DIR'])
 
 # Asegurar que existan las carpetas de uploads
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'autos'), exist_ok=True)
 
+# Fotos subidas: se guardan en una carpeta de pendientes (fuera de static) y un grupo acotado
+# de hilos genera las variantes en segundo plano
+app.config['FOTOS_PENDIENTES_DIR'] = os.environ.get('FOTOS_PENDIENTES_DIR') or os.path.join(basedir, 'instance', 'fotos_pendientes')
+app.config['FOTOS_HILOS'] = int(os.environ.get('FOTOS_HILOS', 2))
+cola_fotos.configurar(app, app.config['FOTOS_PENDIENTES_DIR'], hilos=app.config['FOTOS_HILOS'])
+
+# Archivos de static con la huella en la URL y cache de un año. Detrás de nginx o Apache se puede
+# delegar el envío de los bytes: ENVIO_ARCHIVOS = 'x-accel' (con X_ACCEL_PREFIJO) o 'x-sendfile'
+app.config['ENVIO_ARCHIVOS'] = os.environ.get('ENVIO_ARCHIVOS') or None
+app.config['X_ACCEL_PREFIJO'] = os.environ.get('X_ACCEL_PREFIJO', '/_static/')
+configurar_estaticos(app)
+
 # Inicializar extensiones
 db.init_app(app)
 
@@ -173,6 +219,10 @@ def formato_precio(value, moneda='ARS'):
     except (ValueError, TypeError):
         return "$0" if moneda == 'ARS' else "US$0"
 
+# Fotos en varios tamaños (macro imagen_foto de fotos.html)
+app.add_template_global(url_foto)
+app.add_template_global(srcset_foto)
+
 # Decoradores para autenticación
 def login_required(view):
     @wraps(view)
@@ -406,62 +456,140 @@ def dashboard():
                            es_vendedor=es_vendedor)
 
 # Rutas para autos
+def consulta_catalogo(args):
+    """Autos disponibles con los filtros del catálogo"""
+    # Filtros
+    marca = args.get('marca', '')
+    modelo = args.get('modelo', '')
+    anio = args.get('anio', '')
+    precio_min = args.get('precio_min', '')
+    precio_max = args.get('precio_max', '')
+    moneda = args.get('moneda', 'ARS')
+    
+    # Consulta base - SIEMPRE mostrar solo autos disponibles, con las fotos principales en lote
+    query = Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE).options(db.selectinload(Auto.foto_principal))
+    
+    # Aplicar filtros si existen
+    if marca:
+        query = query.filter(Auto.marca.ilike(f'%{marca}%'))
+    if modelo:
+        query = query.filter(Auto.modelo.ilike(f'%{modelo}%'))
+    if anio and anio.isdigit():
+        query = query.filter(Auto.anio == int(anio))
+    if args.get('anio_min', '').isdigit():
+        query = query.filter(Auto.anio >= int(args['anio_min']))
+    if args.get('anio_max', '').isdigit():
+        query = query.filter(Auto.anio <= int(args['anio_max']))
+    
+    # Filtrar por moneda solo si se especifica explícitamente en la URL
+    if moneda in ['ARS', 'USD'] and 'moneda' in args:  # Solo filtrar si el parámetro moneda está presente en la URL
+        query = query.filter(Auto.moneda == moneda)
+    
+    # Filtrar por precio
+    if precio_min and precio_min.isdigit():
+        query = query.filter(Auto.precio >= float(precio_min))
+    if precio_max and precio_max.isdigit():
+        query = query.filter(Auto.precio <= float(precio_max))
+    # Límite exclusivo de los tramos de precio de las facetas: cuenta igual que calcular_facetas
+    if args.get('precio_hasta', '').isdigit():
+        query = query.filter(Auto.precio < float(args['precio_hasta']))
+    
+    return query
+
+def pagina_catalogo(args):
+    """Página del catálogo y el cursor de la siguiente: más nuevos primero, o más relevantes si hay búsqueda (q)"""
+    cursor, por_pagina = parametros_pagina(args)
+    query, relevancia = buscar_autos(consulta_catalogo(args), args.get('q', ''))
+    orden = [relevancia, Auto.id] if relevancia is not None else [Auto.id]
+    return paginar(query, orden, cursor, por_pagina)
+
+def url_pagina_siguiente(endpoint, siguiente):
+    """URL de la página siguiente conservando los filtros actuales"""
+    if not siguiente:
+        return None
+    args = request.args.to_dict()
+    args['cursor'] = siguiente
+    return url_for(endpoint, **args)
+
+@app.template_global()
+def url_filtro(endpoint, **cambios):
+    """URL del listado con los filtros actuales cambiados (None quita el filtro), desde la primera página"""
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    for clave, valor in cambios.items():
+        if valor is None:
+            args.pop(clave, None)
+        else:
+            args[clave] = valor
+    return url_for(endpoint, **args)
+
 @app.route('/autos')
+@respuesta_condicional(['catalogo'])
 def autos():
     try:
-        # Filtros
-        marca = request.args.get('marca', '')
-        modelo = request.args.get('modelo', '')
-        anio = request.args.get('anio', '')
-        precio_min = request.args.get('precio_min', '')
-        precio_max = request.args.get('precio_max', '')
-        moneda = request.args.get('moneda', 'ARS')
-        
-        # Consulta base - SIEMPRE mostrar solo autos disponibles
-        query = Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE)
-        
-        # Aplicar filtros si existen
-        if marca:
-            query = query.filter(Auto.marca.ilike(f'%{marca}%'))
-        if modelo:
-            query = query.filter(Auto.modelo.ilike(f'%{modelo}%'))
-        if anio and anio.isdigit():
-            query = query.filter(Auto.anio == int(anio))
-        
-        # Filtrar por moneda solo si se especifica explícitamente en la URL
-        if moneda in ['ARS', 'USD'] and 'moneda' in request.args:  # Solo filtrar si el parámetro moneda está presente en la URL
-            query = query.filter(Auto.moneda == moneda)
-        
-        # Filtrar por precio
-        if precio_min and precio_min.isdigit():
-            query = query.filter(Auto.precio >= float(precio_min))
-        if precio_max and precio_max.isdigit():
-            query = query.filter(Auto.precio <= float(precio_max))
-        
-        # Obtener resultados
-        autos = query.order_by(Auto.id.desc()).all()
-    
-        return render_template('autos.html', autos=autos, is_logged_in='user_id' in session)
+        autos, siguiente = pagina_catalogo(request.args)
+        # Cantidades por marca, año, precio y estado para los filtros actuales (cacheadas)
+        consulta, _ = buscar_autos(consulta_catalogo(request.args), request.args.get('q', ''))
+        facetas = obtener_facetas('catalogo', request.args, consulta)
+    except ValueError:
+        return redirect(url_for('autos'))
     except Exception as e:
         app.logger.error(f"Error en la ruta /autos: {e}")
         # Devolver una página de error genérica
         return render_template('error.html', error=str(e)), 500
+    
+    return render_template('autos.html', autos=autos, is_logged_in='user_id' in session, facetas=facetas,
+                           siguiente=url_pagina_siguiente('autos', siguiente),
+                           siguiente_json=url_pagina_siguiente('api_autos', siguiente))
+
+@app.route('/api/autos')
+@respuesta_condicional(['catalogo'])
+def api_autos():
+    # Variante JSON del catálogo para el scroll infinito: datos, tarjetas ya renderizadas y cursor
+    try:
+        autos, siguiente = pagina_catalogo(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'autos': [{
+            'id': auto.id,
+            'marca': auto.marca,
+            'modelo': auto.modelo,
+            'anio': auto.anio,
+            'precio': auto.precio,
+            'moneda': auto.moneda,
+            # Mientras la foto se procesa todavía no está en static: null (la tarjeta muestra la espera)
+            'foto': url_foto(auto.foto_principal) if auto.foto_principal and auto.foto_principal.lista else None,
+            'url': url_for('detalle_auto', auto_id=auto.id)
+        } for auto in autos],
+        'html': render_template('autos_tarjetas.html', autos=autos, is_logged_in='user_id' in session),
+        'siguiente': url_pagina_siguiente('api_autos', siguiente)
+    })
 
 @app.route('/auto/<int:auto_id>')
+# La franja de similares muestra otros autos: la página depende también de sus versiones
+@respuesta_condicional(sellos_similares)
 def detalle_auto(auto_id):
+    # Solo lectura: la URL para compartir y las rutas de las fotos se completan al guardar
+    # (y la migración migrar_datos_compartir corrige las filas anteriores)
     auto = Auto.query.get_or_404(auto_id)
-    
-    # Generar URL para compartir si no existe
-    if not auto.url_compartir:
-        auto.url_compartir = f"{request.host_url}auto/{auto.id}"
-        db.session.commit()
-    
-    # Normalizar las rutas de las fotos para URLs
-    for foto in auto.fotos:
-        if foto.ruta_archivo and '\\' in foto.ruta_archivo:
-            foto.ruta_archivo = foto.ruta_archivo.replace('\\', '/')
-    
-    return render_template('detalle_auto.html', auto=auto)
+    return render_template('detalle_auto.html', auto=auto, similares=autos_similares(auto))
+
+def guardar_fotos_subidas(auto):
+    """Guarda las fotos del formulario en la carpeta de pendientes y agrega sus FotoAuto al auto.
+
+    Devuelve las fotos nuevas: hay que encolarlas (cola_fotos.encolar) después del commit.
+    """
+    nuevas = []
+    for archivo in request.files.getlist('fotos'):
+        if archivo and archivo.filename:
+            # La ruta la fija el almacén según el contenido (uploads/fotos/<hash>)
+            foto = FotoAuto()
+            cola_fotos.guardar_subida(archivo, foto)
+            auto.fotos.append(foto)
+            nuevas.append(foto)
+    return nuevas
 
 @app.route('/auto/<int:auto_id>/editar', methods=['GET', 'POST'])
 @login_required
@@ -488,41 +616,30 @@ def editar_auto(auto_id):
         if estado and estado in [e.name for e in EstadoAuto]:
             auto.estado = EstadoAuto[estado]
         
-        db.session.commit()
+        # Autos cargados antes de que se generara la URL para compartir
+        if not auto.url_compartir:
+            auto.url_compartir = generar_url_compartir(request, auto.id)
         
-        # Procesar las fotos nuevas
-        if 'fotos' in request.files:
-            fotos = request.files.getlist('fotos')
-            for foto in fotos:
-                if foto and foto.filename:
-                    # Crear directorio si no existe
-                    directorio_fotos = os.path.join(app.static_folder, 'uploads', 'autos', str(auto.id))
-                    if not os.path.exists(directorio_fotos):
-                        os.makedirs(directorio_fotos)
-                    
-                    # Guardar la foto
-                    filename = secure_filename(foto.filename)
-                    nombre_archivo = f"{uuid.uuid4()}_{filename}"
-                    ruta_relativa = os.path.join('uploads', 'autos', str(auto.id), nombre_archivo)
-                    ruta_completa = os.path.join(app.static_folder, ruta_relativa)
-                    foto.save(ruta_completa)
-                    
-                    # Normalizar la ruta para URLs (usar forward slashes)
-                    ruta_normalizada = ruta_relativa.replace('\\', '/')
-                    
-                    # Crear registro en la base de datos
-                    foto_auto = FotoAuto(ruta_archivo=ruta_normalizada, auto_id=auto.id)
-                    db.session.add(foto_auto)
+        # Fotos nuevas: se guardan como pendientes y se procesan en segundo plano
+        nuevas = guardar_fotos_subidas(auto)
         
+        # Mantener la foto principal (la primera si el auto no tenía)
+        db.session.flush()
+        auto.actualizar_foto_principal()
         db.session.commit()
+        cola_fotos.encolar([foto.id for foto in nuevas])
         
         flash('Auto actualizado correctamente', 'success')
+        if nuevas:
+            # La página de edición muestra el avance de las fotos
+            return redirect(url_for('editar_auto', auto_id=auto.id))
         return redirect(url_for('detalle_auto', auto_id=auto.id))
     
     # Preparar datos para la vista
     estados = [e.name for e in EstadoAuto]
     
-    return render_template('editar_auto.html', auto=auto, estados=estados)
+    return render_template('editar_auto.html', auto=auto, estados=estados,
+                           url_estado=url_for('estado_fotos', auto_id=auto.id))
 
 @app.route('/auto/<int:auto_id>/fotos/eliminar/<int:foto_id>', methods=['POST'])
 @login_required
@@ -534,19 +651,41 @@ def eliminar_foto(auto_id, foto_id):
         flash('La foto no pertenece a este auto', 'danger')
         return redirect(url_for('editar_auto', auto_id=auto_id))
     
-    # Eliminar el archivo físico si existe
-    if foto.ruta_archivo:
-        ruta_completa = os.path.join(app.static_folder, foto.ruta_archivo)
-        if os.path.exists(ruta_completa):
-            os.remove(ruta_completa)
+    # Fotos anteriores al almacén por hash: el archivo y sus variantes son solo de esta foto
+    if foto.ruta_archivo and not foto.archivo_hash:
+        for ruta in archivos_foto(foto):
+            ruta_completa = os.path.join(app.static_folder, ruta)
+            if os.path.exists(ruta_completa):
+                os.remove(ruta_completa)
     
-    # Eliminar el registro de la base de datos
-    db.session.delete(foto)
+    # Eliminar el registro de la base de datos (delete-orphan) y elegir otra principal si hacía falta
+    hash_archivo = foto.archivo_hash
+    auto = foto.auto
+    auto.fotos.remove(foto)
+    auto.actualizar_foto_principal()
     db.session.commit()
     
+    # El contenido compartido se borra solo si era la última referencia
+    cola_fotos.liberar([hash_archivo])
+    
     flash('Foto eliminada correctamente', 'success')
     return redirect(url_for('editar_auto', auto_id=auto_id))
 
+@app.route('/auto/<int:auto_id>/fotos/estado')
+@login_required
+def estado_fotos(auto_id):
+    # La página de edición lo consulta mientras haya fotos procesándose
+    auto = Auto.query.get_or_404(auto_id)
+    fotos = sorted(auto.fotos, key=lambda f: (f.orden or 0, f.id))
+    return jsonify({
+        'fotos': [{
+            'id': foto.id,
+            'estado': foto.estado.name,
+            'url': url_foto(foto, 'thumb') if foto.lista else None,
+        } for foto in fotos],
+        'pendientes': sum(1 for foto in fotos if not foto.lista),
+    })
+
 @app.route('/autos/eliminar/<int:auto_id>', methods=['POST'])
 @login_required
 def eliminar_auto(auto_id):
@@ -557,12 +696,16 @@ def eliminar_auto(auto_id):
         flash('No se puede eliminar este auto porque tiene ventas asociadas.', 'danger')
         return redirect(url_for('autos'))
     
-    # Eliminar fotos físicas
+    # Eliminar fotos físicas anteriores al almacén por hash (con sus variantes)
+    hashes = [foto.archivo_hash for foto in auto.fotos]
     for foto in auto.fotos:
+        if foto.archivo_hash:
+            continue
         try:
-            ruta_completa = os.path.join(app.static_folder, foto.ruta_archivo)
-            if os.path.exists(ruta_completa):
-                os.remove(ruta_completa)
+            for ruta in archivos_foto(foto):
+                ruta_completa = os.path.join(app.static_folder, ruta)
+                if os.path.exists(ruta_completa):
+                    os.remove(ruta_completa)
         except Exception as e:
             # Registrar error pero continuar
             app.logger.error(f"Error al eliminar archivo: {e}")
@@ -570,6 +713,9 @@ def eliminar_auto(auto_id):
     # Eliminar auto (las fotos se eliminarán en cascada)
     db.session.delete(auto)
     db.session.commit()
+    
+    # El contenido compartido se borra solo si no lo usa otro auto
+    cola_fotos.liberar(hashes)
     flash('Auto eliminado exitosamente.', 'success')
     return redirect(url_for('autos'))
 
@@ -616,88 +762,77 @@ def nuevo_auto():
             estado=EstadoAuto.DISPONIBLE
         )
         
+        # Un solo commit: el id sale del flush y las fotos se procesan después de confirmar
         db.session.add(nuevo_auto)
-        db.session.commit()
+        db.session.flush()
         
         # Generar URL para compartir
-        nuevo_auto.url_compartir = f"{request.host_url}auto/{nuevo_auto.id}"
-        db.session.commit()
+        nuevo_auto.url_compartir = generar_url_compartir(request, nuevo_auto.id)
         
-        # Procesar las fotos
-        if 'fotos' in request.files:
-            fotos = request.files.getlist('fotos')
-            for foto in fotos:
-                if foto and foto.filename:
-                    # Crear directorio si no existe
-                    directorio_fotos = os.path.join(app.static_folder, 'uploads', 'autos', str(nuevo_auto.id))
-                    if not os.path.exists(directorio_fotos):
-                        os.makedirs(directorio_fotos)
-                    
-                    # Guardar la foto
-                    filename = secure_filename(foto.filename)
-                    nombre_archivo = f"{uuid.uuid4()}_{filename}"
-                    ruta_relativa = os.path.join('uploads', 'autos', str(nuevo_auto.id), nombre_archivo)
-                    ruta_completa = os.path.join(app.static_folder, ruta_relativa)
-                    foto.save(ruta_completa)
-                    
-                    # Normalizar la ruta para URLs (usar forward slashes)
-                    ruta_normalizada = ruta_relativa.replace('\\', '/')
-                    
-                    # Crear registro en la base de datos
-                    foto_auto = FotoAuto(ruta_archivo=ruta_normalizada, auto_id=nuevo_auto.id)
-                    db.session.add(foto_auto)
+        # Las fotos se guardan como pendientes y se procesan en segundo plano
+        nuevas = guardar_fotos_subidas(nuevo_auto)
         
+        # La primera foto queda como principal
+        db.session.flush()
+        nuevo_auto.actualizar_foto_principal()
         db.session.commit()
+        cola_fotos.encolar([foto.id for foto in nuevas])
         
         flash('Auto agregado correctamente', 'success')
+        if nuevas:
+            # La página de edición muestra el avance de las fotos
+            return redirect(url_for('editar_auto', auto_id=nuevo_auto.id))
         return redirect(url_for('autos'))
     
     return render_template('nuevo_auto.html')
 
 # Rutas para ventas
-@app.route('/ventas')
-@admin_required
-def ventas():
-    # Obtener parámetros de filtro
-    mes = request.args.get('mes', type=int)
-    anio = request.args.get('anio', type=int, default=datetime.now().year)
-    estado = request.args.get('estado')
-    moneda = request.args.get('moneda')
-    
-    # Consulta base
-    query = Venta.query
+def filtros_ventas(args):
+    """Filtros de mes, año, estado y moneda del listado de ventas (también los usa la exportación).
+
+    Devuelve (filtros, anio, mes) con el período ya validado, para mostrarlo seleccionado.
+    Lanza ValueError si el año está fuera de rango.
+    """
+    mes = args.get('mes', type=int)
+    anio = args.get('anio', type=int, default=datetime.now().year)
+    estado = args.get('estado')
+    moneda = args.get('moneda')
+    filtros = []
     
     # Aplicar filtros solo si se especifican
-    if mes is not None:
-        # Filtrar por mes considerando ambas fechas posibles
-        query = query.filter(
-            db.or_(
-                db.extract('month', Venta.fecha_venta) == mes,
-                db.extract('month', Venta.fecha_seña) == mes
-            )
-        )
+    if mes is not None and not 1 <= mes <= 12:
+        mes = None
     
-    if anio is not None:
-        # Filtrar por año considerando ambas fechas posibles
-        query = query.filter(
-            db.or_(
-                db.extract('year', Venta.fecha_venta) == anio,
-                db.extract('year', Venta.fecha_seña) == anio
-            )
-        )
+    # Intervalo semiabierto sobre la fecha efectiva (fecha_venta o fecha_seña), usa el índice
+    inicio, fin = rango_fechas(anio, mes)
+    filtros += [Venta.fecha_efectiva >= inicio, Venta.fecha_efectiva < fin]
     
     if estado:
         # Convertir string a enum
         try:
-            estado_enum = EstadoPago[estado]
-            query = query.filter(Venta.estado_pago == estado_enum)
+            filtros.append(Venta.estado_pago == EstadoPago[estado])
         except (KeyError, ValueError):
             # Si el estado no es válido, ignorar este filtro
             pass
     
     # Filtrar por moneda si se especifica
     if moneda:
-        query = query.filter(Venta.moneda == moneda)
+        filtros.append(Venta.moneda == moneda)
+    
+    return filtros, anio, mes
+
+@app.route('/ventas')
+@admin_required
+def ventas():
+    # Consulta base con los filtros recibidos
+    try:
+        filtros, anio, mes = filtros_ventas(request.args)
+    except ValueError:
+        flash('Año inválido, se muestran las ventas del año actual', 'warning')
+        return redirect(url_for('ventas'))
+    query = Venta.query.filter(*filtros)
+    estado = request.args.get('estado')
+    moneda = request.args.get('moneda')
     
     # Obtener ventas con manejo de errores
     try:
@@ -712,36 +847,11 @@ def ventas():
             (5, 'Mayo'), (6, 'Junio'), (7, 'Julio'), (8, 'Agosto'),
             (9, 'Septiembre'), (10, 'Octubre'), (11, 'Noviembre'), (12, 'Diciembre')]
     
-    # Obtener años con ventas considerando ambas fechas posibles
+    # Obtener años con ventas desde el resumen mensual (por fecha efectiva)
     try:
-        # Consulta para años con fecha_venta
-        anios_venta_query = db.session.query(db.extract('year', Venta.fecha_venta).distinct())
-        anios_venta_query = anios_venta_query.filter(Venta.fecha_venta != None)
-        anios_venta_query = anios_venta_query.order_by(db.extract('year', Venta.fecha_venta).desc())
-        anios_venta = []
-        for a in anios_venta_query.all():
-            if a[0] is not None:
-                try:
-                    anios_venta.append(int(a[0]))
-                except (ValueError, TypeError):
-                    # Si no se puede convertir a int, intentar obtener el año de otra manera
-                    app.logger.warning(f"No se pudo convertir {a[0]} a entero, tipo: {type(a[0])}")
-        
-        # Consulta para años con fecha_seña
-        anios_seña_query = db.session.query(db.extract('year', Venta.fecha_seña).distinct())
-        anios_seña_query = anios_seña_query.filter(Venta.fecha_seña != None)
-        anios_seña_query = anios_seña_query.order_by(db.extract('year', Venta.fecha_seña).desc())
-        anios_seña = []
-        for a in anios_seña_query.all():
-            if a[0] is not None:
-                try:
-                    anios_seña.append(int(a[0]))
-                except (ValueError, TypeError):
-                    # Si no se puede convertir a int, intentar obtener el año de otra manera
-                    app.logger.warning(f"No se pudo convertir {a[0]} a entero, tipo: {type(a[0])}")
-        
-        # Combinar y eliminar duplicados
-        anios = sorted(set(anios_venta + anios_seña), reverse=True)
+        anios_query = db.session.query(VentaResumenMensual.anio.distinct())
+        anios_query = anios_query.order_by(VentaResumenMensual.anio.desc())
+        anios = [a[0] for a in anios_query.all()]
     except Exception as e:
         app.logger.error(f"Error al obtener años con ventas: {e}")
         anios = []
@@ -896,11 +1006,28 @@ def generar_recibo(venta_id):
     return redirect(url_for('ventas'))
 
 @app.route('/ventas/exportar')
-@login_required
+@admin_required
 def exportar_ventas():
-    # Aquí iría la lógica para exportar a Excel
-    flash('Funcionalidad de exportación en desarrollo', 'info')
-    return redirect(url_for('ventas'))
+    # Mismos filtros que el listado; las filas se leen por lotes y se escriben a medida que llegan
+    try:
+        filtros, _, _ = filtros_ventas(request.args)
+    except ValueError:
+        flash('Año inválido para la exportación', 'warning')
+        return redirect(url_for('ventas'))
+    consulta = consulta_exportacion(*filtros)
+    cuerpo = generar_csv_ventas(filas_exportacion(consulta))
+    
+    comprimir = 'gzip' in request.accept_encodings
+    if comprimir:
+        cuerpo = comprimir_gzip(cuerpo)
+    
+    # stream_with_context mantiene la sesión de la base abierta mientras se genera la respuesta
+    respuesta = app.response_class(stream_with_context(cuerpo), mimetype='text/csv')
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=ventas_{datetime.now():%Y%m%d_%H%M}.csv'
+    respuesta.vary.add('Accept-Encoding')
+    if comprimir:
+        respuesta.headers['Content-Encoding'] = 'gzip'
+    return respuesta
 
 # Ruta para usuarios
 @app.route('/usuarios')
@@ -1065,347 +1192,115 @@ def estadisticas():
     try:
         # Obtener estadísticas de ventas por mes para el año actual
         año_actual = datetime.now().year
-        
-        # Ventas por mes
-        ventas_por_mes = []
-        for mes in range(1, 13):
-            # Contar ventas para este mes (considerando tanto fecha_venta como fecha_seña)
-            count = Venta.query.filter(
-                db.or_(
-                    db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                           db.extract('month', Venta.fecha_venta) == mes),
-                    db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                           db.extract('month', Venta.fecha_seña) == mes,
-                           Venta.fecha_venta == None)
-                )
-            ).count()
-            
-            ventas_por_mes.append(count)
-        
-        # Ventas por vendedor con detalle por moneda
-        vendedores = Usuario.query.filter(Usuario.rol.in_(['admin', 'vendedor'])).all()
-        ventas_por_vendedor = []
-        
-        for vendedor in vendedores:
-            # Total de ventas
-            count = Venta.query.filter_by(vendedor_id=vendedor.id).count()
-            if count > 0:  # Solo incluir vendedores con ventas
-                # Ventas por moneda
-                count_ars = Venta.query.filter_by(vendedor_id=vendedor.id, moneda='ARS').count()
-                count_usd = Venta.query.filter_by(vendedor_id=vendedor.id, moneda='USD').count()
-                
-                # Montos totales por moneda
-                monto_ars = db.session.query(db.func.sum(Venta.precio_venta))\
-                            .filter_by(vendedor_id=vendedor.id, moneda='ARS').scalar() or 0
-                monto_usd = db.session.query(db.func.sum(Venta.precio_venta))\
-                            .filter_by(vendedor_id=vendedor.id, moneda='USD').scalar() or 0
-                
-                ventas_por_vendedor.append({
-                    'nombre': f"{vendedor.nombre} {vendedor.apellido}",
-                    'ventas': count,
-                    'ventas_ars': count_ars,
-                    'ventas_usd': count_usd,
-                    'monto_ars': monto_ars,
-                    'monto_usd': monto_usd
-                })
-        
-        # Ordenar por cantidad de ventas (descendente)
-        ventas_por_vendedor = sorted(ventas_por_vendedor, key=lambda x: x['ventas'], reverse=True)
-        
-        # Marcas más vendidas
-        try:
-            marcas = db.session.query(
-                Auto.marca, 
-                db.func.count(Venta.id).label('count')
-            ).join(Venta, Auto.id == Venta.auto_id).group_by(Auto.marca).order_by(db.desc('count')).limit(5).all()
-            
-            marcas_vendidas = [{'marca': marca, 'count': count} for marca, count in marcas]
-        except Exception as e:
-            app.logger.error(f"Error al obtener marcas vendidas: {e}")
-            marcas_vendidas = []
-        
-        # Ingresos totales por moneda (todas las ventas, no solo las pagadas)
-        ingresos_ars = db.session.query(db.func.sum(Venta.precio_venta))\
-                      .filter(Venta.moneda == 'ARS').scalar() or 0
-        ingresos_usd = db.session.query(db.func.sum(Venta.precio_venta))\
-                      .filter(Venta.moneda == 'USD').scalar() or 0
-        
-        # Calcular costos por moneda (filtrar por la moneda de la venta, no del auto)
-        costo_ars = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                    .join(Venta, Venta.auto_id == Auto.id)\
-                    .filter(Venta.moneda == 'ARS').scalar() or 0
-        costo_usd = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                    .join(Venta, Venta.auto_id == Auto.id)\
-                    .filter(Venta.moneda == 'USD').scalar() or 0
-        
-        # Calcular ganancias por moneda
-        ganancia_ars = ingresos_ars - costo_ars
-        ganancia_usd = ingresos_usd - costo_usd
-        
-        # Totales (para compatibilidad con código existente)
-        ingresos_totales = ingresos_ars + ingresos_usd  # Suma simple para mostrar un total general
-        costo_total = costo_ars + costo_usd
-        ganancia_total = ganancia_ars + ganancia_usd
-        
-        # Ingresos y ganancias por mes (separados por moneda)
-        ingresos_por_mes_ars = []
-        ingresos_por_mes_usd = []
-        ganancias_por_mes_ars = []
-        ganancias_por_mes_usd = []
-        ventas_por_mes_ars = []
-        ventas_por_mes_usd = []
-        
-        for mes in range(1, 13):
-            # Contar ventas para este mes por moneda (considerando tanto fecha_venta como fecha_seña)
-            count_ars = Venta.query.filter(
-                db.or_(
-                    db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                           db.extract('month', Venta.fecha_venta) == mes),
-                    db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                           db.extract('month', Venta.fecha_seña) == mes,
-                           Venta.fecha_venta == None)
-                ),
-                Venta.moneda == 'ARS'
-            ).count()
-            
-            count_usd = Venta.query.filter(
-                db.or_(
-                    db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                           db.extract('month', Venta.fecha_venta) == mes),
-                    db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                           db.extract('month', Venta.fecha_seña) == mes,
-                           Venta.fecha_venta == None)
-                ),
-                Venta.moneda == 'USD'
-            ).count()
-            
-            # Sumar ingresos para este mes en ARS (considerando tanto fecha_venta como fecha_seña)
-            ingresos_mes_ars = db.session.query(db.func.sum(Venta.precio_venta)).filter(
-                db.or_(
-                    db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                           db.extract('month', Venta.fecha_venta) == mes),
-                    db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                           db.extract('month', Venta.fecha_seña) == mes,
-                           Venta.fecha_venta == None)
-                ),
-                Venta.moneda == 'ARS'
-            ).scalar() or 0
-            
-            # Sumar ingresos para este mes en USD (considerando tanto fecha_venta como fecha_seña)
-            ingresos_mes_usd = db.session.query(db.func.sum(Venta.precio_venta)).filter(
-                db.or_(
-                    db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                           db.extract('month', Venta.fecha_venta) == mes),
-                    db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                           db.extract('month', Venta.fecha_seña) == mes,
-                           Venta.fecha_venta == None)
-                ),
-                Venta.moneda == 'USD'
-            ).scalar() or 0
-            
-            # Sumar costos para este mes en ARS (considerando tanto fecha_venta como fecha_seña)
-            costos_mes_ars = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                             .join(Venta, Venta.auto_id == Auto.id)\
-                             .filter(
-                                 db.or_(
-                                     db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                                            db.extract('month', Venta.fecha_venta) == mes),
-                                     db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                                            db.extract('month', Venta.fecha_seña) == mes,
-                                            Venta.fecha_venta == None)
-                                 ),
-                                 Venta.moneda == 'ARS'
-                             ).scalar() or 0
-            
-            # Sumar costos para este mes en USD (considerando tanto fecha_venta como fecha_seña)
-            costos_mes_usd = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                             .join(Venta, Venta.auto_id == Auto.id)\
-                             .filter(
-                                 db.or_(
-                                     db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                                            db.extract('month', Venta.fecha_venta) == mes),
-                                     db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                                            db.extract('month', Venta.fecha_seña) == mes,
-                                            Venta.fecha_venta == None)
-                                 ),
-                                 Venta.moneda == 'USD'
-                             ).scalar() or 0
-            
-            # Calcular ganancias para este mes por moneda
-            ganancia_mes_ars = ingresos_mes_ars - costos_mes_ars
-            ganancia_mes_usd = ingresos_mes_usd - costos_mes_usd
-            
-            # Guardar datos por moneda
-            ventas_por_mes_ars.append(count_ars)
-            ventas_por_mes_usd.append(count_usd)
-            ingresos_por_mes_ars.append(ingresos_mes_ars)
-            ingresos_por_mes_usd.append(ingresos_mes_usd)
-            ganancias_por_mes_ars.append(ganancia_mes_ars)
-            ganancias_por_mes_usd.append(ganancia_mes_usd)
-        
-        # Para compatibilidad con código existente
-        ingresos_por_mes = [ingresos_por_mes_ars[i] + ingresos_por_mes_usd[i] for i in range(12)]
-        ganancias_por_mes = [ganancias_por_mes_ars[i] + ganancias_por_mes_usd[i] for i in range(12)]
-        
-        # Contar el total de ventas
-        total_ventas = Venta.query.count()
-        
-        # Calcular estadísticas del mes actual
         mes_actual = datetime.now().month
         
-        # Contar ventas del mes actual por moneda
-        ventas_mes_actual = Venta.query.filter(
-            db.or_(
-                db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                       db.extract('month', Venta.fecha_venta) == mes_actual),
-                db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                       db.extract('month', Venta.fecha_seña) == mes_actual,
-                       Venta.fecha_venta == None)
-            )
-        ).count()
-        
-        # Ventas del mes actual en ARS
-        ventas_mes_actual_ars = Venta.query.filter(
-            db.or_(
-                db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                       db.extract('month', Venta.fecha_venta) == mes_actual),
-                db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                       db.extract('month', Venta.fecha_seña) == mes_actual,
-                       Venta.fecha_venta == None)
-            ),
-            Venta.moneda == 'ARS'
-        ).count()
-        
-        # Ventas del mes actual en USD
-        ventas_mes_actual_usd = Venta.query.filter(
-            db.or_(
-                db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                       db.extract('month', Venta.fecha_venta) == mes_actual),
-                db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                       db.extract('month', Venta.fecha_seña) == mes_actual,
-                       Venta.fecha_venta == None)
-            ),
-            Venta.moneda == 'USD'
-        ).count()
-        
-        # Ingresos del mes actual en ARS
-        ingresos_mes_actual_ars = db.session.query(db.func.sum(Venta.precio_venta)).filter(
-            db.or_(
-                db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                       db.extract('month', Venta.fecha_venta) == mes_actual),
-                db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                       db.extract('month', Venta.fecha_seña) == mes_actual,
-                       Venta.fecha_venta == None)
-            ),
-            Venta.moneda == 'ARS'
-        ).scalar() or 0
-        
-        # Ingresos del mes actual en USD
-        ingresos_mes_actual_usd = db.session.query(db.func.sum(Venta.precio_venta)).filter(
-            db.or_(
-                db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                       db.extract('month', Venta.fecha_venta) == mes_actual),
-                db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                       db.extract('month', Venta.fecha_seña) == mes_actual,
-                       Venta.fecha_venta == None)
-            ),
-            Venta.moneda == 'USD'
-        ).scalar() or 0
-        
-        # Costos del mes actual en ARS
-        costos_mes_actual_ars = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                                .join(Venta, Venta.auto_id == Auto.id)\
-                                .filter(
-                                    db.or_(
-                                        db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                                               db.extract('month', Venta.fecha_venta) == mes_actual),
-                                        db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                                               db.extract('month', Venta.fecha_seña) == mes_actual,
-                                               Venta.fecha_venta == None)
-                                    ),
-                                    Venta.moneda == 'ARS'
-                                ).scalar() or 0
-        
-        # Costos del mes actual en USD
-        costos_mes_actual_usd = db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
-                                .join(Venta, Venta.auto_id == Auto.id)\
-                                .filter(
-                                    db.or_(
-                                        db.and_(db.extract('year', Venta.fecha_venta) == año_actual,
-                                               db.extract('month', Venta.fecha_venta) == mes_actual),
-                                        db.and_(db.extract('year', Venta.fecha_seña) == año_actual,
-                                               db.extract('month', Venta.fecha_seña) == mes_actual,
-                                               Venta.fecha_venta == None)
-                                    ),
-                                    Venta.moneda == 'USD'
-                                ).scalar() or 0
+        # Período del ranking de vendedores (por defecto todo el historial)
+        try:
+            periodo, inicio, fin = periodo_desde_args(request.args, periodo_defecto='total')
+        except ValueError:
+            flash('Período inválido, se muestra el historial completo', 'warning')
+            periodo, inicio, fin = 'total', None, None
         
-        # Ganancias del mes actual
-        ganancia_mes_actual_ars = ingresos_mes_actual_ars - costos_mes_actual_ars
-        ganancia_mes_actual_usd = ingresos_mes_actual_usd - costos_mes_actual_usd
+        # Todas las series salen de unas pocas consultas agrupadas, cacheadas por versión de datos
+        contexto = cache_estadisticas.obtener(
+            ('estadisticas', año_actual, mes_actual, inicio, fin),
+            lambda: calcular_estadisticas(año_actual, mes_actual, periodo_vendedores=(inicio, fin))
+        )
         
-        return render_template('estadisticas.html',
-                               ventas_por_mes=ventas_por_mes,
-                               ventas_por_vendedor=ventas_por_vendedor,
-                               marcas_vendidas=marcas_vendidas,
-                               ingresos_totales=ingresos_totales,
-                               ingresos_por_mes=ingresos_por_mes,
-                               ganancias_por_mes=ganancias_por_mes,
-                               año_actual=año_actual,
-                               total_ventas=total_ventas,
-                               costo_total=costo_total,
-                               ganancia_total=ganancia_total,
-                               # Variables por moneda
-                               ingresos_ars=ingresos_ars,
-                               ingresos_usd=ingresos_usd,
-                               costo_ars=costo_ars,
-                               costo_usd=costo_usd,
-                               ganancia_ars=ganancia_ars,
-                               ganancia_usd=ganancia_usd,
-                               ingresos_por_mes_ars=ingresos_por_mes_ars,
-                               ingresos_por_mes_usd=ingresos_por_mes_usd,
-                               ganancias_por_mes_ars=ganancias_por_mes_ars,
-                               ganancias_por_mes_usd=ganancias_por_mes_usd,
-                               ventas_por_mes_ars=ventas_por_mes_ars,
-                               ventas_por_mes_usd=ventas_por_mes_usd,
-                               # Variables del mes actual
-                               ventas_mes_actual=ventas_mes_actual,
-                               ventas_mes_actual_ars=ventas_mes_actual_ars,
-                               ventas_mes_actual_usd=ventas_mes_actual_usd,
-                               ingresos_mes_actual_ars=ingresos_mes_actual_ars,
-                               ingresos_mes_actual_usd=ingresos_mes_actual_usd,
-                               costos_mes_actual_ars=costos_mes_actual_ars,
-                               costos_mes_actual_usd=costos_mes_actual_usd,
-                               ganancia_mes_actual_ars=ganancia_mes_actual_ars,
-                               ganancia_mes_actual_usd=ganancia_mes_actual_usd)
+        return render_template('estadisticas.html', periodo_vendedores=periodo, **contexto)
     except Exception as e:
         app.logger.error(f"Error en la ruta /estadisticas: {e}")
         return render_template('error.html', error=str(e)), 500
 
-# Crear tablas y datos iniciales
-with app.app_context():
-    db.create_all()
-    
-    # Ya no creamos automáticamente el usuario administrador
-    # El primer usuario que se registre será administrador_jefe
-    
-    # Crear auto de prueba si no hay autos
-    if not Auto.query.first():
-        auto_prueba = Auto(
-            marca='Toyota', 
-            modelo='Corolla', 
-            anio=2022, 
-            precio=35000.0,
-            precio_compra=30000.0,
-            descripcion='Auto de prueba en excelente estado',
-            color='Blanco',
-            kilometraje=0,
-            estado=EstadoAuto.DISPONIBLE
-        )
-        db.session.add(auto_prueba)
-        db.session.commit()
-        print("Auto de prueba agregado.")
+@app.route('/estadisticas/api/series')
+@admin_required
+def estadisticas_api_series():
+    metrica = request.args.get('metric', 'ingresos')
+    moneda = request.args.get('moneda') or None
+    agrupar = request.args.get('group') or None
+    
+    año_actual = datetime.now().year
+    try:
+        desde = parsear_mes(request.args.get('desde') or f'{año_actual}-01')
+        hasta = parsear_mes(request.args.get('hasta') or f'{año_actual}-12')
+    except ValueError:
+        return jsonify({'error': 'desde y hasta deben tener el formato YYYY-MM'}), 400
+    
+    if metrica not in METRICAS_SERIE:
+        return jsonify({'error': f"metric debe ser una de: {', '.join(METRICAS_SERIE)}"}), 400
+    if moneda is not None and moneda not in MONEDAS:
+        return jsonify({'error': f"moneda debe ser una de: {', '.join(MONEDAS)}"}), 400
+    if agrupar is not None and agrupar not in AGRUPACIONES_SERIE:
+        return jsonify({'error': f"group debe ser uno de: {', '.join(AGRUPACIONES_SERIE)}"}), 400
+    meses = (hasta[0] - desde[0]) * 12 + hasta[1] - desde[1] + 1
+    if meses < 1 or meses > MAX_MESES_SERIE:
+        return jsonify({'error': f'El rango debe tener entre 1 y {MAX_MESES_SERIE} meses'}), 400
+    
+    # El ETag depende de la versión de los datos y de los parámetros: si coincide
+    # se responde 304 sin consultar la base ni armar el JSON
+    parametros = (metrica, moneda, agrupar, desde, hasta)
+    version = obtener_version('estadisticas')
+    etag = hashlib.sha1(repr((version,) + parametros).encode()).hexdigest()
+    
+    if etag in request.if_none_match:
+        respuesta = app.response_class(status=304)
+    else:
+        serie = cache_estadisticas.obtener(('api_series',) + parametros, lambda: obtener_serie(metrica, desde, hasta, moneda, agrupar))
+        respuesta = app.response_class(json.dumps(serie, separators=(',', ':'), ensure_ascii=False), mimetype='application/json')
+    
+    respuesta.set_etag(etag)
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+@app.route('/estadisticas/cache')
+@admin_required
+def estadisticas_cache():
+    return jsonify(cache_estadisticas.estadisticas())
+
+# Puesta en marcha del proceso que atiende requests (wsgi.py, app.py o python app_final.py).
+# No corre al importar el módulo: los scripts (generar_variantes.py, limpiar_fotos.py...) usan app
+# y db sin migrar la base ni retomar fotos en hilos que terminarían con el script
+def inicializar_base():
+    """Crea las tablas, completa el esquema de bases anteriores y los datos iniciales"""
+    with app.app_context():
+        db.create_all()
+        
+        # Completar el esquema de bases creadas con versiones anteriores
+        aplicar_migraciones()
+        
+        # Bases existentes: llenar el resumen mensual de ventas la primera vez
+        if not VentaResumenMensual.query.first() and Venta.query.first():
+            grupos = reconstruir_resumen()
+            app.logger.info(f"Resumen mensual de ventas inicializado: {grupos} grupos")
+        
+        # Ya no creamos automáticamente el usuario administrador
+        # El primer usuario que se registre será administrador_jefe
+        
+        # Crear auto de prueba si no hay autos
+        if not Auto.query.first():
+            auto_prueba = Auto(
+                marca='Toyota', 
+                modelo='Corolla', 
+                anio=2022, 
+                precio=35000.0,
+                precio_compra=30000.0,
+                descripcion='Auto de prueba en excelente estado',
+                color='Blanco',
+                kilometraje=0,
+                estado=EstadoAuto.DISPONIBLE
+            )
+            db.session.add(auto_prueba)
+            db.session.commit()
+            print("Auto de prueba agregado.")
+
+def arrancar():
+    """Inicializa la base y retoma las fotos que quedaron sin procesar si el proceso se detuvo"""
+    inicializar_base()
+    with app.app_context():
+        cola_fotos.reanudar_pendientes()
 
 # Iniciar el servidor
 if __name__ == '__main__':
+    arrancar()
     app.run(debug=True)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compara la búsqueda del catálogo con FTS5 contra el filtro ILIKE por columna.
+
+Crea una base SQLite temporal con autos de prueba y mide el tiempo promedio de cada consulta.
+
+Uso:
+    python benchmark_busqueda.py            # 50.000 autos
+    python benchmark_busqueda.py 200000     # cantidad de autos
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from app_final import app
+from models import db, Auto, EstadoAuto
+from utils.busqueda import buscar_autos
+
+MARCAS = {
+    'Peugeot': ['208', '308', '2008', 'Partner'], 'Citroën': ['C3', 'C4 Cactus', 'Berlingo'],
+    'Renault': ['Clio', 'Sandero', 'Kangoo'], 'Volkswagen': ['Gol', 'Polo', 'Amarok'],
+    'Ford': ['Ka', 'Fiesta', 'Ranger'], 'Fiat': ['Cronos', 'Argo', 'Toro'],
+}
+COLORES = ['Blanco', 'Negro', 'Gris', 'Rojo', 'Azul', 'Plata']
+DETALLES = ['nafta', 'diésel', 'GNC', 'único dueño', 'service al día', 'impecable', 'techo solar',
+            'caja automática', 'llantas de aleación', 'cubiertas nuevas', 'financiación']
+
+BUSQUEDAS = ['peugeot 208 nafta', 'citroen', 'diesel blanco', 'ranger unico dueño', 'techo solar automatica']
+REPETICIONES = 5
+
+def cargar_autos(cantidad):
+    """Inserta autos aleatorios (con semilla fija) en lotes"""
+    azar = random.Random(1)
+    for inicio in range(0, cantidad, 5000):
+        filas = []
+        for _ in range(min(5000, cantidad - inicio)):
+            marca = azar.choice(list(MARCAS))
+            filas.append({
+                'marca': marca, 'modelo': azar.choice(MARCAS[marca]), 'anio': azar.randint(2005, 2024),
+                'precio': azar.randint(5, 60) * 1000.0, 'color': azar.choice(COLORES),
+                'descripcion': ', '.join(azar.sample(DETALLES, 3)).capitalize(),
+                'estado': EstadoAuto.DISPONIBLE,
+            })
+        db.session.execute(Auto.__table__.insert(), filas)
+    db.session.commit()
+
+def buscar_ilike(texto):
+    """Búsqueda anterior: cada palabra tiene que aparecer (ILIKE) en alguna columna"""
+    query = Auto.query
+    for palabra in texto.split():
+        patron = f'%{palabra}%'
+        query = query.filter(db.or_(Auto.marca.ilike(patron), Auto.modelo.ilike(patron),
+                                    Auto.color.ilike(patron), Auto.descripcion.ilike(patron)))
+    return query.order_by(Auto.id.desc())
+
+def buscar_fts(texto):
+    query, relevancia = buscar_autos(Auto.query, texto)
+    return query.order_by(relevancia.desc(), Auto.id.desc())
+
+def medir(construir, texto):
+    """Tiempo promedio (ms) de la primera página y cantidad total de resultados"""
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        construir(texto).limit(24).all()
+    return (time.perf_counter() - inicio) * 1000 / REPETICIONES, construir(texto).count()
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as directorio:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directorio, 'benchmark.db')
+        with app.app_context():
+            db.create_all()
+            print(f"Cargando {cantidad} autos...")
+            cargar_autos(cantidad)
+
+            print(f"{'Búsqueda':<28}{'ILIKE (ms)':>12}{'FTS5 (ms)':>12}{'ILIKE #':>10}{'FTS5 #':>10}")
+            for texto in BUSQUEDAS:
+                ms_ilike, total_ilike = medir(buscar_ilike, texto)
+                ms_fts, total_fts = medir(buscar_fts, texto)
+                print(f"{texto:<28}{ms_ilike:>12.1f}{ms_fts:>12.1f}{total_ilike:>10}{total_fts:>10}")
+
+            db.session.remove()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mide la búsqueda de fotos huérfanas sobre una carpeta uploads de prueba.
+
+Crea una base SQLite y una carpeta static temporales con archivos vacíos repartidos como en el
+almacén por hash (uploads/fotos/<ab>/<hash>.jpg); la mitad tiene su FotoAuto. Mide el recorrido,
+la consulta y la comparación completos.
+
+Uso:
+    python benchmark_limpieza_fotos.py             # 100.000 archivos
+    python benchmark_limpieza_fotos.py 20000       # cantidad de archivos
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from app_final import app
+from models import db, Auto, FotoAuto, EstadoAuto
+from utils.limpieza_fotos import buscar_huerfanos
+
+def crear_archivos(carpeta_static, cantidad):
+    """Crea los archivos y devuelve sus rutas relativas"""
+    rutas = []
+    for i in range(cantidad):
+        nombre = hashlib.sha256(str(i).encode()).hexdigest()
+        ruta = f'uploads/fotos/{nombre[:2]}/{nombre}.jpg'
+        ruta_completa = os.path.join(carpeta_static, ruta)
+        os.makedirs(os.path.dirname(ruta_completa), exist_ok=True)
+        open(ruta_completa, 'wb').close()
+        rutas.append(ruta)
+    return rutas
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directorio:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directorio, 'benchmark.db')
+        carpeta_static = os.path.join(directorio, 'static')
+        with app.app_context():
+            db.create_all()
+            print(f"Creando {cantidad} archivos...")
+            rutas = crear_archivos(carpeta_static, cantidad)
+
+            auto = Auto(marca='Fiat', modelo='Cronos', anio=2020, precio=1000.0, estado=EstadoAuto.DISPONIBLE)
+            db.session.add(auto)
+            db.session.commit()
+            # Inserción en lote sin el ORM: la mitad de los archivos tiene su foto
+            db.session.execute(FotoAuto.__table__.insert(),
+                               [{'auto_id': auto.id, 'ruta_archivo': ruta} for ruta in rutas[::2]])
+            db.session.commit()
+
+            inicio = time.perf_counter()
+            # Con ahora en el futuro todos los archivos cuentan como viejos (se hace el stat de cada huérfano)
+            resultado = buscar_huerfanos(carpeta_static, os.path.join(directorio, 'pendientes'), ahora=time.time() + 7200)
+            transcurrido = time.perf_counter() - inicio
+
+        print(f"Archivos: {resultado['archivos']}. Huérfanos: {len(resultado['huerfanos'])}. "
+              f"Fotos sin archivo: {len(resultado['colgadas'])}.")
+        print(f"Búsqueda completa: {transcurrido:.2f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
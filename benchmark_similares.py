@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mide la búsqueda de autos similares sobre la matriz NumPy.
+
+Crea una base SQLite temporal con autos disponibles de prueba, carga el índice y mide
+el tiempo promedio de una búsqueda y de una actualización incremental.
+
+Uso:
+    python benchmark_similares.py            # 10.000 autos
+    python benchmark_similares.py 50000      # cantidad de autos
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from app_final import app
+from models import db, Auto, EstadoAuto
+from utils.similares import indice_similares
+
+MARCAS = ['Peugeot', 'Citroën', 'Renault', 'Volkswagen', 'Ford', 'Fiat', 'Toyota', 'Chevrolet']
+REPETICIONES = 1000
+
+def cargar_autos(cantidad):
+    """Inserta autos aleatorios (con semilla fija) en lotes"""
+    azar = random.Random(1)
+    for inicio in range(0, cantidad, 5000):
+        filas = []
+        for _ in range(min(5000, cantidad - inicio)):
+            moneda = azar.choice(['ARS', 'USD'])
+            filas.append({
+                'marca': azar.choice(MARCAS), 'modelo': 'M', 'anio': azar.randint(2005, 2024),
+                'precio': azar.randint(5, 60) * (1000000.0 if moneda == 'ARS' else 1000.0), 'moneda': moneda,
+                'kilometraje': azar.randint(0, 250000), 'estado': EstadoAuto.DISPONIBLE,
+            })
+        db.session.execute(Auto.__table__.insert(), filas)
+    db.session.commit()
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    with tempfile.TemporaryDirectory() as directorio:
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directorio, 'benchmark.db')
+        with app.app_context():
+            db.create_all()
+            print(f"Cargando {cantidad} autos...")
+            cargar_autos(cantidad)
+            # Las inserciones en lote no pasan por el ORM: se registra un cambio para tener versión
+            Auto.query.get(1).kilometraje = 1
+            db.session.commit()
+
+            inicio = time.perf_counter()
+            indice_similares.actualizar()
+            print(f"Carga completa: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+            autos = Auto.query.limit(REPETICIONES).all()
+            # Las búsquedas se miden sin la lectura de la versión (una consulta por página)
+            indice_similares.actualizar = lambda: None
+            inicio = time.perf_counter()
+            for auto in autos:
+                indice_similares.buscar(auto, 4)
+            print(f"Búsqueda: {(time.perf_counter() - inicio) * 1000 / len(autos):.3f} ms promedio")
+            del indice_similares.actualizar
+
+            for auto in autos[:10]:
+                auto.precio += 1
+            db.session.commit()
+            inicio = time.perf_counter()
+            indice_similares.actualizar()
+            print(f"Actualización de 10 autos: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+            db.session.remove()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -100,9 +100,12 @@ def nuevo():
                     
                     # Crear registro en la base de datos
                     if ruta_archivo:
-                        foto_auto = FotoAuto(ruta_archivo=ruta_archivo, auto_id=nuevo_auto.id)
-                        db.session.add(foto_auto)
+                        foto_auto = FotoAuto(ruta_archivo=ruta_archivo)
+                        nuevo_auto.fotos.append(foto_auto)
             
+            # La primera foto queda como principal
+            db.session.flush()
+            nuevo_auto.actualizar_foto_principal()
             db.session.commit()
         
         flash('Auto agregado correctamente', 'success')
@@ -149,9 +152,12 @@ def editar(auto_id):
                     
                     # Crear registro en la base de datos
                     if ruta_archivo:
-                        foto_auto = FotoAuto(ruta_archivo=ruta_archivo, auto_id=auto.id)
-                        db.session.add(foto_auto)
+                        foto_auto = FotoAuto(ruta_archivo=ruta_archivo)
+                        auto.fotos.append(foto_auto)
             
+            # Mantener la foto principal (la primera si el auto no tenía)
+            db.session.flush()
+            auto.actualizar_foto_principal()
             db.session.commit()
         
         flash('Auto actualizado correctamente', 'success')
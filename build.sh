@@ -8,8 +8,11 @@ pip install --upgrade pip
 # Instalar dependencias
 pip install -r requirements.txt
 
-# Asegurarse de que la base de datos existe
-python -c "from app import db; db.create_all()"
+# Versiones .gz/.br de CSS, JS y SVG para servirlas sin comprimir en cada request
+python comprimir_estaticos.py
+
+# Asegurarse de que la base de datos existe y tiene el esquema actual (sin arrancar la cola de fotos)
+python -c "from app_final import inicializar_base; inicializar_base()"
 
 # Ejecutar script de protección de usuarios
 python protect_users.py
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Genera las versiones precomprimidas (.gz y, si está instalado el paquete brotli, .br) de los
+archivos de texto de static (CSS, JS, SVG...). La vista de static las sirve según Accept-Encoding.
+Las fotos subidas no se tocan: JPEG y WebP ya están comprimidos.
+
+Uso:
+    python comprimir_estaticos.py            # solo los archivos nuevos o modificados
+    python comprimir_estaticos.py --todos    # recomprime todo
+"""
+
+import gzip
+import os
+import sys
+from utils.estaticos import COMPRIMIBLES
+
+CARPETA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+EXCLUIDAS = {'uploads'}
+
+# Por debajo de este tamaño el encabezado extra no compensa
+TAMANIO_MINIMO = 256
+
+def compresores():
+    """(extensión, función) disponibles; brotli es opcional"""
+    disponibles = [('.gz', lambda datos: gzip.compress(datos, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+        disponibles.append(('.br', lambda datos: brotli.compress(datos, quality=11)))
+    except ImportError:
+        pass
+    return disponibles
+
+def archivos(carpeta):
+    for raiz, directorios, nombres in os.walk(carpeta):
+        if raiz == carpeta:
+            directorios[:] = [d for d in directorios if d not in EXCLUIDAS]
+        for nombre in nombres:
+            if os.path.splitext(nombre)[1].lower() in COMPRIMIBLES:
+                yield os.path.join(raiz, nombre)
+
+def comprimir(carpeta=CARPETA_STATIC, todos=False):
+    """Escribe los comprimidos que falten o estén viejos; devuelve (escritos, bytes ahorrados)"""
+    escritos, ahorrados = 0, 0
+    disponibles = compresores()
+    for ruta in archivos(carpeta):
+        tamanio = os.path.getsize(ruta)
+        if tamanio < TAMANIO_MINIMO:
+            continue
+        datos = None
+        for extension, compresor in disponibles:
+            destino = ruta + extension
+            if not todos and os.path.exists(destino) and os.path.getmtime(destino) >= os.path.getmtime(ruta):
+                continue
+            if datos is None:
+                with open(ruta, 'rb') as archivo:
+                    datos = archivo.read()
+            comprimido = compresor(datos)
+            if len(comprimido) >= tamanio:
+                # No sirve: si había uno viejo se borra para no servirlo
+                if os.path.exists(destino):
+                    os.remove(destino)
+                continue
+            temporal = f'{destino}.tmp'
+            with open(temporal, 'wb') as archivo:
+                archivo.write(comprimido)
+            os.replace(temporal, destino)
+            escritos += 1
+            ahorrados += tamanio - len(comprimido)
+    return escritos, ahorrados
+
+def main():
+    escritos, ahorrados = comprimir(todos='--todos' in sys.argv[1:])
+    formatos = ', '.join(extension for extension, _ in compresores())
+    print(f"Comprimidos ({formatos}): {escritos} archivos, {ahorrados / 1024:.1f} KB menos por transferir.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
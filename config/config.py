@@ -7,6 +7,24 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB máximo para subida de archivos
+    PAGINA_TAMANIO = int(os.environ.get('PAGINA_TAMANIO', 24))  # Autos por página en catálogo y stock
+    # Cache-Control por endpoint de las páginas públicas del catálogo (se revalidan con ETag)
+    CACHE_CONTROL = {
+        'autos.autos': 'public, no-cache',
+        'autos.ficha': 'public, no-cache',
+        'autos.api_autos_disponibles': 'public, no-cache',
+    }
+    VERSION_DESPLIEGUE = os.environ.get('RENDER_GIT_COMMIT', '')  # Invalida los ETag en cada despliegue
+    # Cache de páginas para visitantes anónimos (el directorio, opcional, se comparte entre workers)
+    CACHE_PAGINAS_MAX_BYTES = int(os.environ.get('CACHE_PAGINAS_MAX_BYTES', 32 * 1024 * 1024))
+    CACHE_PAGINAS_DIR = os.environ.get('CACHE_PAGINAS_DIR') or None
+    # Fotos subidas: carpeta de pendientes (fuera de static) e hilos que generan las variantes
+    FOTOS_PENDIENTES_DIR = os.environ.get('FOTOS_PENDIENTES_DIR') or os.path.join(
+        os.path.abspath(os.path.dirname(os.path.dirname(__file__))), 'instance', 'fotos_pendientes')
+    FOTOS_HILOS = int(os.environ.get('FOTOS_HILOS', 2))
+    # Envío de los archivos de static a cargo del servidor de adelante: 'x-accel' (nginx) o 'x-sendfile'
+    ENVIO_ARCHIVOS = os.environ.get('ENVIO_ARCHIVOS') or None
+    X_ACCEL_PREFIJO = os.environ.get('X_ACCEL_PREFIJO', '/_static/')  # location internal de nginx
 
 class DevelopmentConfig(Config):
     """Configuración para entorno de desarrollo"""
@@ -0,0 +1,19 @@
+from sqlalchemy import event
+
+class ContadorConsultas:
+    """Registra las sentencias SQL (y sus parámetros) ejecutadas dentro del bloque with"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.sentencias = []
+        self.parametros = []
+
+    def _registrar(self, conn, cursor, sql, parametros, *args):
+        self.sentencias.append(sql)
+        self.parametros.append(parametros)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._registrar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._registrar)
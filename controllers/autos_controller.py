@@ -1,6 +1,7 @@
 from flask import render_template, request, redirect, url_for, flash, session, current_app
 from werkzeug.utils import secure_filename
 from models import db, Auto, FotoAuto, EstadoAuto
+from utils.busqueda import buscar_autos
 import os
 import uuid
 from datetime import datetime
@@ -12,8 +13,8 @@ def autos():
         modelo = request.args.get('modelo', '')
         anio = request.args.get('anio', '')
         
-        # Consulta base
-        query = Auto.query
+        # Consulta base, restringida por la búsqueda de texto completo si hay q
+        query, relevancia = buscar_autos(Auto.query, request.args.get('q', ''))
         
         # Aplicar filtros si existen
         if marca:
@@ -23,8 +24,10 @@ def autos():
         if anio and anio.isdigit():
             query = query.filter(Auto.anio == int(anio))
         
-        # Obtener resultados
+        # Obtener resultados (los más relevantes primero si se buscó)
         try:
+            if relevancia is not None:
+                query = query.order_by(relevancia.desc())
             autos = query.order_by(Auto.fecha_publicacion.desc()).all()
         except Exception as e:
             print(f"Error al obtener autos: {e}")
@@ -111,9 +114,12 @@ def nuevo_auto():
                     ruta_normalizada = ruta_relativa.replace('\\', '/')
                     
                     # Crear registro en la base de datos
-                    foto_auto = FotoAuto(ruta_archivo=ruta_normalizada, auto_id=nuevo_auto.id)
-                    db.session.add(foto_auto)
+                    foto_auto = FotoAuto(ruta_archivo=ruta_normalizada)
+                    nuevo_auto.fotos.append(foto_auto)
         
+        # La primera foto queda como principal
+        db.session.flush()
+        nuevo_auto.actualizar_foto_principal()
         db.session.commit()
         
         flash('Auto agregado correctamente', 'success')
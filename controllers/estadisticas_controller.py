@@ -1,7 +1,8 @@
 from flask import render_template, session, redirect, url_for
-from models import db, Venta, Auto, EstadoAuto
+from models import db, Venta, Auto, EstadoAuto, VentaResumenMensual
 from datetime import datetime
 import calendar
+from utils.helpers import rango_fechas
 
 def estadisticas():
     if session.get('rol') != 'admin':
@@ -29,43 +30,48 @@ def estadisticas():
                           resumen=resumen,
                           anio_actual=anio_actual)
 
+def _resumen_por_mes(anio):
+    """Totales por mes de un año, leídos del resumen mensual de ventas"""
+    filas = db.session.query(
+        VentaResumenMensual.mes,
+        db.func.sum(VentaResumenMensual.cantidad),
+        db.func.sum(VentaResumenMensual.total_venta),
+        db.func.sum(VentaResumenMensual.total_compra)
+    ).filter(VentaResumenMensual.anio == anio)\
+     .group_by(VentaResumenMensual.mes)\
+     .all()
+    
+    return {mes: (cantidad, total_venta or 0, total_compra or 0) for mes, cantidad, total_venta, total_compra in filas}
+
 def obtener_ventas_por_mes(anio):
     """Obtiene el número de ventas por mes para un año específico"""
+    resumen = _resumen_por_mes(anio)
     datos_ventas = []
     
     for mes in range(1, 13):
-        # Contar ventas para este mes y año
-        count = Venta.query.filter(
-            db.extract('year', Venta.fecha_venta) == anio,
-            db.extract('month', Venta.fecha_venta) == mes
-        ).count()
+        cantidad = resumen.get(mes, (0, 0, 0))[0]
         
         # Agregar datos al resultado
         datos_ventas.append({
             'mes': calendar.month_name[mes],
-            'cantidad': count
+            'cantidad': cantidad
         })
     
     return datos_ventas
 
 def obtener_ganancias_por_mes(anio):
     """Obtiene las ganancias por mes para un año específico"""
+    resumen = _resumen_por_mes(anio)
     datos_ganancias = []
     
     for mes in range(1, 13):
-        # Obtener ventas para este mes y año
-        ventas = Venta.query.filter(
-            db.extract('year', Venta.fecha_venta) == anio,
-            db.extract('month', Venta.fecha_venta) == mes
-        ).all()
-        
-        # Calcular ganancia total
-        ganancia_total = sum(venta.precio_venta - venta.auto.precio_compra for venta in ventas)
+        # Ganancia = precio de venta - precio de compra del auto
+        _, total_venta, total_compra = resumen.get(mes, (0, 0, 0))
         
         # Agregar datos al resultado
         datos_ganancias.append({
             'mes': calendar.month_name[mes],
-            'ganancia': ganancia_total
+            'ganancia': total_venta - total_compra
         })
     
     return datos_ganancias
@@ -85,35 +91,32 @@ def obtener_ventas_por_marca():
 
 def obtener_resumen_general():
     """Obtiene un resumen general de las estadísticas"""
-    # Total de autos en inventario
-    total_autos = Auto.query.count()
-    
-    # Total de autos disponibles
-    autos_disponibles = Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE).count()
-    
-    # Total de ventas
-    total_ventas = Venta.query.count()
+    # Autos en inventario por estado, en una sola consulta
+    autos_por_estado = dict(
+        db.session.query(Auto.estado, db.func.count(Auto.id)).group_by(Auto.estado).all()
+    )
+    total_autos = sum(autos_por_estado.values())
+    autos_disponibles = autos_por_estado.get(EstadoAuto.DISPONIBLE, 0)
     
     # Ventas del mes actual
     mes_actual = datetime.now().month
     anio_actual = datetime.now().year
-    ventas_mes = Venta.query.filter(
-        db.extract('year', Venta.fecha_venta) == anio_actual,
-        db.extract('month', Venta.fecha_venta) == mes_actual
-    ).count()
-    
-    # Ingresos totales
-    ingresos_totales = db.session.query(db.func.sum(Venta.precio_venta)).scalar() or 0
+    inicio, fin = rango_fechas(anio_actual, mes_actual)
+    ventas_mes = Venta.query.filter(Venta.fecha_venta >= inicio, Venta.fecha_venta < fin).count()
     
-    # Ganancias totales (precio de venta - precio de compra)
-    ventas = Venta.query.all()
-    ganancias_totales = sum(venta.precio_venta - venta.auto.precio_compra for venta in ventas)
+    # Total de ventas, ingresos y ganancias (precio de venta - precio de compra del auto)
+    # sumados en SQL sobre el resumen mensual, sin cargar ninguna venta
+    total_ventas, ingresos_totales, compras_totales = db.session.query(
+        db.func.sum(VentaResumenMensual.cantidad),
+        db.func.sum(VentaResumenMensual.total_venta),
+        db.func.sum(VentaResumenMensual.total_compra)
+    ).one()
     
     return {
         'total_autos': total_autos,
         'autos_disponibles': autos_disponibles,
-        'total_ventas': total_ventas,
+        'total_ventas': total_ventas or 0,
         'ventas_mes': ventas_mes,
-        'ingresos_totales': ingresos_totales,
-        'ganancias_totales': ganancias_totales
+        'ingresos_totales': ingresos_totales or 0,
+        'ganancias_totales': (ingresos_totales or 0) - (compras_totales or 0)
     }
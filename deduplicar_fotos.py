@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pasa las fotos anteriores al almacén por hash (static/uploads/autos/<id>/<uuid>_<nombre>) a
+static/uploads/fotos/<ab>/<sha256>: las copias repetidas de un mismo archivo quedan en una sola.
+
+Uso:
+    python deduplicar_fotos.py
+"""
+
+import os
+import sys
+from app_final import app
+from models import db, FotoAuto
+from utils.almacen_fotos import hash_archivo, registrar_archivo
+from utils.imagenes import archivos_foto, procesar_foto
+
+LOTE = 50
+
+def migrar_foto(foto, carpeta):
+    """Apunta la foto a su contenido (copiándolo si es la primera vez) y devuelve (archivos viejos, bytes copiados)"""
+    origen = os.path.join(carpeta, foto.ruta_archivo)
+    viejos = archivos_foto(foto)
+    hash_contenido = hash_archivo(origen)
+
+    foto.archivo_hash = hash_contenido
+    foto.ruta_archivo = registrar_archivo(hash_contenido, os.path.splitext(origen)[1], os.path.getsize(origen))
+    destino = os.path.join(carpeta, foto.ruta_archivo)
+    copiados = 0
+    if not os.path.exists(destino):
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Se copia: el original se borra recién después del commit
+        with open(origen, 'rb') as entrada, open(destino, 'wb') as salida:
+            for bloque in iter(lambda: entrada.read(1024 * 1024), b''):
+                salida.write(bloque)
+        copiados = os.path.getsize(destino)
+
+    # Las variantes son del contenido: si otra foto ya las tiene se reutilizan
+    procesada = FotoAuto.query.filter(
+        FotoAuto.archivo_hash == hash_contenido, FotoAuto.id != foto.id, FotoAuto.variantes.isnot(None)
+    ).first()
+    if procesada:
+        foto.variantes = procesada.variantes
+    elif foto.variantes is not None:
+        procesar_foto(foto, carpeta)
+    return viejos, copiados
+
+def main():
+    with app.app_context():
+        carpeta = app.static_folder
+        query = FotoAuto.query.filter(FotoAuto.archivo_hash.is_(None)).order_by(FotoAuto.id)
+
+        migradas, faltantes, liberados = 0, 0, 0
+        ultimo_id = 0
+        while True:
+            lote = query.filter(FotoAuto.id > ultimo_id).limit(LOTE).all()
+            if not lote:
+                break
+            viejos = []
+            for foto in lote:
+                if not os.path.exists(os.path.join(carpeta, foto.ruta_archivo)):
+                    faltantes += 1
+                    continue
+                rutas, copiados = migrar_foto(foto, carpeta)
+                viejos.extend(rutas)
+                liberados -= copiados
+                migradas += 1
+            ultimo_id = lote[-1].id
+            db.session.commit()
+
+            # Confirmado el lote, las rutas viejas ya no las usa nadie
+            for ruta in viejos:
+                ruta_completa = os.path.join(carpeta, ruta)
+                if os.path.exists(ruta_completa):
+                    liberados += os.path.getsize(ruta_completa)
+                    os.remove(ruta_completa)
+
+        print(f"Fotos migradas: {migradas}. Archivos faltantes: {faltantes}. "
+              f"Espacio liberado: {liberados / 1024 / 1024:.1f} MB.")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
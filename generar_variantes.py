@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Genera los tamaños reducidos (thumb, card y full en WebP y JPEG) de las fotos de static/uploads/autos.
+
+Uso:
+    python generar_variantes.py            # solo las fotos que todavía no tienen variantes
+    python generar_variantes.py --todas    # regenera todas (p. ej. si cambiaron los tamaños)
+"""
+
+import os
+import sys
+from app_final import app
+from models import db, FotoAuto, EstadoFoto
+from utils.imagenes import procesar_foto
+
+LOTE = 50
+
+def main():
+    todas = '--todas' in sys.argv[1:]
+    with app.app_context():
+        # Las pendientes las procesa la cola de fotos (su archivo todavía no está en static)
+        query = FotoAuto.query.filter(FotoAuto.estado != EstadoFoto.PENDIENTE).order_by(FotoAuto.id)
+        if not todas:
+            query = query.filter(FotoAuto.variantes.is_(None))
+
+        generadas, faltantes, invalidas = 0, 0, 0
+        ultimo_id = 0
+        while True:
+            # Por id en lotes: no carga todas las fotos a la vez y cada lote se confirma solo
+            lote = query.filter(FotoAuto.id > ultimo_id).limit(LOTE).all()
+            if not lote:
+                break
+            for foto in lote:
+                if not os.path.exists(os.path.join(app.static_folder, foto.ruta_archivo)):
+                    faltantes += 1
+                elif procesar_foto(foto):
+                    foto.estado = EstadoFoto.LISTA
+                    generadas += 1
+                else:
+                    invalidas += 1
+            ultimo_id = lote[-1].id
+            db.session.commit()
+
+        print(f"Variantes generadas: {generadas} fotos. Archivos faltantes: {faltantes}. No válidos: {invalidas}.")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Busca en static/uploads (y en la carpeta de fotos pendientes) los archivos que ninguna foto usa
+y las fotos cuyo archivo ya no existe. Sin opciones solo informa.
+
+Uso:
+    python limpiar_fotos.py                             # informe
+    python limpiar_fotos.py --borrar                    # borra hasta 1000 archivos huérfanos por ejecución
+    python limpiar_fotos.py --borrar 5000               # otro límite
+    python limpiar_fotos.py --borrar --borrar-colgadas  # también las fotos sin archivo (no usar desde el scheduler)
+"""
+
+import sys
+import time
+from app_final import app
+from utils.limpieza_fotos import limpiar_fotos, LIMITE_BORRADOS
+
+def main():
+    argumentos = sys.argv[1:]
+    borrar = '--borrar' in argumentos
+    limite = LIMITE_BORRADOS
+    if borrar:
+        siguiente = argumentos[argumentos.index('--borrar') + 1:]
+        if siguiente and siguiente[0].isdigit():
+            limite = int(siguiente[0])
+
+    inicio = time.perf_counter()
+    with app.app_context():
+        try:
+            resultado = limpiar_fotos(borrar=borrar, limite=limite, filas='--borrar-colgadas' in argumentos)
+        except ValueError as e:
+            print(f"No se borra nada: {e}")
+            return 1
+
+    huerfanos = resultado['huerfanos'] + resultado['pendientes_huerfanos']
+    print(f"Archivos revisados: {resultado['archivos']} en {time.perf_counter() - inicio:.2f} s.")
+    print(f"Archivos huérfanos: {len(huerfanos)} ({resultado['bytes'] / 1024 / 1024:.1f} MB). "
+          f"Fotos sin archivo: {len(resultado['colgadas'])}. Trabadas procesándose: {len(resultado['trabadas'])}.")
+    if borrar:
+        print(f"Borrados: {resultado['borrados']} archivos y {resultado['filas_borradas']} fotos. "
+              f"Trabadas: {resultado.get('recuperadas', 0)} vuelven a pendientes, {resultado.get('con_error', 0)} con error.")
+    else:
+        for ruta, tamanio in huerfanos[:20]:
+            print(f"  {ruta} ({tamanio} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aplica las migraciones pendientes sobre la base de datos configurada.
+app_final también las aplica al arrancar (wsgi.py); este script sirve para correrlas a mano.
+"""
+
+from app_final import app
+from utils.migraciones import aplicar_migraciones, MIGRACIONES
+
+def main():
+    with app.app_context():
+        aplicar_migraciones()
+        for migracion in MIGRACIONES:
+            print(f"- {migracion.__name__}: OK")
+        print("Migraciones aplicadas correctamente.")
+
+if __name__ == "__main__":
+    main()
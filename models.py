@@ -1,4 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, select, and_, DDL
+from sqlalchemy.orm import validates
 from datetime import datetime
 import enum
 
@@ -24,6 +26,12 @@ class EstadoPago(enum.Enum):
     PAGADO = "Pagado"
     CANCELADO = "Cancelado"
 
+class EstadoFoto(enum.Enum):
+    PENDIENTE = "Pendiente"  # Subida, esperando en la carpeta de pendientes
+    PROCESANDO = "Procesando"
+    LISTA = "Lista"
+    ERROR = "Error"  # No se pudo leer la imagen: queda solo el original
+
 class Usuario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -43,6 +51,13 @@ class Usuario(db.Model):
         return f'<Usuario {self.username}>'
 
 class Auto(db.Model):
+    __table_args__ = (
+        # Catálogo: autos disponibles del más nuevo al más viejo (filtro por estado + cursor por id)
+        db.Index('ix_auto_estado_id', 'estado', 'id'),
+        # Stock: filtro exacto por marca
+        db.Index('ix_auto_marca', 'marca'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)  # Identificador único
     marca = db.Column(db.String(50), nullable=False)  # Marca del auto
     modelo = db.Column(db.String(50), nullable=False)  # Modelo del auto
@@ -56,34 +71,117 @@ class Auto(db.Model):
     color = db.Column(db.String(50))  # Color del auto
     kilometraje = db.Column(db.Integer)  # Kilometraje
     url_compartir = db.Column(db.String(255))  # URL para compartir
+    foto_principal_id = db.Column(db.Integer)  # FotoAuto principal (la mantienen las rutas de fotos)
     
     # Relación con fotos
     fotos = db.relationship('FotoAuto', backref='auto', lazy=True, cascade='all, delete-orphan')
     
+    # Foto principal sin recorrer fotos: los listados la cargan en lote con selectinload
+    foto_principal = db.relationship('FotoAuto', primaryjoin='foreign(Auto.foto_principal_id) == FotoAuto.id',
+                                     uselist=False, viewonly=True)
+    
     def __repr__(self):
         return f'<Auto {self.marca} {self.modelo}>'
+    
+    def actualizar_foto_principal(self, foto=None):
+        """Fija la foto principal (o la marcada como principal, o la primera) y actualiza foto_principal_id.
+
+        Las fotos deben tener id: llamar después de db.session.flush().
+        """
+        fotos = sorted(self.fotos, key=lambda f: (f.orden or 0, f.id))
+        if foto is None:
+            foto = next((f for f in fotos if f.es_principal), fotos[0] if fotos else None)
         
-    @property
-    def foto_principal(self):
-        """Retorna la primera foto o None si no hay fotos"""
-        return self.fotos[0] if self.fotos else None
+        for f in fotos:
+            f.es_principal = f is foto
+        self.foto_principal_id = foto.id if foto else None
+
+# Orden del stock: más recientes primero y los autos sin fecha al final. La fecha por defecto va
+# como literal (no como parámetro) para que la consulta coincida con la expresión del índice
+ORDEN_PUBLICACION = db.func.coalesce(
+    Auto.fecha_publicacion, db.literal_column("'1970-01-01 00:00:00.000000'", db.DateTime)
+)
+db.Index('ix_auto_publicacion', ORDEN_PUBLICACION, Auto.id)
+
+class ArchivoFoto(db.Model):
+    """Contenido de una foto guardado una sola vez (el nombre del archivo es su SHA-256)"""
+    hash = db.Column(db.String(64), primary_key=True)
+    ruta_archivo = db.Column(db.String(255), nullable=False)  # Relativa a static
+    tamanio = db.Column(db.Integer)  # Bytes
+    referencias = db.Column(db.Integer, nullable=False, default=0)  # FotoAuto que lo usan (lo mantienen los eventos)
+
+    def __repr__(self):
+        return f'<ArchivoFoto {self.hash[:12]} x{self.referencias}>'
 
 class FotoAuto(db.Model):
+    __table_args__ = (
+        db.Index('ix_foto_auto_auto_id', 'auto_id', 'orden'),  # Fotos de un auto, en orden
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     auto_id = db.Column(db.Integer, db.ForeignKey('auto.id'), nullable=False)
     ruta_archivo = db.Column(db.String(255), nullable=False)  # Ruta al archivo de imagen
+    archivo_hash = db.Column(db.String(64), db.ForeignKey('archivo_foto.hash'), index=True)  # None en fotos anteriores al almacén por hash
     es_principal = db.Column(db.Boolean, default=False)  # Indica si es la foto principal
     orden = db.Column(db.Integer, default=0)  # Orden para mostrar en el carrusel
     fecha_subida = db.Column(db.DateTime, default=datetime.utcnow)
+    variantes = db.Column(db.JSON(none_as_null=True))  # Tamaños reducidos en WebP y JPEG (ver utils.imagenes); None = solo el original
+    # Procesamiento en segundo plano (utils.procesamiento_fotos); las fotos anteriores ya están listas
+    estado = db.Column(db.Enum(EstadoFoto), nullable=False, default=EstadoFoto.LISTA, server_default=EstadoFoto.LISTA.name)
+    procesando_desde = db.Column(db.DateTime)  # Cuándo la tomó un hilo: si el proceso se cae, queda trabada en PROCESANDO
     
     def __repr__(self):
         return f"<Foto {self.id} de Auto {self.auto_id}>"
+    
+    @property
+    def lista(self):
+        """False mientras el archivo todavía se está procesando (aún no está en static)"""
+        return self.estado in (EstadoFoto.LISTA, EstadoFoto.ERROR, None)
+    
+    @validates('ruta_archivo')
+    def normalizar_ruta(self, clave, ruta):
+        # Las rutas se guardan con / para usarlas directamente en URLs (en Windows os.path usa \)
+        return ruta.replace('\\', '/') if ruta else ruta
+
+# Cantidad de FotoAuto que usan cada ArchivoFoto, dentro de la misma transacción del flush.
+# Los archivos sin referencias los borra utils.almacen_fotos.liberar_archivos después del commit.
+def _sumar_referencia(connection, hash_archivo, cantidad):
+    if hash_archivo:
+        tabla = ArchivoFoto.__table__
+        connection.execute(
+            tabla.update().where(tabla.c.hash == hash_archivo).values(referencias=tabla.c.referencias + cantidad)
+        )
+
+@event.listens_for(FotoAuto, 'after_insert')
+def _referencia_nueva(mapper, connection, target):
+    _sumar_referencia(connection, target.archivo_hash, 1)
+
+@event.listens_for(FotoAuto, 'after_update')
+def _referencia_cambiada(mapper, connection, target):
+    historia = inspect(target).attrs.archivo_hash.history
+    if not historia.has_changes():
+        return
+    for anterior in historia.deleted or ():
+        _sumar_referencia(connection, anterior, -1)
+    for nuevo in historia.added or ():
+        _sumar_referencia(connection, nuevo, 1)
+
+@event.listens_for(FotoAuto, 'after_delete')
+def _referencia_eliminada(mapper, connection, target):
+    _sumar_referencia(connection, target.archivo_hash, -1)
 
 class Venta(db.Model):
+    __table_args__ = (
+        db.Index('ix_venta_auto_id', 'auto_id'),  # Ventas de un auto (p. ej. antes de eliminarlo)
+        # Ranking y comisiones: ventas de cada vendedor en un período
+        db.Index('ix_venta_vendedor_fecha', 'vendedor_id', 'fecha_efectiva'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     auto_id = db.Column(db.Integer, db.ForeignKey('auto.id'), nullable=False)
     fecha_seña = db.Column(db.DateTime, nullable=False)
     fecha_venta = db.Column(db.DateTime, nullable=True)
+    fecha_efectiva = db.Column(db.DateTime, index=True)  # fecha_venta o, si falta, fecha_seña (se mantiene sola)
     
     # Datos del cliente
     cliente_nombre = db.Column(db.String(100), nullable=False)
@@ -150,3 +248,206 @@ class Pago(db.Model):
     def __repr__(self):
         return f'<Pago {self.id} de Venta {self.venta_id}: ${self.monto}>'
 
+
+class VentaResumenMensual(db.Model):
+    """Acumulado mensual de ventas, mantenido por los eventos de Venta y Auto"""
+    __tablename__ = 'venta_resumen_mensual'
+    __table_args__ = (
+        db.UniqueConstraint('anio', 'mes', 'moneda', 'vendedor_id', 'marca', name='uq_venta_resumen_mensual'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Clave: mes de la fecha efectiva (fecha_venta o, si falta, fecha_seña)
+    anio = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    moneda = db.Column(db.String(3))
+    vendedor_id = db.Column(db.Integer)  # Sin FK para no bloquear la eliminación de usuarios
+    marca = db.Column(db.String(50))
+
+    # Acumulados
+    cantidad = db.Column(db.Integer, default=0)
+    total_venta = db.Column(db.Float, default=0)  # Suma de precio_venta
+    total_compra = db.Column(db.Float, default=0)  # Suma del precio de compra del auto
+    total_ganancia = db.Column(db.Float, default=0)  # Suma de Venta.ganancia
+    total_comision = db.Column(db.Float, default=0)  # Suma de Venta.monto_comision
+
+    def __repr__(self):
+        return f'<VentaResumenMensual {self.anio}-{self.mes:02d} {self.moneda} {self.marca}>'
+
+# Columnas que modifican el resumen mensual si cambian
+CAMPOS_RESUMEN_VENTA = ('fecha_venta', 'fecha_seña', 'moneda', 'vendedor_id', 'auto_id',
+                        'precio_venta', 'ganancia', 'monto_comision')
+CAMPOS_RESUMEN_AUTO = ('marca', 'precio_compra')
+
+def leer_aportes_resumen(connection, condicion):
+    """Lee de la base el aporte al resumen de las ventas que cumplen la condición"""
+    venta = Venta.__table__
+    auto = Auto.__table__
+    consulta = select(
+        venta.c.fecha_venta, venta.c.fecha_seña, venta.c.moneda, venta.c.vendedor_id, auto.c.marca,
+        venta.c.precio_venta, auto.c.precio_compra, venta.c.ganancia, venta.c.monto_comision
+    ).select_from(venta.outerjoin(auto, venta.c.auto_id == auto.c.id)).where(condicion)
+    return connection.execute(consulta).fetchall()
+
+def acumular_resumen(connection, aportes, signo):
+    """Suma (signo=1) o resta (signo=-1) los aportes en la tabla de resumen"""
+    tabla = VentaResumenMensual.__table__
+    for aporte in aportes:
+        fecha = aporte.fecha_venta or aporte.fecha_seña
+        if fecha is None:
+            continue
+
+        clave = {
+            'anio': fecha.year,
+            'mes': fecha.month,
+            'moneda': aporte.moneda,
+            'vendedor_id': aporte.vendedor_id,
+            'marca': aporte.marca
+        }
+        # IS NULL en lugar de = para las claves vacías (por ejemplo ventas sin vendedor)
+        condicion = and_(*[tabla.c[k] == v if v is not None else tabla.c[k].is_(None)
+                           for k, v in clave.items()])
+        valores = {
+            'cantidad': signo,
+            'total_venta': signo * (aporte.precio_venta or 0),
+            'total_compra': signo * (aporte.precio_compra or 0),
+            'total_ganancia': signo * (aporte.ganancia or 0),
+            'total_comision': signo * (aporte.monto_comision or 0)
+        }
+
+        resultado = connection.execute(
+            tabla.update().where(condicion).values({tabla.c[k]: tabla.c[k] + v for k, v in valores.items()})
+        )
+        if resultado.rowcount == 0:
+            connection.execute(tabla.insert().values(**clave, **valores))
+
+    # Quitar los grupos que quedaron sin ventas
+    if signo < 0:
+        connection.execute(tabla.delete().where(tabla.c.cantidad <= 0))
+
+def _campos_modificados(target, campos):
+    estado = inspect(target)
+    return any(estado.attrs[campo].history.has_changes() for campo in campos)
+
+@event.listens_for(Venta, 'before_insert')
+def _fecha_efectiva_nueva(mapper, connection, target):
+    target.fecha_efectiva = target.fecha_venta or target.fecha_seña
+
+@event.listens_for(Venta, 'before_update')
+def _fecha_efectiva_actualizada(mapper, connection, target):
+    if _campos_modificados(target, ('fecha_venta', 'fecha_seña')):
+        target.fecha_efectiva = target.fecha_venta or target.fecha_seña
+
+# Los eventos before_* restan el aporte anterior (leído de la base antes del UPDATE/DELETE)
+# y los after_* suman el nuevo, todo dentro de la misma transacción del flush.
+# Las operaciones masivas (query.update/delete) no disparan eventos: usar reconstruir_resumen().
+
+@event.listens_for(Venta, 'after_insert')
+def _resumen_venta_insertada(mapper, connection, target):
+    acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.id == target.id), 1)
+
+@event.listens_for(Venta, 'before_update')
+def _resumen_venta_antes_de_actualizar(mapper, connection, target):
+    if _campos_modificados(target, CAMPOS_RESUMEN_VENTA):
+        acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.id == target.id), -1)
+
+@event.listens_for(Venta, 'after_update')
+def _resumen_venta_actualizada(mapper, connection, target):
+    if _campos_modificados(target, CAMPOS_RESUMEN_VENTA):
+        acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.id == target.id), 1)
+
+@event.listens_for(Venta, 'before_delete')
+def _resumen_venta_eliminada(mapper, connection, target):
+    acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.id == target.id), -1)
+
+@event.listens_for(Auto, 'before_update')
+def _resumen_auto_antes_de_actualizar(mapper, connection, target):
+    if _campos_modificados(target, CAMPOS_RESUMEN_AUTO):
+        acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.auto_id == target.id), -1)
+
+@event.listens_for(Auto, 'after_update')
+def _resumen_auto_actualizado(mapper, connection, target):
+    if _campos_modificados(target, CAMPOS_RESUMEN_AUTO):
+        acumular_resumen(connection, leer_aportes_resumen(connection, Venta.__table__.c.auto_id == target.id), 1)
+
+class VersionDatos(db.Model):
+    """Contador de versión por grupo de datos, compartido entre procesos a través de la base"""
+    __tablename__ = 'version_datos'
+
+    nombre = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    actualizado = db.Column(db.DateTime)  # Última modificación (UTC), para Last-Modified
+
+    def __repr__(self):
+        return f'<VersionDatos {self.nombre}={self.version}>'
+
+def incrementar_version(connection, nombre):
+    """Incrementa la versión de un grupo de datos dentro de la transacción en curso"""
+    tabla = VersionDatos.__table__
+    ahora = datetime.utcnow()
+    resultado = connection.execute(
+        tabla.update().where(tabla.c.nombre == nombre).values(version=tabla.c.version + 1, actualizado=ahora)
+    )
+    if resultado.rowcount == 0:
+        connection.execute(tabla.insert().values(nombre=nombre, version=1, actualizado=ahora))
+
+def registrar_version(modelo, nombre):
+    """Hace que cualquier alta, baja o modificación del modelo incremente la versión indicada"""
+    def _incrementar(mapper, connection, target):
+        incrementar_version(connection, nombre)
+
+    for evento in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(modelo, evento, _incrementar)
+
+# Las estadísticas dependen de ventas, autos, pagos y de los datos de los vendedores
+for _modelo in (Venta, Auto, Pago, Usuario):
+    registrar_version(_modelo, 'estadisticas')
+
+# Las facetas del catálogo dependen solo de los autos
+registrar_version(Auto, 'autos')
+
+def version_auto(auto_id):
+    """Nombre de la versión de un auto y sus fotos (para los ETag de sus páginas)"""
+    return f'auto:{auto_id}'
+
+# Las páginas públicas del catálogo dependen de los autos y de sus fotos: cada escritura incrementa
+# la versión global 'catalogo' y la del auto afectado
+def incrementar_catalogo(connection, auto_id):
+    """Incrementa 'catalogo' y la versión del auto (también a mano, después de un UPDATE en lote)"""
+    incrementar_version(connection, 'catalogo')
+    if auto_id is not None:
+        incrementar_version(connection, version_auto(auto_id))
+
+def _incrementar_catalogo(mapper, connection, target):
+    incrementar_catalogo(connection, target.id if isinstance(target, Auto) else target.auto_id)
+
+for _modelo in (Auto, FotoAuto):
+    for _evento in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_modelo, _evento, _incrementar_catalogo)
+
+# Búsqueda de texto completo del catálogo (SQLite FTS5). auto_fts indexa las columnas de auto
+# sin duplicar su contenido (content='auto') y los triggers lo mantienen al día en cada escritura.
+# remove_diacritics hace que "Citroen" encuentre "Citroën".
+DDL_BUSQUEDA_AUTOS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS auto_fts USING fts5("
+    "marca, modelo, color, descripcion, content='auto', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+
+    "CREATE TRIGGER IF NOT EXISTS auto_fts_ai AFTER INSERT ON auto BEGIN "
+    "INSERT INTO auto_fts(rowid, marca, modelo, color, descripcion) "
+    "VALUES (new.id, new.marca, new.modelo, new.color, new.descripcion); END",
+
+    "CREATE TRIGGER IF NOT EXISTS auto_fts_ad AFTER DELETE ON auto BEGIN "
+    "INSERT INTO auto_fts(auto_fts, rowid, marca, modelo, color, descripcion) "
+    "VALUES ('delete', old.id, old.marca, old.modelo, old.color, old.descripcion); END",
+
+    "CREATE TRIGGER IF NOT EXISTS auto_fts_au AFTER UPDATE OF marca, modelo, color, descripcion ON auto BEGIN "
+    "INSERT INTO auto_fts(auto_fts, rowid, marca, modelo, color, descripcion) "
+    "VALUES ('delete', old.id, old.marca, old.modelo, old.color, old.descripcion); "
+    "INSERT INTO auto_fts(rowid, marca, modelo, color, descripcion) "
+    "VALUES (new.id, new.marca, new.modelo, new.color, new.descripcion); END",
+]
+
+for _sentencia in DDL_BUSQUEDA_AUTOS:
+    event.listen(Auto.__table__, 'after_create', DDL(_sentencia).execute_if(dialect='sqlite'))
+event.listen(Auto.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS auto_fts").execute_if(dialect='sqlite'))
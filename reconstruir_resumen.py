@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Reconstruye o verifica la tabla venta_resumen_mensual.
+
+Uso:
+    python reconstruir_resumen.py             # recalcula el resumen desde cero
+    python reconstruir_resumen.py --verificar # solo informa diferencias
+"""
+
+import sys
+from app_final import app
+from utils.resumen_ventas import reconstruir_resumen, verificar_resumen
+
+def main():
+    with app.app_context():
+        if '--verificar' in sys.argv[1:]:
+            diferencias = verificar_resumen()
+            if not diferencias:
+                print("El resumen mensual de ventas es consistente.")
+                return 0
+
+            print(f"Se encontraron {len(diferencias)} diferencias:")
+            for d in diferencias:
+                print(f"- {d['clave']} {d['campo']}: esperado {d['esperado']}, actual {d['actual']}")
+            return 1
+
+        grupos = reconstruir_resumen()
+        print(f"Resumen mensual reconstruido: {grupos} grupos.")
+        return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort, send_from_directory
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort, send_from_directory, send_file
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
-from models import Auto, FotoAuto, db, EstadoAuto, Venta
+from models import Auto, FotoAuto, db, EstadoAuto, Venta, ORDEN_PUBLICACION
+from utils.paginacion import paginar, parametros_pagina
+from utils.busqueda import buscar_autos
+from utils.facetas import obtener_facetas
+from utils.cache_http import respuesta_condicional
+from utils.qr import url_qr, ruta_qr, precalentar_qr
+from utils.similares import autos_similares, sellos_similares
+from utils.imagenes import archivos_foto, url_foto
+from utils.procesamiento_fotos import cola_fotos
 import os
-import uuid
 from datetime import datetime
-import qrcode
-from io import BytesIO
-import base64
+import click
 
 autos_bp = Blueprint('autos', __name__)
 
@@ -16,26 +20,44 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
+def _url_siguiente(endpoint, siguiente):
+    """URL de la página siguiente conservando los filtros actuales"""
+    if not siguiente:
+        return None
+    args = request.args.to_dict()
+    args['cursor'] = siguiente
+    return url_for(endpoint, **args)
+
 @autos_bp.route('/autos')
+@respuesta_condicional(['catalogo'])
 def autos():
     # Obtener parámetros de filtro básicos
     marca = request.args.get('marca')
     
-    # Construir la consulta base - solo autos disponibles para el catálogo
-    query = Auto.query.filter(Auto.estado == EstadoAuto.DISPONIBLE)
+    # Construir la consulta base - solo autos disponibles para el catálogo (fotos principales en lote)
+    query = Auto.query.filter(Auto.estado == EstadoAuto.DISPONIBLE).options(db.selectinload(Auto.foto_principal))
     
     # Aplicar filtros si están presentes
     if marca:
         query = query.filter(Auto.marca == marca)
     
-    # Obtener la lista de autos filtrada
-    autos_lista = query.all()
+    # Búsqueda de texto completo (ordena por relevancia)
+    query, relevancia = buscar_autos(query, request.args.get('q', ''))
+    
+    # Obtener la página de autos filtrada (por relevancia si se buscó, si no los más nuevos primero)
+    orden = [relevancia, Auto.id] if relevancia is not None else [Auto.id]
+    cursor, por_pagina = parametros_pagina(request.args)
+    try:
+        autos_lista, siguiente = paginar(query, orden, cursor, por_pagina)
+    except ValueError:
+        abort(400)
     
-    # Obtener todas las marcas para el filtro
-    marcas = db.session.query(Auto.marca).distinct().all()
-    marcas = [m[0] for m in marcas]  # Convertir a lista simple
+    # Cantidades por marca, año, precio y estado para el filtro (cacheadas por filtros y versión de autos).
+    # Alcance propio: los filtros de este catálogo no son los de app_final
+    facetas = obtener_facetas('catalogo_blueprint', request.args, query)
     
-    return render_template('autos.html', autos=autos_lista, marcas=marcas)
+    return render_template('autos.html', autos=autos_lista, facetas=facetas,
+                          siguiente=_url_siguiente('autos.autos', siguiente))
 
 @autos_bp.route('/autos/stock')
 @login_required
@@ -62,20 +84,28 @@ def stock():
     if precio_max is not None:
         query = query.filter(Auto.precio <= precio_max)
     
-    # Ordenar por fecha de publicación (más recientes primero)
-    query = query.order_by(Auto.fecha_publicacion.desc())
+    # Búsqueda de texto completo (ordena por relevancia)
+    query, relevancia = buscar_autos(query, request.args.get('q', ''))
     
-    # Obtener la lista de autos filtrada
-    autos_lista = query.all()
+    # Sin búsqueda, ordenar por fecha de publicación (más recientes primero); el id desempata y hace
+    # único el cursor. Los autos sin fecha quedan al final
+    if relevancia is not None:
+        orden = [relevancia, Auto.id]
+    else:
+        orden = [ORDEN_PUBLICACION, Auto.id]
+    cursor, por_pagina = parametros_pagina(request.args)
+    try:
+        autos_lista, siguiente = paginar(query, orden, cursor, por_pagina)
+    except ValueError:
+        abort(400)
     
-    # Obtener todas las marcas y estados para los filtros
-    marcas = db.session.query(Auto.marca).distinct().all()
-    marcas = [m[0] for m in marcas]  # Convertir a lista simple
+    # Cantidades por marca y estado para los filtros (cacheadas por filtros y versión de autos)
+    facetas = obtener_facetas('stock', request.args, query)
     
     return render_template('stock.html', 
                           autos=autos_lista, 
-                          marcas=marcas,
-                          estados=[e.value for e in EstadoAuto])
+                          facetas=facetas,
+                          siguiente=_url_siguiente('autos.stock', siguiente))
 
 @autos_bp.route('/autos/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -118,32 +148,29 @@ def nuevo_auto():
         )
         
         db.session.add(auto)
-        db.session.commit()
+        db.session.flush()
         
-        # Procesar fotos
+        # Procesar fotos: quedan pendientes y se procesan en segundo plano después del commit
+        nuevas = []
         fotos = request.files.getlist('fotos')
         if fotos and fotos[0].filename != '':
             for i, foto in enumerate(fotos):
                 if foto and allowed_file(foto.filename):
-                    # Generar nombre único para el archivo
-                    filename = secure_filename(foto.filename)
-                    extension = filename.rsplit('.', 1)[1].lower()
-                    nuevo_filename = f"{uuid.uuid4().hex}.{extension}"
-                    
-                    # Guardar archivo
-                    ruta_guardado = os.path.join(current_app.config['UPLOAD_FOLDER'], 'autos', nuevo_filename)
-                    foto.save(ruta_guardado)
-                    
-                    # Crear registro en la base de datos
+                    # Crear registro en la base de datos y guardar el archivo como pendiente
+                    # (la ruta la fija el almacén según el contenido)
                     foto_auto = FotoAuto(
-                        auto_id=auto.id,
-                        ruta_archivo=f"uploads/autos/{nuevo_filename}",
                         es_principal=(i == 0),  # Primera foto como principal
                         orden=i
                     )
-                    db.session.add(foto_auto)
+                    cola_fotos.guardar_subida(foto, foto_auto)
+                    auto.fotos.append(foto_auto)
+                    nuevas.append(foto_auto)
         
+        # Mantener foto_principal_id
+        db.session.flush()
+        auto.actualizar_foto_principal()
         db.session.commit()
+        cola_fotos.encolar([foto_auto.id for foto_auto in nuevas])
         flash('Auto agregado exitosamente.', 'success')
         return redirect(url_for('autos.ficha', auto_id=auto.id))
     
@@ -171,37 +198,52 @@ def editar_auto(auto_id):
             flash('Año, precio y kilometraje deben ser números.', 'danger')
             return redirect(url_for('autos.editar_auto', auto_id=auto.id))
         
-        # Procesar fotos nuevas
+        # Procesar fotos nuevas: quedan pendientes y se procesan en segundo plano después del commit
+        nuevas = []
         fotos = request.files.getlist('fotos')
         if fotos and fotos[0].filename != '':
             for i, foto in enumerate(fotos):
                 if foto and allowed_file(foto.filename):
-                    # Generar nombre único para el archivo
-                    filename = secure_filename(foto.filename)
-                    extension = filename.rsplit('.', 1)[1].lower()
-                    nuevo_filename = f"{uuid.uuid4().hex}.{extension}"
-                    
-                    # Guardar archivo
-                    ruta_guardado = os.path.join(current_app.config['UPLOAD_FOLDER'], 'autos', nuevo_filename)
-                    foto.save(ruta_guardado)
-                    
-                    # Crear registro en la base de datos
+                    # Crear registro en la base de datos y guardar el archivo como pendiente
                     orden = len(auto.fotos) + i
                     es_principal = not auto.fotos and i == 0  # Primera foto como principal solo si no hay otras
                     
                     foto_auto = FotoAuto(
-                        auto_id=auto.id,
-                        ruta_archivo=f"uploads/autos/{nuevo_filename}",
                         es_principal=es_principal,
                         orden=orden
                     )
-                    db.session.add(foto_auto)
+                    cola_fotos.guardar_subida(foto, foto_auto)
+                    auto.fotos.append(foto_auto)
+                    nuevas.append(foto_auto)
         
+        # Mantener foto_principal_id
+        db.session.flush()
+        auto.actualizar_foto_principal()
         db.session.commit()
+        cola_fotos.encolar([foto_auto.id for foto_auto in nuevas])
         flash('Auto actualizado exitosamente.', 'success')
+        if nuevas:
+            # La página de edición muestra el avance de las fotos
+            return redirect(url_for('autos.editar_auto', auto_id=auto.id))
         return redirect(url_for('autos.ficha', auto_id=auto.id))
     
-    return render_template('editar_auto.html', auto=auto, estados=[e.value for e in EstadoAuto])
+    return render_template('editar_auto.html', auto=auto, estados=[e.value for e in EstadoAuto],
+                           url_estado=url_for('autos.estado_fotos', auto_id=auto.id))
+
+@autos_bp.route('/autos/<int:auto_id>/fotos/estado')
+@login_required
+def estado_fotos(auto_id):
+    # La página de edición lo consulta mientras haya fotos procesándose
+    auto = Auto.query.get_or_404(auto_id)
+    fotos = sorted(auto.fotos, key=lambda f: (f.orden or 0, f.id))
+    return jsonify({
+        'fotos': [{
+            'id': foto.id,
+            'estado': foto.estado.name,
+            'url': url_foto(foto, 'thumb') if foto.lista else None,
+        } for foto in fotos],
+        'pendientes': sum(1 for foto in fotos if not foto.lista),
+    })
 
 @autos_bp.route('/autos/eliminar/<int:auto_id>', methods=['POST'])
 @login_required
@@ -213,12 +255,16 @@ def eliminar_auto(auto_id):
         flash('No se puede eliminar este auto porque tiene ventas asociadas.', 'danger')
         return redirect(url_for('autos.stock'))
     
-    # Eliminar fotos físicas
+    # Eliminar fotos físicas anteriores al almacén por hash (con sus variantes)
+    hashes = [foto.archivo_hash for foto in auto.fotos]
     for foto in auto.fotos:
+        if foto.archivo_hash:
+            continue
         try:
-            ruta_completa = os.path.join(current_app.root_path, 'static', foto.ruta_archivo)
-            if os.path.exists(ruta_completa):
-                os.remove(ruta_completa)
+            for ruta in archivos_foto(foto):
+                ruta_completa = os.path.join(current_app.root_path, 'static', ruta)
+                if os.path.exists(ruta_completa):
+                    os.remove(ruta_completa)
         except Exception as e:
             # Registrar error pero continuar
             print(f"Error al eliminar archivo: {e}")
@@ -226,6 +272,9 @@ def eliminar_auto(auto_id):
     # Eliminar auto (las fotos se eliminarán en cascada)
     db.session.delete(auto)
     db.session.commit()
+    
+    # El contenido compartido se borra solo si no lo usa otro auto
+    cola_fotos.liberar(hashes)
     flash('Auto eliminado exitosamente.', 'success')
     return redirect(url_for('autos.stock'))
 
@@ -235,12 +284,8 @@ def establecer_foto_principal(foto_id):
     foto = FotoAuto.query.get_or_404(foto_id)
     auto = foto.auto
     
-    # Quitar marca de principal de todas las fotos del auto
-    for f in auto.fotos:
-        f.es_principal = False
-    
-    # Establecer la nueva foto principal
-    foto.es_principal = True
+    # Establecer la nueva foto principal (desmarca las demás y actualiza foto_principal_id)
+    auto.actualizar_foto_principal(foto)
     db.session.commit()
     
     flash('Foto principal actualizada.', 'success')
@@ -252,51 +297,39 @@ def eliminar_foto(foto_id):
     foto = FotoAuto.query.get_or_404(foto_id)
     auto_id = foto.auto_id
     
-    # Eliminar archivo físico
-    try:
-        ruta_completa = os.path.join(current_app.root_path, 'static', foto.ruta_archivo)
-        if os.path.exists(ruta_completa):
-            os.remove(ruta_completa)
-    except Exception as e:
-        # Registrar error pero continuar
-        print(f"Error al eliminar archivo: {e}")
-    
-    # Si era la foto principal, establecer otra como principal
-    era_principal = foto.es_principal
+    # Fotos anteriores al almacén por hash: el archivo y sus variantes son solo de esta foto
+    if not foto.archivo_hash:
+        try:
+            for ruta in archivos_foto(foto):
+                ruta_completa = os.path.join(current_app.root_path, 'static', ruta)
+                if os.path.exists(ruta_completa):
+                    os.remove(ruta_completa)
+        except Exception as e:
+            # Registrar error pero continuar
+            print(f"Error al eliminar archivo: {e}")
     
-    # Eliminar registro de la base de datos
-    db.session.delete(foto)
+    # Eliminar registro de la base de datos; si era la principal, pasa a serlo la primera restante
+    hash_archivo = foto.archivo_hash
+    auto = foto.auto
+    auto.fotos.remove(foto)
+    auto.actualizar_foto_principal()
     db.session.commit()
     
-    # Si era principal y hay más fotos, establecer la primera como principal
-    if era_principal:
-        auto = Auto.query.get(auto_id)
-        if auto.fotos:
-            auto.fotos[0].es_principal = True
-            db.session.commit()
+    # El contenido compartido se borra solo si era la última referencia
+    cola_fotos.liberar([hash_archivo])
     
     flash('Foto eliminada exitosamente.', 'success')
     return redirect(url_for('autos.editar_auto', auto_id=auto_id))
 
 @autos_bp.route('/autos/ficha/<int:auto_id>')
+# La franja de similares muestra otros autos: la página depende también de sus versiones
+@respuesta_condicional(sellos_similares)
 def ficha(auto_id):
     auto = Auto.query.get_or_404(auto_id)
     
-    # Generar QR para compartir
+    # QR para compartir (se genera una sola vez por URL y se sirve cacheado)
     url_ficha = url_for('autos.ficha', auto_id=auto.id, _external=True)
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(url_ficha)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffered = BytesIO()
-    img.save(buffered)
-    qr_code = base64.b64encode(buffered.getvalue()).decode("utf-8")
+    qr_url = url_qr(url_ficha)
     
     # URL para compartir en WhatsApp
     whatsapp_text = f"¡Mira este {auto.marca} {auto.modelo} {auto.anio} en nuestra agencia! Precio: ${auto.precio:,.2f}. Más información: {url_ficha}"
@@ -304,25 +337,45 @@ def ficha(auto_id):
     
     return render_template('ficha_auto.html', 
                           auto=auto, 
-                          qr_code=qr_code, 
+                          qr_url=qr_url, 
                           whatsapp_url=whatsapp_url,
-                          url_ficha=url_ficha)
+                          url_ficha=url_ficha,
+                          similares=autos_similares(auto))
+
+@autos_bp.route('/qr/<clave>.png')
+def qr(clave):
+    # El nombre es el hash del contenido: el PNG nunca cambia y puede cachearse un año
+    ruta = ruta_qr(clave)
+    if ruta is None:
+        abort(404)
+    
+    respuesta = send_file(ruta, mimetype='image/png', max_age=31536000, conditional=True)
+    respuesta.cache_control.immutable = True
+    return respuesta
+
+@autos_bp.cli.command('precalentar-qr')
+@click.option('--url-base', required=True, help='URL pública del sitio, p. ej. https://agencia.onrender.com/')
+def precalentar_qr_comando(url_base):
+    """Genera los códigos QR de las fichas de todos los autos disponibles"""
+    # Las URL de las fichas se arman igual que en un request al sitio público
+    with current_app.test_request_context(base_url=url_base):
+        ids = [fila.id for fila in db.session.query(Auto.id).filter(Auto.estado == EstadoAuto.DISPONIBLE)]
+        generados = precalentar_qr(url_for('autos.ficha', auto_id=auto_id, _external=True) for auto_id in ids)
+    click.echo(f"Códigos QR: {generados} generados, {len(ids) - generados} ya existían.")
 
 @autos_bp.route('/autos/api/disponibles')
+@respuesta_condicional(['catalogo'])
 def api_autos_disponibles():
     """API para obtener autos disponibles en formato JSON"""
-    autos = Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE).all()
+    # Fotos principales en una sola consulta adicional
+    autos = Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE)\
+                .options(db.selectinload(Auto.foto_principal)).all()
     resultado = []
     
     for auto in autos:
-        foto = None
-        for f in auto.fotos:
-            if f.es_principal:
-                foto = f.ruta_archivo
-                break
-        if not foto and auto.fotos:
-            foto = auto.fotos[0].ruta_archivo
-            
+        # Variante card si ya está procesada; null mientras la foto todavía no está en static
+        foto = auto.foto_principal
+        
         resultado.append({
             'id': auto.id,
             'marca': auto.marca,
@@ -330,7 +383,7 @@ def api_autos_disponibles():
             'anio': auto.anio,
             'precio': auto.precio,
             'color': auto.color,
-            'foto': url_for('static', filename=foto) if foto else None,
+            'foto': url_foto(foto) if foto and foto.lista else None,
             'ficha_url': url_for('autos.ficha', auto_id=auto.id, _external=True)
         })
     
@@ -1,14 +1,15 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, request, send_file, abort, make_response, current_app
 from flask_login import login_required, current_user
-from models import db, Venta, Usuario, Auto, EstadoPago
+from models import db, Venta, VentaResumenMensual
 from sqlalchemy import extract, func
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import calendar
-import pandas as pd
-import matplotlib.pyplot as plt
-import io
-import base64
 from functools import wraps
+from utils.cache import cache_estadisticas
+from utils.graficos import url_grafico, ruta_grafico
+from utils.reportes import obtener_ranking_vendedores
+from utils.helpers import periodo_desde_args
+from utils.exportacion import consulta_exportacion, filas_exportacion, generar_excel_ventas
 
 stats_bp = Blueprint('estadisticas', __name__)
 
@@ -29,6 +30,14 @@ def dashboard():
     anio_actual = datetime.now().year
     mes_actual = datetime.now().month
     
+    contexto = cache_estadisticas.obtener(
+        ('dashboard', anio_actual, mes_actual),
+        lambda: _contexto_dashboard(anio_actual, mes_actual)
+    )
+    return render_template('estadisticas/dashboard.html', **contexto)
+
+def _contexto_dashboard(anio_actual, mes_actual):
+    """Calcula los datos del dashboard del mes"""
     # Obtener ventas del mes actual
     ventas_mes = Venta.query.filter(
         extract('year', Venta.fecha_seña) == anio_actual,
@@ -71,23 +80,19 @@ def dashboard():
     dias = sorted(ventas_por_dia.keys())
     conteo_ventas = [ventas_por_dia[dia] for dia in dias]
     
-    # Crear gráfico
-    plt.figure(figsize=(10, 4))
-    plt.bar(dias, conteo_ventas)
-    plt.title(f'Ventas por día - {calendar.month_name[mes_actual]} {anio_actual}')
-    plt.xlabel('Día del mes')
-    plt.ylabel('Cantidad de ventas')
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # Convertir gráfico a imagen base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    grafico_ventas_diarias = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close()
-    
-    return render_template(
-        'estadisticas/dashboard.html',
+    # Crear gráfico (se dibuja fuera del request y se sirve desde /estadisticas/chart)
+    grafico_ventas_diarias = url_grafico({
+        'tipo': 'barras',
+        'tamanio': (10, 4),
+        'x': dias,
+        'series': [{'valores': conteo_ventas}],
+        'titulo': f'Ventas por día - {calendar.month_name[mes_actual]} {anio_actual}',
+        'etiqueta_x': 'Día del mes',
+        'etiqueta_y': 'Cantidad de ventas',
+        'grilla': 'y'
+    })
+    
+    return dict(
         total_ventas=total_ventas,
         ingresos_mes=ingresos_mes,
         ganancia_mes=ganancia_mes,
@@ -103,16 +108,21 @@ def ventas_mensuales():
     # Obtener año seleccionado (por defecto el actual)
     anio = request.args.get('anio', type=int, default=datetime.now().year)
     
-    # Consultar ventas por mes para el año seleccionado
+    contexto = cache_estadisticas.obtener(('ventas_mensuales', anio), lambda: _contexto_ventas_mensuales(anio))
+    return render_template('estadisticas/ventas_mensuales.html', **contexto)
+
+def _contexto_ventas_mensuales(anio):
+    """Calcula las series y gráficos de ventas mensuales de un año"""
+    # Consultar ventas por mes para el año seleccionado (desde el resumen mensual)
     ventas_por_mes = db.session.query(
-        extract('month', Venta.fecha_seña).label('mes'),
-        func.count(Venta.id).label('total_ventas'),
-        func.sum(Venta.precio_venta).label('ingresos'),
-        func.sum(Venta.ganancia).label('ganancias')
+        VentaResumenMensual.mes.label('mes'),
+        func.sum(VentaResumenMensual.cantidad).label('total_ventas'),
+        func.sum(VentaResumenMensual.total_venta).label('ingresos'),
+        func.sum(VentaResumenMensual.total_ganancia).label('ganancias')
     ).filter(
-        extract('year', Venta.fecha_seña) == anio
+        VentaResumenMensual.anio == anio
     ).group_by(
-        extract('month', Venta.fecha_seña)
+        VentaResumenMensual.mes
     ).all()
     
     # Preparar datos para la vista
@@ -136,63 +146,46 @@ def ventas_mensuales():
         ganancias[mes_idx] = float(vm.ganancias) if vm.ganancias else 0
     
     # Crear gráfico de barras para ventas mensuales
-    plt.figure(figsize=(12, 6))
-    plt.bar(meses, total_ventas)
-    plt.title(f'Ventas mensuales - {anio}')
-    plt.xlabel('Mes')
-    plt.ylabel('Cantidad de ventas')
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    
-    # Convertir gráfico a imagen base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    grafico_ventas = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close()
+    grafico_ventas = url_grafico({
+        'tipo': 'barras',
+        'x': meses,
+        'series': [{'valores': total_ventas}],
+        'titulo': f'Ventas mensuales - {anio}',
+        'etiqueta_x': 'Mes',
+        'etiqueta_y': 'Cantidad de ventas',
+        'rotacion': 45,
+        'grilla': 'y',
+        'ajustar': True
+    })
     
     # Crear gráfico de líneas para ingresos y ganancias
-    plt.figure(figsize=(12, 6))
-    plt.plot(meses, ingresos, marker='o', label='Ingresos')
-    plt.plot(meses, ganancias, marker='s', label='Ganancias')
-    plt.title(f'Ingresos y Ganancias mensuales - {anio}')
-    plt.xlabel('Mes')
-    plt.ylabel('Monto ($)')
-    plt.xticks(rotation=45)
-    plt.grid(linestyle='--', alpha=0.7)
-    plt.legend()
-    plt.tight_layout()
-    
-    # Convertir gráfico a imagen base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png')
-    buffer.seek(0)
-    grafico_ingresos = base64.b64encode(buffer.getvalue()).decode('utf-8')
-    plt.close()
+    grafico_ingresos = url_grafico({
+        'tipo': 'lineas',
+        'x': meses,
+        'series': [
+            {'nombre': 'Ingresos', 'valores': ingresos, 'marcador': 'o'},
+            {'nombre': 'Ganancias', 'valores': ganancias, 'marcador': 's'}
+        ],
+        'titulo': f'Ingresos y Ganancias mensuales - {anio}',
+        'etiqueta_x': 'Mes',
+        'etiqueta_y': 'Monto ($)',
+        'rotacion': 45,
+        'ajustar': True
+    })
     
     # Obtener años disponibles para el selector
     años_disponibles = db.session.query(
-        extract('year', Venta.fecha_seña).distinct()
+        VentaResumenMensual.anio.distinct()
     ).order_by(
-        extract('year', Venta.fecha_seña).desc()
+        VentaResumenMensual.anio.desc()
     ).all()
     
-    # Manejar la conversión de años de manera segura
-    años_disponibles_list = []
-    for año in años_disponibles:
-        if año[0] is not None:
-            try:
-                años_disponibles_list.append(int(año[0]))
-            except (ValueError, TypeError):
-                # Si no se puede convertir a int, registrar y continuar
-                print(f"No se pudo convertir {año[0]} a entero, tipo: {type(año[0])}")
+    años_disponibles_list = [año[0] for año in años_disponibles]
     
     if not años_disponibles_list:
         años_disponibles_list = [datetime.now().year]
     
-    return render_template(
-        'estadisticas/ventas_mensuales.html',
+    return dict(
         meses=meses,
         total_ventas=total_ventas,
         ingresos=ingresos,
@@ -207,59 +200,55 @@ def ventas_mensuales():
 @login_required
 @admin_required
 def comisiones_vendedores():
-    # Obtener período seleccionado
-    anio = request.args.get('anio', type=int, default=datetime.now().year)
-    mes = request.args.get('mes', type=int, default=datetime.now().month)
-    
-    # Consultar comisiones por vendedor para el período seleccionado
-    vendedores_comisiones = db.session.query(
-        Usuario,
-        func.count(Venta.id).label('total_ventas'),
-        func.sum(Venta.monto_comision).label('total_comision')
-    ).join(
-        Venta, Usuario.id == Venta.vendedor_id
-    ).filter(
-        extract('year', Venta.fecha_seña) == anio,
-        extract('month', Venta.fecha_seña) == mes if mes else True,
-        Usuario.rol == 'vendedor'
-    ).group_by(
-        Usuario.id
-    ).all()
+    # Obtener período seleccionado (mes, trimestre, anio o rango)
+    try:
+        periodo, inicio, fin = periodo_desde_args(request.args, periodo_defecto='mes')
+    except ValueError:
+        abort(400)
+    
+    contexto = cache_estadisticas.obtener(
+        ('comisiones', periodo, inicio, fin),
+        lambda: _contexto_comisiones(periodo, inicio, fin)
+    )
+    return render_template('estadisticas/comisiones.html', **contexto)
+
+def _contexto_comisiones(periodo, inicio, fin):
+    """Calcula las comisiones por vendedor del período"""
+    # Los selectores salen del período (que es la clave del cache), no de los argumentos crudos
+    referencia = inicio or datetime.now()
+    anio, mes = referencia.year, referencia.month
+
+    # Ranking del período ordenado por total de comisiones (mayor a menor), en una sola consulta
+    ranking = obtener_ranking_vendedores(inicio, fin, roles=('vendedor',), orden='comision')
     
     # Preparar datos para la vista
     datos_vendedores = []
-    for v, total_ventas, total_comision in vendedores_comisiones:
+    for v in ranking:
         datos_vendedores.append({
-            'id': v.id,
-            'nombre': f"{v.nombre} {v.apellido}",
-            'total_ventas': total_ventas,
-            'porcentaje_comision': v.porcentaje_comision,
-            'total_comision': float(total_comision) if total_comision else 0
+            'id': v['id'],
+            'posicion': v['posicion'],
+            'nombre': v['nombre'],
+            'total_ventas': v['ventas'],
+            'porcentaje_comision': v['porcentaje_comision'],
+            'total_comision': float(v['comision'])
         })
     
-    # Ordenar por total de comisiones (mayor a menor)
-    datos_vendedores.sort(key=lambda x: x['total_comision'], reverse=True)
-    
     # Crear gráfico de barras para comisiones
     if datos_vendedores:
         nombres = [v['nombre'] for v in datos_vendedores]
         comisiones = [v['total_comision'] for v in datos_vendedores]
         
-        plt.figure(figsize=(12, 6))
-        plt.bar(nombres, comisiones)
-        plt.title(f'Comisiones por vendedor - {calendar.month_name[mes] if mes else "Todo el año"} {anio}')
-        plt.xlabel('Vendedor')
-        plt.ylabel('Comisión ($)')
-        plt.xticks(rotation=45)
-        plt.grid(axis='y', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        
-        # Convertir gráfico a imagen base64
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png')
-        buffer.seek(0)
-        grafico_comisiones = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        plt.close()
+        grafico_comisiones = url_grafico({
+            'tipo': 'barras',
+            'x': nombres,
+            'series': [{'valores': comisiones}],
+            'titulo': f'Comisiones por vendedor - {_titulo_periodo(periodo, inicio, fin)}',
+            'etiqueta_x': 'Vendedor',
+            'etiqueta_y': 'Comisión ($)',
+            'rotacion': 45,
+            'grilla': 'y',
+            'ajustar': True
+        })
     else:
         grafico_comisiones = None
     
@@ -278,14 +267,14 @@ def comisiones_vendedores():
                 años_disponibles_list.append(int(año[0]))
             except (ValueError, TypeError):
                 # Si no se puede convertir a int, registrar y continuar
-                print(f"No se pudo convertir {año[0]} a entero, tipo: {type(año[0])}")
+                current_app.logger.debug(f"No se pudo convertir {año[0]} a entero, tipo: {type(año[0])}")
     
     if not años_disponibles_list:
         años_disponibles_list = [datetime.now().year]
     
-    return render_template(
-        'estadisticas/comisiones.html',
+    return dict(
         vendedores=datos_vendedores,
+        periodo_seleccionado=periodo,
         anio_seleccionado=anio,
         mes_seleccionado=mes,
         años_disponibles=años_disponibles_list,
@@ -293,54 +282,69 @@ def comisiones_vendedores():
         grafico_comisiones=grafico_comisiones
     )
 
+def _titulo_periodo(periodo, inicio, fin):
+    """Descripción legible del período para los títulos"""
+    if periodo == 'total':
+        return 'Todo el historial'
+    if periodo == 'mes':
+        return f'{calendar.month_name[inicio.month]} {inicio.year}'
+    if periodo == 'trimestre':
+        return f'T{(inicio.month - 1) // 3 + 1} {inicio.year}'
+    if periodo == 'anio':
+        return f'{inicio.year}'
+    return f"{inicio:%d/%m/%Y} - {fin - timedelta(days=1):%d/%m/%Y}"
+
+@stats_bp.route('/chart/<clave>.png')
+@login_required
+def grafico(clave):
+    # El nombre es el hash del contenido: el PNG nunca cambia y el navegador puede guardarlo un año
+    try:
+        ruta = ruta_grafico(clave)
+    except Exception as e:
+        # Pool ocupado (timeout) o error al dibujar: el trabajo se vuelve a encolar en el próximo pedido
+        current_app.logger.warning(f"No se pudo dibujar el gráfico {clave}: {e!r}")
+        respuesta = make_response('Gráfico todavía no disponible', 503)
+        respuesta.headers['Retry-After'] = '5'
+        return respuesta
+    if ruta is None:
+        abort(404)
+    
+    respuesta = send_file(ruta, mimetype='image/png', max_age=31536000, conditional=True)
+    respuesta.cache_control.public = False
+    respuesta.cache_control.private = True
+    respuesta.cache_control.immutable = True
+    return respuesta
+
 @stats_bp.route('/estadisticas/exportar-excel')
 @login_required
 @admin_required
 def exportar_excel():
-    # Obtener período seleccionado
-    anio = request.args.get('anio', type=int, default=datetime.now().year)
+    # Obtener período seleccionado (un año por defecto; periodo=rango permite abarcar varios años)
+    try:
+        periodo, inicio, fin = periodo_desde_args(request.args, periodo_defecto='anio')
+    except ValueError:
+        abort(400)
     
-    # Consultar ventas para el año seleccionado
-    ventas = Venta.query.filter(
-        extract('year', Venta.fecha_seña) == anio
-    ).all()
+    filtros = []
+    if inicio is not None:
+        filtros += [Venta.fecha_efectiva >= inicio, Venta.fecha_efectiva < fin]
     
-    # Crear DataFrame con los datos
-    datos = []
-    for v in ventas:
-        vendedor = f"{v.vendedor.nombre} {v.vendedor.apellido}" if v.vendedor else "Sin vendedor"
-        auto = f"{v.auto.marca} {v.auto.modelo} ({v.auto.anio})" if v.auto else "Auto no disponible"
-        
-        datos.append({
-            'ID': v.id,
-            'Fecha Seña': v.fecha_seña,
-            'Fecha Venta': v.fecha_venta,
-            'Auto': auto,
-            'Cliente': f"{v.cliente_nombre} {v.cliente_apellido}",
-            'Vendedor': vendedor,
-            'Precio Compra': v.precio_compra,
-            'Precio Venta': v.precio_venta,
-            'Seña': v.monto_seña,
-            'Saldo': v.saldo_restante,
-            'Estado': v.estado_pago.value if v.estado_pago else "Desconocido",
-            'Ganancia': v.ganancia,
-            'Comisión': v.monto_comision
-        })
+    # Una sola consulta leída por lotes, escrita en modo write-only a un archivo temporal
+    nombre = _nombre_periodo(periodo, inicio, fin)
+    archivo = generar_excel_ventas(filas_exportacion(consulta_exportacion(*filtros)), f'Ventas {nombre}')
     
-    # Crear Excel
-    df = pd.DataFrame(datos)
-    
-    # Guardar a un buffer en memoria
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name=f'Ventas {anio}', index=False)
-    
-    output.seek(0)
-    
-    # Devolver el archivo para descarga
+    # Devolver el archivo para descarga (se envía por partes desde el temporal)
     return send_file(
-        output,
+        archivo,
         mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True,
-        download_name=f'ventas_{anio}.xlsx'
+        download_name=f'ventas_{nombre}.xlsx'
     )
+
+def _nombre_periodo(periodo, inicio, fin):
+    """Sufijo del archivo exportado según el período"""
+    if periodo == 'total':
+        return 'historico'
+    if periodo == 'anio':
+        return f'{inicio.year}'
+    return f"{inicio:%Y%m%d}-{fin - timedelta(days=1):%Y%m%d}"
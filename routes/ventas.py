@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from models import Auto, Venta, db
+from utils.qr import generar_png
 from datetime import datetime, date
+import os
+import tempfile
 from sqlalchemy import extract
 
 ventas_bp = Blueprint('ventas', __name__)
@@ -318,24 +321,16 @@ def generar_recibo(venta_id):
     pdf.cell(95, 6, 'Firma del Cliente', 0, 0, 'C')
     pdf.cell(95, 6, 'Firma del Vendedor', 0, 1, 'C')
     
-    # Generar QR con el ID de la venta
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
+    # QR con el ID de la venta. Lleva datos del cliente: no va al almacén público de utils.qr,
+    # se genera en memoria y pasa a fpdf (que lee imágenes de disco) por un temporal privado
     qr_data = f"ID Venta: {venta.id}, Cliente: {venta.cliente_nombre} {venta.cliente_apellido}, Fecha: {venta.fecha_seña.strftime('%d/%m/%Y')}"
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    img_path = os.path.join(current_app.root_path, 'static', 'temp', f'qr_{venta.id}.png')
-    os.makedirs(os.path.dirname(img_path), exist_ok=True)
-    img.save(img_path)
-    
-    # Agregar QR al PDF
-    pdf.image(img_path, x=85, y=240, w=40)
+    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as img:
+        img.write(generar_png(qr_data))
+    try:
+        # Agregar QR al PDF (fpdf lee el archivo en este momento)
+        pdf.image(img.name, x=85, y=240, w=40)
+    finally:
+        os.remove(img.name)
     pdf.set_font('Arial', '', 8)
     pdf.set_xy(0, 280)
     pdf.cell(210, 10, 'Este documento es un comprobante de pago.', 0, 1, 'C')
@@ -345,12 +340,6 @@ def generar_recibo(venta_id):
     pdf.output(pdf_buffer)
     pdf_buffer.seek(0)
     
-    # Eliminar archivo temporal del QR
-    try:
-        os.remove(img_path)
-    except:
-        pass
-    
     # Devolver PDF como descarga
     return send_file(
         pdf_buffer,
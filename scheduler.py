@@ -40,6 +40,26 @@ def run_protection_script():
     except Exception as e:
         logger.error(f"Error inesperado: {e}")
 
+def run_photo_cleanup():
+    """Borra una tanda de archivos huérfanos (el resto queda para la próxima ejecución).
+
+    Las fotos sin archivo solo se informan: borrarlas requiere correr a mano --borrar-colgadas.
+    """
+    logger.info("Ejecutando limpieza de fotos huérfanas...")
+    try:
+        result = subprocess.run(
+            ["python", "limpiar_fotos.py", "--borrar"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        logger.info(f"Limpieza de fotos ejecutada exitosamente: {result.stdout}")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"Error al ejecutar la limpieza de fotos: {e}")
+        logger.error(f"Salida de error: {e.stderr}")
+    except Exception as e:
+        logger.error(f"Error inesperado: {e}")
+
 def main():
     """Función principal del scheduler."""
     logger.info("Iniciando scheduler de protección de usuarios...")
@@ -59,6 +79,9 @@ def main():
             
             # Ejecutar el script de protección
             run_protection_script()
+            
+            # Limpieza incremental de fotos huérfanas
+            run_photo_cleanup()
     except KeyboardInterrupt:
         logger.info("Scheduler detenido por el usuario")
     except Exception as e:
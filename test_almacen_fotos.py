@@ -0,0 +1,157 @@
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+from app_final import app, db
+from models import Auto, FotoAuto, ArchivoFoto, EstadoAuto
+from utils.cache_http import cache_paginas
+from utils.procesamiento_fotos import cola_fotos
+from utils.almacen_fotos import hash_archivo
+from utils.imagenes import archivos_foto
+import deduplicar_fotos
+from test_procesamiento_fotos import EjecutorManual
+
+def imagen_bytes(color=(30, 30, 200)):
+    datos = io.BytesIO()
+    Image.new('RGB', (800, 600), color).save(datos, 'JPEG')
+    return datos.getvalue()
+
+class AlmacenFotosTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.temporal = tempfile.mkdtemp()
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.temporal, 'fotos.db')
+        self.app = app.test_client()
+        cache_paginas.limpiar()
+
+        self.static_original = app.static_folder
+        app.static_folder = self.static = os.path.join(self.temporal, 'static')
+        self.pendientes = os.path.join(self.temporal, 'pendientes')
+        self.ejecutor = EjecutorManual()
+        cola_fotos.configurar(app, self.pendientes, ejecutor=self.ejecutor)
+
+        with app.app_context():
+            db.create_all()
+            for modelo in ('Cronos', 'Argo'):
+                db.session.add(Auto(marca='Fiat', modelo=modelo, anio=2020, precio=1000.0, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        app.static_folder = self.static_original
+        cola_fotos.configurar(app, app.config['FOTOS_PENDIENTES_DIR'], hilos=app.config['FOTOS_HILOS'])
+        shutil.rmtree(self.temporal)
+
+    def _subir(self, auto_id, *archivos):
+        modelo = 'Cronos' if auto_id == 1 else 'Argo'
+        self.app.post(f'/auto/{auto_id}/editar', data={
+            'marca': 'Fiat', 'modelo': modelo, 'anio': '2020', 'precio': '1000', 'kilometraje': '0',
+            'fotos': [(io.BytesIO(contenido), nombre) for nombre, contenido in archivos],
+        }, content_type='multipart/form-data')
+        self.ejecutor.ejecutar()
+
+    def _archivos(self):
+        return sorted(os.path.relpath(os.path.join(raiz, nombre), self.static)
+                      for raiz, _, nombres in os.walk(self.static) for nombre in nombres)
+
+    def test_misma_foto_se_guarda_una_vez(self):
+        contenido = imagen_bytes()
+        self._subir(1, ('Pick-up.jpg', contenido))
+        self._subir(2, ('Pick-up (copia).jpg', contenido))
+        with app.app_context():
+            archivo = ArchivoFoto.query.one()
+            self.assertEqual(archivo.referencias, 2)
+            self.assertEqual(archivo.tamanio, len(contenido))
+            self.assertTrue(archivo.ruta_archivo.startswith(f'uploads/fotos/{archivo.hash[:2]}/{archivo.hash}'))
+            self.assertEqual({foto.ruta_archivo for foto in FotoAuto.query}, {archivo.ruta_archivo})
+            self.assertEqual(hash_archivo(os.path.join(self.static, archivo.ruta_archivo)), archivo.hash)
+        # Un original y sus variantes, sin copias
+        self.assertEqual(len(self._archivos()), 7)
+        self.assertEqual(os.listdir(self.pendientes), [])
+
+    def test_eliminar_foto_conserva_el_archivo_compartido(self):
+        contenido = imagen_bytes()
+        self._subir(1, ('a.jpg', contenido))
+        self._subir(2, ('a.jpg', contenido))
+        with app.app_context():
+            primera, segunda = FotoAuto.query.order_by(FotoAuto.id).all()
+            primera_id, segunda_id = primera.id, segunda.id
+            rutas = archivos_foto(primera)
+
+        self.app.post(f'/auto/1/fotos/eliminar/{primera_id}')
+        with app.app_context():
+            self.assertEqual(ArchivoFoto.query.one().referencias, 1)
+        for ruta in rutas:
+            self.assertTrue(os.path.exists(os.path.join(self.static, ruta)))
+
+        self.app.post(f'/auto/2/fotos/eliminar/{segunda_id}')
+        with app.app_context():
+            self.assertEqual(ArchivoFoto.query.count(), 0)
+        self.assertEqual(self._archivos(), [])
+
+    def test_borra_los_archivos_antes_de_confirmar_la_baja(self):
+        self._subir(1, ('a.jpg', imagen_bytes()))
+        with app.app_context():
+            foto_id = FotoAuto.query.one().id
+
+        # Desde otra conexión la fila sigue visible mientras se borran los archivos: una subida
+        # del mismo contenido espera al commit en lugar de reutilizar un archivo que se está borrando
+        base = os.path.join(self.temporal, 'fotos.db')
+        filas_visibles = []
+        remove = os.remove
+        def borrar(ruta):
+            with sqlite3.connect(base) as conexion:
+                filas_visibles.append(conexion.execute('SELECT COUNT(*) FROM archivo_foto').fetchone()[0])
+            remove(ruta)
+        with mock.patch('utils.almacen_fotos.os.remove', side_effect=borrar):
+            self.app.post(f'/auto/1/fotos/eliminar/{foto_id}')
+
+        self.assertTrue(filas_visibles)
+        self.assertEqual(set(filas_visibles), {1})
+        with app.app_context():
+            self.assertEqual(ArchivoFoto.query.count(), 0)
+        self.assertEqual(self._archivos(), [])
+
+    def test_eliminar_auto_libera_solo_lo_que_no_se_comparte(self):
+        compartida, propia = imagen_bytes(), imagen_bytes((200, 30, 30))
+        self._subir(1, ('a.jpg', compartida), ('b.jpg', propia))
+        self._subir(2, ('a.jpg', compartida))
+
+        self.app.post('/autos/eliminar/1')
+        with app.app_context():
+            archivo = ArchivoFoto.query.one()
+            self.assertEqual(archivo.referencias, 1)
+            self.assertEqual(FotoAuto.query.one().archivo_hash, archivo.hash)
+        self.assertEqual(len(self._archivos()), 7)
+
+    def test_deduplica_las_fotos_anteriores(self):
+        contenido = imagen_bytes()
+        with app.app_context():
+            for auto_id in (1, 2):
+                ruta = f'uploads/autos/{auto_id}/{auto_id}_Pick-up.jpg'
+                os.makedirs(os.path.dirname(os.path.join(self.static, ruta)))
+                with open(os.path.join(self.static, ruta), 'wb') as archivo:
+                    archivo.write(contenido)
+                db.session.add(FotoAuto(auto_id=auto_id, ruta_archivo=ruta))
+            db.session.commit()
+
+            deduplicar_fotos.main()
+
+            archivo = ArchivoFoto.query.one()
+            self.assertEqual(archivo.referencias, 2)
+            self.assertEqual({foto.archivo_hash for foto in FotoAuto.query}, {archivo.hash})
+        self.assertEqual(self._archivos(), [archivo.ruta_archivo])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from sqlalchemy import text
+from app_final import app, db
+from models import Auto, EstadoAuto
+from utils.busqueda import buscar_autos, expresion_fts
+from utils.migraciones import aplicar_migraciones
+from routes.autos import autos_bp
+
+class BusquedaTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Auto(marca='Peugeot', modelo='208', anio=2020, precio=1000.0, color='Gris',
+                     descripcion='Motor nafta, único dueño', estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Citroën', modelo='C3', anio=2019, precio=900.0, color='Blanco',
+                     descripcion='Diésel, service al día', estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Peugeot', modelo='308', anio=2018, precio=800.0, color='Negro',
+                     descripcion='Impecable', estado=EstadoAuto.DISPONIBLE),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _modelos(self, texto):
+        query, relevancia = buscar_autos(Auto.query, texto)
+        if relevancia is not None:
+            query = query.order_by(relevancia.desc(), Auto.id)
+        return [auto.modelo for auto in query]
+
+    def test_expresion_fts(self):
+        self.assertEqual(expresion_fts('Peugeot 208'), '"Peugeot"* "208"*')
+        self.assertEqual(expresion_fts('"OR (NEAR'), '"OR"* "NEAR"*')
+        self.assertEqual(expresion_fts('  '), '')
+
+    def test_busca_en_todas_las_columnas_sin_acentos(self):
+        with app.app_context():
+            self.assertEqual(self._modelos('peugeot 208 nafta'), ['208'])
+            self.assertEqual(self._modelos('citroen'), ['C3'])
+            self.assertEqual(self._modelos('diesel blanco'), ['C3'])
+            self.assertEqual(sorted(self._modelos('peug')), ['208', '308'])
+            self.assertEqual(self._modelos(''), ['208', 'C3', '308'])
+
+    def test_los_triggers_mantienen_el_indice(self):
+        with app.app_context():
+            auto = Auto.query.filter_by(modelo='308').first()
+            auto.descripcion = 'Con techo solar'
+            db.session.commit()
+            self.assertEqual(self._modelos('techo'), ['308'])
+            self.assertEqual(self._modelos('impecable'), [])
+
+            db.session.delete(auto)
+            db.session.commit()
+            self.assertEqual(self._modelos('techo'), [])
+
+    def test_migracion_crea_y_llena_el_indice(self):
+        with app.app_context():
+            db.session.execute(text("DROP TABLE auto_fts"))
+            db.session.commit()
+
+            aplicar_migraciones()
+            aplicar_migraciones()
+            self.assertEqual(self._modelos('citroen'), ['C3'])
+
+    def test_catalogo_ordenado_por_relevancia(self):
+        with app.app_context():
+            datos = self.app.get('/api/autos?q=peugeot+208').get_json()
+            self.assertEqual([auto['modelo'] for auto in datos['autos']], ['208'])
+
+            datos = self.app.get('/api/autos?q=peugeot&por_pagina=1').get_json()
+            self.assertEqual(len(datos['autos']), 1)
+            siguiente = self.app.get(datos['siguiente']).get_json()
+            self.assertEqual(len(siguiente['autos']), 1)
+            self.assertNotEqual(datos['autos'][0]['id'], siguiente['autos'][0]['id'])
+            self.assertIsNone(siguiente['siguiente'])
+
+            respuesta = self.app.get('/autos?q=citro%C3%ABn')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertIn(b'C3', respuesta.data)
+            self.assertNotIn(b'308', respuesta.data)
+
+class BusquedaBlueprintTests(unittest.TestCase):
+    # Catálogo del blueprint (app_factory) sobre una aplicación mínima; la plantilla no se arma
+    def setUp(self):
+        self.app = Flask('agencia')
+        self.app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:',
+                               SQLALCHEMY_TRACK_MODIFICATIONS=False, PAGINA_TAMANIO=24)
+        db.init_app(self.app)
+        self.app.register_blueprint(autos_bp, url_prefix='/autos')
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Auto(marca='Peugeot', modelo='208', anio=2020, precio=1000.0, descripcion='Peugeot 208 nafta',
+                     estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Citroën', modelo='C3', anio=2019, precio=900.0, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Peugeot', modelo='308', anio=2018, precio=800.0, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Peugeot', modelo='408', anio=2021, precio=1200.0, estado=EstadoAuto.VENDIDO),
+            ])
+            db.session.commit()
+
+        self.render = mock.patch('routes.autos.render_template', return_value='').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _pagina(self, url):
+        respuesta = self.app.test_client().get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        contexto = self.render.call_args[1]
+        return [auto.modelo for auto in contexto['autos']], contexto['siguiente']
+
+    def test_catalogo_filtra_y_ordena_por_relevancia(self):
+        modelos, siguiente = self._pagina('/autos/autos?q=peugeot+208')
+        self.assertEqual(modelos, ['208'])
+        self.assertIsNone(siguiente)
+
+        # Paginación por cursor sobre (relevancia, id) en el mismo orden que la búsqueda; el vendido no aparece
+        with self.app.app_context():
+            query, relevancia = buscar_autos(Auto.query.filter(Auto.estado == EstadoAuto.DISPONIBLE), 'peugeot')
+            esperados = [auto.modelo for auto in query.order_by(relevancia.desc(), Auto.id.desc())]
+        self.assertEqual(sorted(esperados), ['208', '308'])
+
+        primera, siguiente = self._pagina('/autos/autos?q=peugeot&por_pagina=1')
+        self.assertIn('q=peugeot', siguiente)
+        segunda, siguiente = self._pagina(siguiente)
+        self.assertEqual(primera + segunda, esperados)
+        self.assertIsNone(siguiente)
+
+        modelos, _ = self._pagina('/autos/autos')
+        self.assertEqual(modelos, ['308', 'C3', '208'])
+
+if __name__ == '__main__':
+    unittest.main()
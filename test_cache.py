@@ -0,0 +1,87 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import text
+from app_final import app, db
+from models import Auto, Venta, Pago, EstadoAuto, EstadoPago
+from utils.cache import CacheVersionada, cache_estadisticas, obtener_version
+
+class CacheVersionadaTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        cache_estadisticas.limpiar()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Auto(marca='Ford', modelo='Ka', anio=2019, precio=100.0, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_hits_misses_y_lru(self):
+        cache = CacheVersionada('estadisticas', max_entradas=2)
+        with app.app_context():
+            self.assertEqual(cache.obtener(('a',), lambda: 1), 1)
+            self.assertEqual(cache.obtener(('a',), lambda: 2), 1)
+            cache.obtener(('b',), lambda: 3)
+            cache.obtener(('a',), lambda: 4)  # 'a' pasa a ser la más reciente
+            cache.obtener(('c',), lambda: 5)  # Desaloja 'b'
+
+            self.assertEqual(cache.obtener(('a',), lambda: 6), 1)
+            self.assertEqual(cache.obtener(('b',), lambda: 7), 7)
+
+            stats = cache.estadisticas()
+            self.assertEqual((stats['hits'], stats['misses'], stats['entradas']), (3, 4, 2))
+
+    def test_escrituras_invalidan(self):
+        cache = CacheVersionada('estadisticas')
+        with app.app_context():
+            version = obtener_version('estadisticas')
+            cache.obtener(('x',), lambda: 'viejo')
+
+            auto = Auto.query.first()
+            venta = Venta(auto_id=auto.id, fecha_seña=datetime.now(), cliente_nombre='A', cliente_apellido='B',
+                          precio_venta=100.0, estado_pago=EstadoPago.SEÑADO)
+            db.session.add(venta)
+            db.session.commit()
+            self.assertGreater(obtener_version('estadisticas'), version)
+            self.assertEqual(cache.obtener(('x',), lambda: 'nuevo'), 'nuevo')
+
+            db.session.add(Pago(venta_id=venta.id, monto=10.0))
+            db.session.commit()
+            self.assertEqual(cache.obtener(('x',), lambda: 'pago'), 'pago')
+
+            auto.precio = 200.0
+            db.session.commit()
+            self.assertEqual(cache.obtener(('x',), lambda: 'auto'), 'auto')
+
+    def test_version_cambiada_por_otro_proceso(self):
+        cache = CacheVersionada('estadisticas')
+        with app.app_context():
+            cache.obtener(('x',), lambda: 'viejo')
+
+            # Otro worker incrementa la versión directamente en la base
+            db.session.execute(text("UPDATE version_datos SET version = 41 WHERE nombre = 'estadisticas'"))
+            db.session.commit()
+
+            self.assertEqual(cache.obtener(('x',), lambda: 'nuevo'), 'nuevo')
+            self.assertEqual(cache.estadisticas()['version'], 41)
+
+    def test_pagina_estadisticas_usa_la_cache(self):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+        with app.app_context():
+            self.assertEqual(cliente.get('/estadisticas').status_code, 200)
+            self.assertEqual(cliente.get('/estadisticas').status_code, 200)
+
+            stats = cliente.get('/estadisticas/cache').get_json()
+            self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
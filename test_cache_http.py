@@ -0,0 +1,170 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+from sqlalchemy import text
+import app_final
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, FotoAuto, EstadoAuto, VersionDatos
+from utils.migraciones import aplicar_migraciones
+from utils.cache_http import CacheRespuestas, cache_paginas
+
+class CacheHttpTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+        cache_paginas.limpiar()
+
+        with app.app_context():
+            db.create_all()
+            for modelo in ('Uno', 'Palio'):
+                db.session.add(Auto(marca='Fiat', modelo=modelo, anio=2015, precio=1000.0, estado=EstadoAuto.DISPONIBLE,
+                                    url_compartir='http://localhost/auto'))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, url, **headers):
+        with app.app_context(), mock.patch.object(app_final, 'render_template', wraps=app_final.render_template) as render:
+            with ContadorConsultas(db.engine) as contador:
+                respuesta = self.app.get(url, headers=headers)
+        return respuesta, contador.sentencias, render.call_count
+
+    def _modificar(self, auto_id, **cambios):
+        with app.app_context():
+            auto = Auto.query.get(auto_id)
+            for campo, valor in cambios.items():
+                setattr(auto, campo, valor)
+            db.session.commit()
+
+    def test_catalogo_responde_304_sin_orm_ni_plantillas(self):
+        respuesta, _, plantillas = self._get('/autos')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(plantillas, 1)
+        etag, _ = respuesta.get_etag()
+        self.assertEqual(respuesta.headers['Cache-Control'], 'public, no-cache')
+        self.assertIsNotNone(respuesta.last_modified)
+        self.assertIn('Cookie', respuesta.vary)
+
+        respuesta, sentencias, plantillas = self._get('/autos', **{'If-None-Match': f'"{etag}"'})
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.get_etag()[0], etag)
+        self.assertEqual(plantillas, 0)
+        self.assertEqual(len(sentencias), 1)
+        self.assertIn('version_datos', sentencias[0])
+
+        # Otra URL u otro usuario tienen otro ETag
+        self.assertNotEqual(self._get('/autos?marca=fiat')[0].get_etag()[0], etag)
+
+        self._modificar(1, precio=2000.0)
+        respuesta, _, _ = self._get('/autos', **{'If-None-Match': f'"{etag}"'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta.get_etag()[0], etag)
+
+    def test_version_por_auto(self):
+        respuesta, _, _ = self._get('/auto/1')
+        etag = respuesta.get_etag()[0]
+        self.assertEqual(self._get('/auto/1', **{'If-None-Match': f'"{etag}"'})[0].status_code, 304)
+
+        # Cambiar otro auto también la invalida: puede cambiar la franja de autos similares
+        self._modificar(2, precio=3000.0)
+        respuesta = self._get('/auto/1', **{'If-None-Match': f'"{etag}"'})[0]
+        self.assertEqual(respuesta.status_code, 200)
+        etag = respuesta.get_etag()[0]
+        self.assertEqual(self._get('/auto/1', **{'If-None-Match': f'"{etag}"'})[0].status_code, 304)
+
+        # Agregar una foto también
+        with app.app_context():
+            db.session.add(FotoAuto(auto_id=1, ruta_archivo='uploads/autos/1/a.jpg', orden=1))
+            db.session.commit()
+        self.assertEqual(self._get('/auto/1', **{'If-None-Match': f'"{etag}"'})[0].status_code, 200)
+
+        respuesta = self._get('/auto/99')[0]
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertIsNone(respuesta.get_etag()[0])
+
+    def test_if_modified_since(self):
+        with app.app_context():
+            # Última modificación a mitad de segundo: Last-Modified la redondea hacia arriba
+            db.session.execute(VersionDatos.__table__.update().values(actualizado=datetime(2024, 5, 1, 12, 0, 0, 500000)))
+            db.session.commit()
+        respuesta, _, _ = self._get('/auto/1')
+        fecha = respuesta.headers['Last-Modified']
+        self.assertEqual(fecha, 'Wed, 01 May 2024 12:00:01 GMT')
+
+        self.assertEqual(self._get('/auto/1', **{'If-Modified-Since': fecha})[0].status_code, 304)
+        self.assertEqual(self._get('/auto/1', **{'If-Modified-Since': 'Wed, 01 May 2024 12:00:00 GMT'})[0].status_code, 200)
+        self.assertEqual(self._get('/auto/1', **{'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})[0].status_code, 200)
+
+    def test_usuario_logueado_recibe_respuesta_privada(self):
+        publica = self._get('/api/autos')[0]
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+        privada = self._get('/api/autos')[0]
+        self.assertEqual(privada.headers['Cache-Control'], 'private, no-cache')
+        self.assertNotEqual(privada.get_etag()[0], publica.get_etag()[0])
+
+    def test_paginas_anonimas_se_guardan_completas(self):
+        primera, _, plantillas = self._get('/autos?marca=fiat&anio_min=2000')
+        self.assertEqual(plantillas, 1)
+
+        # Mismos parámetros en otro orden: misma página, sin ORM ni plantillas
+        respuesta, sentencias, plantillas = self._get('/autos?anio_min=2000&marca=fiat')
+        self.assertEqual((respuesta.status_code, plantillas, len(sentencias)), (200, 0, 1))
+        self.assertEqual(respuesta.get_data(), primera.get_data())
+        self.assertEqual(respuesta.get_etag(), primera.get_etag())
+        self.assertEqual(respuesta.content_type, primera.content_type)
+
+        self.assertEqual(self._get('/auto/1')[2], 1)
+        self.assertEqual(self._get('/auto/1')[2], 0)
+
+        # Modificar el auto 2 invalida el listado y la página del auto 1 (por los autos similares)
+        self._modificar(2, precio=5000.0)
+        self.assertEqual(self._get('/auto/1')[2], 1)
+        respuesta, _, plantillas = self._get('/autos?marca=fiat&anio_min=2000')
+        self.assertEqual(plantillas, 1)
+        self.assertIn(b'5.000', respuesta.data)
+
+    def test_usuarios_logueados_no_usan_la_cache(self):
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'vendedor'
+        self.assertEqual(self._get('/auto/1')[2], 1)
+        self.assertEqual(self._get('/auto/1')[2], 1)
+        self.assertEqual(cache_paginas.estadisticas()['entradas'], 0)
+
+    def test_lru_limitada_en_bytes_y_nivel_en_disco(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            cache = CacheRespuestas(max_bytes=10, directorio=directorio)
+            cache.guardar('a', 'text/html', b'12345')
+            cache.guardar('b', 'text/html', b'12345')
+            cache.obtener('a')
+            cache.guardar('c', 'text/html', b'12345')
+            self.assertEqual(list(cache._entradas), ['a', 'c'])
+            self.assertEqual(cache.estadisticas()['bytes'], 10)
+
+            # Otro worker con el mismo directorio encuentra la entrada que salió de memoria
+            otro = CacheRespuestas(max_bytes=10, directorio=directorio)
+            self.assertEqual(otro.obtener('b'), ('text/html', b'12345'))
+            self.assertEqual(otro.estadisticas()['hits_disco'], 1)
+            self.assertIsNone(otro.obtener('z'))
+
+            cache.guardar('grande', 'text/html', b'x' * 50)
+            self.assertNotIn('grande', cache._entradas)
+
+    def test_migracion_agrega_la_fecha(self):
+        with app.app_context():
+            db.session.execute(text("ALTER TABLE version_datos DROP COLUMN actualizado"))
+            db.session.commit()
+            aplicar_migraciones()
+            aplicar_migraciones()
+            self.assertEqual(self._get('/auto/1')[0].status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
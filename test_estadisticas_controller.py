@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, Venta, EstadoAuto, EstadoPago
+from controllers.estadisticas_controller import obtener_resumen_general, obtener_ganancias_por_mes, obtener_ventas_por_mes
+
+class EstadisticasControllerTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+        with app.app_context():
+            db.create_all()
+            self._agregar_ventas(10)
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _agregar_ventas(self, cantidad):
+        ahora = datetime.now()
+        for i in range(cantidad):
+            auto = Auto(marca='Fiat', modelo=f'Uno{i}', anio=2018, precio=1000.0 + i,
+                        precio_compra=600.0 + i, estado=EstadoAuto.VENDIDO if i % 2 else EstadoAuto.DISPONIBLE)
+            db.session.add(auto)
+            db.session.flush()
+            db.session.add(Venta(auto_id=auto.id, fecha_seña=datetime(ahora.year, 1 + i % 12, 1),
+                                 fecha_venta=ahora if i % 3 == 0 else None,
+                                 cliente_nombre='C', cliente_apellido=str(i), precio_venta=900.0 + 10 * i,
+                                 estado_pago=EstadoPago.SEÑADO))
+        db.session.commit()
+
+    def _resumen_con_consultas(self):
+        with ContadorConsultas(db.engine) as contador:
+            resumen = obtener_resumen_general()
+            obtener_ganancias_por_mes(datetime.now().year)
+            obtener_ventas_por_mes(datetime.now().year)
+        return resumen, len(contador.sentencias)
+
+    def test_mismas_cifras(self):
+        with app.app_context():
+            ventas = Venta.query.all()
+            resumen = obtener_resumen_general()
+
+            self.assertEqual(resumen['total_autos'], Auto.query.count())
+            self.assertEqual(resumen['autos_disponibles'], Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE).count())
+            self.assertEqual(resumen['total_ventas'], len(ventas))
+            self.assertEqual(resumen['ventas_mes'], sum(1 for v in ventas if v.fecha_venta))
+            self.assertEqual(resumen['ingresos_totales'], sum(v.precio_venta for v in ventas))
+            self.assertEqual(resumen['ganancias_totales'], sum(v.precio_venta - v.auto.precio_compra for v in ventas))
+
+    def test_cantidad_de_consultas_no_depende_de_las_ventas(self):
+        with app.app_context():
+            resumen, consultas = self._resumen_con_consultas()
+            self.assertLessEqual(consultas, 5)
+
+            self._agregar_ventas(40)
+            db.session.expire_all()
+            resumen_grande, consultas_grande = self._resumen_con_consultas()
+
+            self.assertEqual(consultas_grande, consultas)
+            self.assertEqual(resumen_grande['total_ventas'], 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from flask import url_for
+from app_final import app
+from utils.estaticos import huella
+import comprimir_estaticos
+
+ESTILOS = b'.card { transition: transform 0.3s ease; }\n' * 40
+
+class EstaticosTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.static = tempfile.mkdtemp()
+        self.static_original = app.static_folder
+        app.static_folder = self.static
+        self.app = app.test_client()
+
+        os.makedirs(os.path.join(self.static, 'css'))
+        os.makedirs(os.path.join(self.static, 'uploads', 'fotos', 'ab'))
+        with open(os.path.join(self.static, 'css', 'estilos.css'), 'wb') as archivo:
+            archivo.write(ESTILOS)
+        with open(os.path.join(self.static, 'uploads', 'fotos', 'ab', 'abc_card.jpg'), 'wb') as archivo:
+            archivo.write(b'\xff\xd8jpeg')
+
+    def tearDown(self):
+        app.static_folder = self.static_original
+        app.config.pop('ENVIO_ARCHIVOS', None)
+        app.config['USE_X_SENDFILE'] = False
+        shutil.rmtree(self.static)
+
+    def _url(self, filename):
+        with app.test_request_context():
+            return url_for('static', filename=filename)
+
+    def test_url_con_huella_se_cachea_un_anio(self):
+        url = self._url('uploads/fotos/ab/abc_card.jpg')
+        ruta = os.path.join(self.static, 'uploads', 'fotos', 'ab', 'abc_card.jpg')
+        self.assertEqual(url, f'/static/uploads/fotos/ab/abc_card.jpg?v={huella(ruta)}')
+
+        respuesta = self.app.get(url)
+        self.assertEqual(respuesta.data, b'\xff\xd8jpeg')
+        self.assertEqual(respuesta.mimetype, 'image/jpeg')
+        self.assertEqual(respuesta.cache_control.max_age, 31536000)
+        self.assertTrue(respuesta.cache_control.immutable)
+
+        # Sin huella o con una vieja se revalida como antes
+        for otra in ('/static/uploads/fotos/ab/abc_card.jpg', '/static/uploads/fotos/ab/abc_card.jpg?v=000000000000'):
+            respuesta = self.app.get(otra)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertFalse(respuesta.cache_control.immutable)
+
+        # Si el archivo cambia, cambia la URL
+        os.utime(ruta, ns=(0, 0))
+        self.assertNotEqual(self._url('uploads/fotos/ab/abc_card.jpg'), url)
+
+    def test_sirve_la_version_precomprimida(self):
+        self.assertEqual(comprimir_estaticos.comprimir(self.static)[0], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.static, 'uploads', 'fotos', 'ab', 'abc_card.jpg.gz')))
+        url = self._url('css/estilos.css')
+
+        respuesta = self.app.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(respuesta.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(respuesta.mimetype, 'text/css')
+        self.assertIn('Accept-Encoding', respuesta.vary)
+        self.assertEqual(gzip.decompress(respuesta.data), ESTILOS)
+        self.assertTrue(respuesta.cache_control.immutable)
+
+        respuesta = self.app.get(url)
+        self.assertNotIn('Content-Encoding', respuesta.headers)
+        self.assertEqual(respuesta.data, ESTILOS)
+
+        # Solo lo que cambió se vuelve a comprimir
+        self.assertEqual(comprimir_estaticos.comprimir(self.static)[0], 0)
+
+    def test_envio_delegado_a_nginx(self):
+        app.config['ENVIO_ARCHIVOS'] = 'x-accel'
+        respuesta = self.app.get(self._url('uploads/fotos/ab/abc_card.jpg'))
+        self.assertEqual(respuesta.headers['X-Accel-Redirect'], '/_static/uploads/fotos/ab/abc_card.jpg')
+        self.assertEqual(respuesta.mimetype, 'image/jpeg')
+        self.assertEqual(respuesta.data, b'')
+        self.assertTrue(respuesta.cache_control.immutable)
+
+    def test_envio_delegado_con_x_sendfile(self):
+        app.config['USE_X_SENDFILE'] = True
+        respuesta = self.app.get(self._url('uploads/fotos/ab/abc_card.jpg'))
+        self.assertEqual(respuesta.headers['X-Sendfile'], os.path.join(self.static, 'uploads', 'fotos', 'ab', 'abc_card.jpg'))
+        self.assertEqual(respuesta.data, b'')
+
+    def test_rutas_fuera_de_static(self):
+        self.assertEqual(self.app.get('/static/../app_final.py').status_code, 404)
+        self.assertEqual(self.app.get('/static/no_existe.css').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
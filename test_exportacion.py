@@ -0,0 +1,111 @@
+import csv
+import gzip
+import io
+import unittest
+from datetime import datetime
+from openpyxl import load_workbook
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Usuario, Auto, Venta, EstadoAuto, EstadoPago
+from utils import exportacion
+from utils.exportacion import COLUMNAS_EXPORTACION, consulta_exportacion, filas_exportacion, generar_excel_ventas, generar_csv_ventas
+
+class ExportacionTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+        with app.app_context():
+            db.create_all()
+            vendedor = Usuario(username='vend', password='x', nombre='Ana', apellido='Paz',
+                               email='vend@test.com', rol='vendedor')
+            db.session.add(vendedor)
+            db.session.flush()
+
+            for i in range(25):
+                auto = Auto(marca='Fiat', modelo='Uno', anio=2010 + i % 5, precio=1000.0,
+                            estado=EstadoAuto.VENDIDO)
+                db.session.add(auto)
+                db.session.flush()
+                db.session.add(Venta(auto_id=auto.id, fecha_seña=datetime(2022 + i % 3, 1 + i % 12, 1),
+                                     cliente_nombre='Cliente', cliente_apellido=str(i), precio_venta=100.0 * i,
+                                     moneda='USD' if i % 2 else 'ARS', estado_pago=EstadoPago.SEÑADO,
+                                     vendedor_id=vendedor.id if i % 4 else None))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_excel_en_una_consulta_por_lotes(self):
+        lote_original = exportacion.TAMANIO_LOTE
+        exportacion.TAMANIO_LOTE = 7
+
+        with app.app_context(), ContadorConsultas(db.engine) as contador:
+            try:
+                filtros = [Venta.fecha_efectiva >= datetime(2023, 1, 1), Venta.fecha_efectiva < datetime(2025, 1, 1)]
+                archivo = generar_excel_ventas(filas_exportacion(consulta_exportacion(*filtros)), 'Ventas 2023-2024')
+            finally:
+                exportacion.TAMANIO_LOTE = lote_original
+
+        self.assertEqual(len(contador.sentencias), 1)
+
+        hoja = load_workbook(archivo, read_only=True)['Ventas 2023-2024']
+        filas = list(hoja.values)
+        self.assertEqual(list(filas[0]), COLUMNAS_EXPORTACION)
+        self.assertEqual(len(filas) - 1, sum(1 for i in range(25) if i % 3 != 0))
+
+        fila = dict(zip(COLUMNAS_EXPORTACION, filas[1]))
+        self.assertEqual(fila['Auto'], 'Fiat Uno (2011)')
+        self.assertEqual(fila['Vendedor'], 'Ana Paz')
+        self.assertEqual(fila['Estado'], EstadoPago.SEÑADO.value)
+        self.assertEqual(fila['Fecha Seña'], datetime(2023, 2, 1))
+
+    def _exportar(self, **kwargs):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+        with app.app_context():
+            respuesta = cliente.get('/ventas/exportar', **kwargs)
+            self.assertEqual(respuesta.status_code, 200)
+            return respuesta
+
+    def test_csv_con_los_filtros_del_listado(self):
+        respuesta = self._exportar(query_string={'anio': 2023, 'moneda': 'USD'})
+        self.assertTrue(respuesta.is_streamed)
+        self.assertNotIn('Content-Encoding', respuesta.headers)
+
+        filas = list(csv.reader(io.StringIO(respuesta.get_data(as_text=True).lstrip('\ufeff'))))
+        self.assertEqual(filas[0], COLUMNAS_EXPORTACION)
+        esperadas = [str(i) for i in range(25) if i % 3 == 1 and i % 2]
+        self.assertEqual([fila[4].split()[-1] for fila in filas[1:]], esperadas)
+        self.assertTrue(all(fila[8] == 'USD' for fila in filas[1:]))
+
+    def test_anio_fuera_de_rango(self):
+        cliente = app.test_client()
+        with cliente.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+        with app.app_context():
+            for url in ('/ventas', '/ventas/exportar'):
+                for anio in (0, 9999):
+                    respuesta = cliente.get(url, query_string={'anio': anio})
+                    self.assertEqual(respuesta.status_code, 302)
+                    self.assertTrue(respuesta.location.endswith('/ventas'))
+
+    def test_csv_gzip_negociado(self):
+        plano = self._exportar(query_string={'anio': 2024}).get_data()
+        comprimido = self._exportar(query_string={'anio': 2024}, headers={'Accept-Encoding': 'gzip, deflate'})
+
+        self.assertEqual(comprimido.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', comprimido.headers['Vary'])
+        self.assertEqual(gzip.decompress(comprimido.get_data()), plano)
+
+    def test_csv_envia_el_encabezado_antes_de_leer_las_ventas(self):
+        bloques = generar_csv_ventas(iter(lambda: self.fail('se leyó una fila antes del encabezado'), None))
+        self.assertTrue(next(bloques).startswith('\ufeffID,'))
+
+if __name__ == '__main__':
+    unittest.main()
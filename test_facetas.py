@@ -0,0 +1,94 @@
+import unittest
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, EstadoAuto
+from utils.facetas import cache_facetas, calcular_facetas, firma_filtros
+from werkzeug.datastructures import MultiDict
+
+class FacetasTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+        cache_facetas.limpiar()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Auto(marca='Toyota', modelo='Corolla', anio=2021, precio=25000.0, moneda='USD', estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Toyota', modelo='Etios', anio=2016, precio=8000000.0, moneda='ARS', estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Toyota', modelo='Hilux', anio=2012, precio=12000000.0, estado=EstadoAuto.VENDIDO),
+                Auto(marca='Fiat', modelo='Uno', anio=2005, precio=3000000.0, moneda='ARS', estado=EstadoAuto.DISPONIBLE),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_cuenta_por_marca_anio_precio_y_estado(self):
+        with app.app_context():
+            facetas = calcular_facetas(Auto.query)
+
+        self.assertEqual(facetas['total'], 4)
+        self.assertEqual(facetas['marcas'], [{'valor': 'Fiat', 'cantidad': 1}, {'valor': 'Toyota', 'cantidad': 3}])
+        self.assertEqual([(t['desde'], t['hasta'], t['cantidad']) for t in facetas['anios']],
+                         [(None, 2009, 1), (2010, 2014, 1), (2015, 2019, 1), (2020, None, 1)])
+        self.assertEqual([(t['desde'], t['hasta'], t['cantidad']) for t in facetas['precios']['ARS']],
+                         [(None, 4999999, 1), (5000000, 9999999, 1), (10000000, 19999999, 1)])
+        self.assertEqual([(t['etiqueta'], t['cantidad']) for t in facetas['precios']['USD']], [('Desde US$20.000', 1)])
+        self.assertEqual(facetas['estados'], [{'valor': 'Disponible', 'cantidad': 3}, {'valor': 'Vendido', 'cantidad': 1}])
+
+    def test_firma_ignora_paginacion_y_orden_de_parametros(self):
+        a = MultiDict([('marca', 'Fiat'), ('anio', '2005'), ('cursor', 'abc'), ('q', '')])
+        b = MultiDict([('anio', '2005'), ('marca', 'Fiat'), ('por_pagina', '10')])
+        self.assertEqual(firma_filtros('catalogo', a), firma_filtros('catalogo', b))
+        self.assertNotEqual(firma_filtros('catalogo', a), firma_filtros('stock', a))
+
+    def _sentencias_catalogo(self, url):
+        with app.app_context(), ContadorConsultas(db.engine) as contador:
+            respuesta = self.app.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta, [sql for sql in contador.sentencias if 'GROUP BY' in sql]
+
+    def test_catalogo_usa_la_cache_hasta_que_cambian_los_autos(self):
+        respuesta, agrupadas = self._sentencias_catalogo('/autos?marca=toyota')
+        self.assertEqual(len(agrupadas), 1)
+        self.assertIn('Toyota (2)'.encode(), respuesta.data)
+
+        respuesta, agrupadas = self._sentencias_catalogo('/autos?por_pagina=1&marca=toyota')
+        self.assertEqual(agrupadas, [])
+
+        with app.app_context():
+            db.session.add(Auto(marca='Toyota', modelo='Yaris', anio=2023, precio=30000.0, moneda='USD',
+                                estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+        respuesta, agrupadas = self._sentencias_catalogo('/autos?marca=toyota')
+        self.assertEqual(len(agrupadas), 1)
+        self.assertIn('Toyota (3)'.encode(), respuesta.data)
+
+    def test_facetas_respetan_la_busqueda_y_los_tramos(self):
+        respuesta, _ = self._sentencias_catalogo('/autos?q=uno')
+        self.assertIn('Fiat (1)'.encode(), respuesta.data)
+        self.assertNotIn(b'Toyota (', respuesta.data)
+
+        respuesta, _ = self._sentencias_catalogo('/autos?anio_min=2015&anio_max=2019')
+        self.assertIn(b'Etios', respuesta.data)
+        self.assertNotIn(b'Corolla', respuesta.data)
+
+    def test_tramo_de_precio_con_centavos(self):
+        with app.app_context():
+            db.session.add(Auto(marca='Ford', modelo='Ka', anio=2018, precio=9999.5, moneda='USD', estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+            tramo = next(t for t in calcular_facetas(Auto.query)['precios']['USD'] if t['desde'] == 5000)
+        self.assertEqual((tramo['limite'], tramo['cantidad']), (10000, 1))
+
+        # El enlace del tramo filtra con el mismo límite con el que se contó
+        respuesta, _ = self._sentencias_catalogo('/autos?moneda=USD&precio_min=5000&precio_hasta=10000')
+        self.assertIn(b'Ka', respuesta.data)
+        self.assertIn(b'precio_hasta=10000', respuesta.data)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+from datetime import datetime
+from sqlalchemy import text
+from app_final import app, db
+from models import Auto, Venta, EstadoAuto, EstadoPago
+from utils.migraciones import aplicar_migraciones
+
+class FechaEfectivaTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            auto = Auto(marca='Toyota', modelo='Etios', anio=2020, precio=100.0, estado=EstadoAuto.VENDIDO)
+            db.session.add(auto)
+            db.session.flush()
+
+            fechas = [
+                (datetime(2024, 1, 31, 23, 59), None),               # Señada fin de enero
+                (datetime(2024, 1, 15), datetime(2024, 2, 1)),        # Señada en enero, pagada en febrero
+                (datetime(2023, 12, 20), datetime(2024, 1, 3)),       # Cruza el año
+                (datetime(2024, 12, 31, 12), None),
+            ]
+            for i, (fecha_seña, fecha_venta) in enumerate(fechas):
+                db.session.add(Venta(auto_id=auto.id, fecha_seña=fecha_seña, fecha_venta=fecha_venta,
+                                     cliente_nombre='Cliente', cliente_apellido=str(i), precio_venta=100.0,
+                                     estado_pago=EstadoPago.SEÑADO))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _clientes(self, **params):
+        with app.app_context():
+            respuesta = self.app.get('/ventas', query_string=params)
+            self.assertEqual(respuesta.status_code, 200)
+            return {str(i) for i in range(4) if f'Cliente {i}'.encode() in respuesta.data}
+
+    def test_se_mantiene_al_escribir(self):
+        with app.app_context():
+            venta = Venta.query.filter_by(cliente_apellido='0').one()
+            self.assertEqual(venta.fecha_efectiva, datetime(2024, 1, 31, 23, 59))
+
+            venta.fecha_venta = datetime(2024, 3, 1)
+            db.session.commit()
+            self.assertEqual(Venta.query.get(venta.id).fecha_efectiva, datetime(2024, 3, 1))
+
+    def test_filtro_por_mes_y_anio(self):
+        self.assertEqual(self._clientes(anio=2024, mes=1), {'0', '2'})
+        self.assertEqual(self._clientes(anio=2024, mes=2), {'1'})
+        self.assertEqual(self._clientes(anio=2024, mes=12), {'3'})
+        self.assertEqual(self._clientes(anio=2024), {'0', '1', '2', '3'})
+        self.assertEqual(self._clientes(anio=2023), set())
+
+    def test_migracion_completa_filas_existentes(self):
+        with app.app_context():
+            # Simular una base anterior a la columna
+            db.session.execute(text("DROP INDEX ix_venta_fecha_efectiva"))
+            db.session.execute(text("DROP INDEX ix_venta_vendedor_fecha"))
+            db.session.execute(text("ALTER TABLE venta DROP COLUMN fecha_efectiva"))
+            db.session.commit()
+
+            aplicar_migraciones()
+            aplicar_migraciones()  # Debe poder repetirse
+
+            filas = db.session.execute(text(
+                "SELECT COUNT(*) FROM venta WHERE fecha_efectiva IS COALESCE(fecha_venta, fecha_seña)"
+            )).scalar()
+            self.assertEqual(filas, 4)
+
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM venta WHERE fecha_efectiva >= '2024-01-01' AND fecha_efectiva < '2024-02-01'"
+            )).fetchall()
+            self.assertIn('ix_venta_fecha_efectiva', ' '.join(str(fila) for fila in plan))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from sqlalchemy import text
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, FotoAuto, EstadoAuto
+from utils.migraciones import aplicar_migraciones
+from utils.facetas import cache_facetas
+
+class FotoPrincipalTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            for i in range(20):
+                auto = Auto(marca='Fiat', modelo=f'M{i}', anio=2015, precio=1000.0, estado=EstadoAuto.DISPONIBLE)
+                for j in range(2):
+                    auto.fotos.append(FotoAuto(ruta_archivo=f'uploads/autos/{i}/foto{j}.jpg', orden=j))
+                db.session.add(auto)
+                db.session.flush()
+                auto.actualizar_foto_principal()
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _consultas_catalogo(self, por_pagina):
+        # Las facetas se cachean: medir siempre con la cache vacía
+        cache_facetas.limpiar()
+        with app.app_context(), ContadorConsultas(db.engine) as contador:
+            respuesta = self.app.get(f'/autos?por_pagina={por_pagina}')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'uploads/autos/', respuesta.data)
+        return sum(1 for sql in contador.sentencias if 'foto_auto' in sql), len(contador.sentencias)
+
+    def test_catalogo_con_cantidad_de_consultas_constante(self):
+        fotos_chica, total_chica = self._consultas_catalogo(3)
+        fotos_grande, total_grande = self._consultas_catalogo(20)
+        self.assertEqual(fotos_chica, 1)
+        self.assertEqual((fotos_grande, total_grande), (fotos_chica, total_chica))
+
+    def test_eliminar_fotos_mantiene_la_principal(self):
+        with app.app_context():
+            auto = Auto.query.first()
+            primera, segunda = sorted(auto.fotos, key=lambda f: f.orden)
+            self.assertEqual(auto.foto_principal_id, primera.id)
+            self.assertTrue(primera.es_principal)
+
+            self.app.post(f'/auto/{auto.id}/fotos/eliminar/{primera.id}')
+            db.session.expire_all()
+            auto = Auto.query.get(auto.id)
+            self.assertEqual(auto.foto_principal_id, segunda.id)
+            self.assertTrue(auto.foto_principal.es_principal)
+
+            self.app.post(f'/auto/{auto.id}/fotos/eliminar/{segunda.id}')
+            db.session.expire_all()
+            self.assertIsNone(Auto.query.get(auto.id).foto_principal_id)
+
+    def test_elegir_otra_foto_principal(self):
+        with app.app_context():
+            auto = Auto.query.first()
+            segunda = max(auto.fotos, key=lambda f: f.orden)
+            auto.actualizar_foto_principal(segunda)
+            db.session.commit()
+
+            self.assertEqual(auto.foto_principal, segunda)
+            self.assertEqual([f.es_principal for f in sorted(auto.fotos, key=lambda f: f.orden)], [False, True])
+
+    def test_migracion_completa_el_puntero(self):
+        with app.app_context():
+            db.session.execute(text("ALTER TABLE auto DROP COLUMN foto_principal_id"))
+            db.session.execute(text("UPDATE foto_auto SET es_principal = (orden = 1)"))
+            db.session.commit()
+
+            aplicar_migraciones()
+            aplicar_migraciones()
+
+            db.session.expire_all()
+            for auto in Auto.query.all():
+                self.assertEqual(auto.foto_principal.orden, 1)
+
+if __name__ == '__main__':
+    unittest.main()
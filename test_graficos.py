@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from app_final import app
+from routes.estadisticas import stats_bp
+from utils.graficos import clave_grafico, solicitar_grafico, ruta_grafico
+
+ESPECIFICACION = {
+    'tipo': 'barras',
+    'x': [1, 2, 3],
+    'series': [{'valores': [4, 0, 2]}],
+    'titulo': 'Ventas por día',
+    'grilla': 'y'
+}
+
+class GraficosTests(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        app.config['GRAFICOS_DIR'] = self.directorio
+
+    def tearDown(self):
+        app.config.pop('GRAFICOS_DIR', None)
+        shutil.rmtree(self.directorio)
+
+    def test_clave_depende_solo_del_contenido(self):
+        copia = dict(reversed(list(ESPECIFICACION.items())))
+        self.assertEqual(clave_grafico(ESPECIFICACION), clave_grafico(copia))
+        self.assertNotEqual(clave_grafico(ESPECIFICACION), clave_grafico(dict(ESPECIFICACION, x=[1, 2, 4])))
+
+    def test_dibuja_una_vez_y_reutiliza_el_png(self):
+        with app.app_context():
+            clave = solicitar_grafico(ESPECIFICACION)
+            ruta = ruta_grafico(clave)
+
+            with open(ruta, 'rb') as archivo:
+                self.assertEqual(archivo.read(8), b'\x89PNG\r\n\x1a\n')
+            modificado = os.path.getmtime(ruta)
+
+            self.assertEqual(solicitar_grafico(ESPECIFICACION), clave)
+            self.assertEqual(os.path.getmtime(ruta_grafico(clave)), modificado)
+            self.assertFalse([nombre for nombre in os.listdir(self.directorio) if nombre.endswith('.tmp')])
+
+    def test_clave_invalida_o_desconocida(self):
+        with app.app_context():
+            self.assertIsNone(ruta_grafico('../agencia'))
+            self.assertIsNone(ruta_grafico('0' * 64))
+
+class RutaGraficoTests(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.app = Flask('agencia')
+        self.app.config.update(TESTING=True, LOGIN_DISABLED=True, GRAFICOS_DIR=self.directorio)
+        self.app.register_blueprint(stats_bp, url_prefix='/estadisticas')
+        self.cliente = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio)
+
+    def test_clave_desconocida(self):
+        self.assertEqual(self.cliente.get(f"/estadisticas/chart/{'0' * 64}.png").status_code, 404)
+
+    def test_sin_dibujar_todavia_responde_503(self):
+        for error in (TimeoutError(), RuntimeError('proceso caído')):
+            with mock.patch('routes.estadisticas.ruta_grafico', side_effect=error):
+                respuesta = self.cliente.get(f"/estadisticas/chart/{'0' * 64}.png")
+            self.assertEqual(respuesta.status_code, 503)
+            self.assertEqual(respuesta.headers['Retry-After'], '5')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from PIL import Image
+from app_final import app, db
+from models import Auto, FotoAuto, EstadoAuto
+from utils.cache_http import cache_paginas
+from utils.imagenes import procesar_foto, archivos_foto, srcset_foto, VARIANTES
+import generar_variantes
+from utils.procesamiento_fotos import cola_fotos
+
+def imagen_bytes(ancho, alto, formato='JPEG', modo='RGB'):
+    datos = io.BytesIO()
+    Image.new(modo, (ancho, alto), (200, 30, 30, 0) if modo == 'RGBA' else (200, 30, 30)).save(datos, formato)
+    return datos.getvalue()
+
+def sin_huella(texto):
+    # Las URL de static llevan la huella del archivo (?v=...), ver test_estaticos
+    return re.sub(r'\?v=[0-9a-f]+', '', texto)
+
+class ImagenesTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+        cache_paginas.limpiar()
+
+        # Las fotos se guardan en una carpeta static temporal
+        self.static = tempfile.mkdtemp()
+        self.static_original = app.static_folder
+        app.static_folder = self.static
+        os.makedirs(os.path.join(self.static, 'uploads', 'autos'))
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Auto(marca='Fiat', modelo='Cronos', anio=2020, precio=1000.0, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        app.static_folder = self.static_original
+        shutil.rmtree(self.static)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _guardar(self, ruta, contenido):
+        with open(os.path.join(self.static, ruta), 'wb') as archivo:
+            archivo.write(contenido)
+        return FotoAuto(auto_id=1, ruta_archivo=ruta)
+
+    def test_genera_variantes_en_webp_y_jpeg(self):
+        with app.app_context():
+            foto = self._guardar('uploads/autos/grande.jpg', imagen_bytes(3000, 2000))
+            self.assertTrue(procesar_foto(foto))
+
+            for variante, ancho in VARIANTES.items():
+                datos = foto.variantes[variante]
+                self.assertEqual((datos['ancho'], datos['alto']), (ancho, round(2000 * ancho / 3000)))
+                with Image.open(os.path.join(self.static, datos['webp'])) as imagen:
+                    self.assertEqual((imagen.format, imagen.width), ('WEBP', ancho))
+                with Image.open(os.path.join(self.static, datos['jpeg'])) as imagen:
+                    self.assertEqual((imagen.format, imagen.width), ('JPEG', ancho))
+
+            self.assertEqual(len(archivos_foto(foto)), 1 + 2 * len(VARIANTES))
+            with app.test_request_context():
+                self.assertEqual(sin_huella(srcset_foto(foto, 'webp')), ', '.join(
+                    f'/static/uploads/autos/grande_{variante}.webp {ancho}w'
+                    for variante, ancho in sorted(VARIANTES.items(), key=lambda item: item[1])))
+
+    def test_no_agranda_fotos_chicas_y_aplana_la_transparencia(self):
+        with app.app_context():
+            foto = self._guardar('uploads/autos/chica.png', imagen_bytes(200, 100, 'PNG', 'RGBA'))
+            self.assertTrue(procesar_foto(foto))
+            self.assertEqual({datos['ancho'] for datos in foto.variantes.values()}, {200})
+            with Image.open(os.path.join(self.static, foto.variantes['card']['jpeg'])) as imagen:
+                self.assertEqual(imagen.convert('RGB').getpixel((0, 0)), (255, 255, 255))
+            with app.test_request_context():
+                self.assertEqual(sin_huella(srcset_foto(foto)), '/static/uploads/autos/chica_full.jpg 200w')
+
+    def test_archivo_invalido_queda_sin_variantes(self):
+        with app.app_context():
+            foto = self._guardar('uploads/autos/roto.jpg', b'no es una imagen')
+            self.assertFalse(procesar_foto(foto))
+            self.assertIsNone(foto.variantes)
+            self.assertEqual(archivos_foto(foto), ['uploads/autos/roto.jpg'])
+
+    def test_subida_catalogo_y_borrado(self):
+        self.app.post('/auto/1/editar', data={
+            'marca': 'Fiat', 'modelo': 'Cronos', 'anio': '2020', 'precio': '1000', 'kilometraje': '0',
+            'fotos': (io.BytesIO(imagen_bytes(1200, 900)), 'celular.jpg'),
+        }, content_type='multipart/form-data')
+        cola_fotos.esperar(timeout=10)
+
+        with app.app_context():
+            foto = FotoAuto.query.one()
+            self.assertEqual(foto.variantes['card']['ancho'], 640)
+            rutas = archivos_foto(foto)
+            self.assertTrue(all(os.path.exists(os.path.join(self.static, ruta)) for ruta in rutas))
+
+        catalogo = sin_huella(self.app.get('/autos').get_data(as_text=True))
+        self.assertIn('type="image/webp"', catalogo)
+        self.assertIn('_card.jpg 640w', catalogo)
+        self.assertIn('_thumb.webp 320w', catalogo)
+
+        self.app.post(f'/auto/1/fotos/eliminar/{foto.id}')
+        self.assertFalse(any(os.path.exists(os.path.join(self.static, ruta)) for ruta in rutas))
+
+    def test_comando_de_relleno(self):
+        with app.app_context():
+            db.session.add_all([
+                self._guardar('uploads/autos/vieja.jpg', imagen_bytes(800, 600)),
+                FotoAuto(auto_id=1, ruta_archivo='uploads/autos/no_existe.jpg'),
+            ])
+            db.session.commit()
+
+        with mock.patch.object(sys, 'argv', ['generar_variantes.py']), mock.patch('builtins.print') as imprimir:
+            self.assertEqual(generar_variantes.main(), 0)
+        self.assertIn('generadas: 1 fotos. Archivos faltantes: 1', imprimir.call_args[0][0])
+
+        with app.app_context():
+            vieja = FotoAuto.query.filter_by(ruta_archivo='uploads/autos/vieja.jpg').one()
+            self.assertEqual(vieja.variantes['full']['ancho'], 800)
+            self.assertTrue(os.path.exists(os.path.join(self.static, 'uploads/autos/vieja_full.webp')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from app_final import app, db
+from models import Auto, FotoAuto, ArchivoFoto, EstadoAuto, EstadoFoto
+from utils.limpieza_fotos import limpiar_fotos, buscar_huerfanos, EDAD_MINIMA
+from utils.imagenes import ruta_variante
+
+class LimpiezaFotosTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.temporal = tempfile.mkdtemp()
+        self.static = os.path.join(self.temporal, 'static')
+        self.pendientes = os.path.join(self.temporal, 'pendientes')
+        os.makedirs(self.pendientes)
+        os.makedirs(os.path.join(self.static, 'uploads'))
+        self.contexto = app.app_context()
+        self.contexto.push()
+        db.create_all()
+        self.auto = Auto(marca='Fiat', modelo='Cronos', anio=2020, precio=1000.0, estado=EstadoAuto.DISPONIBLE)
+        db.session.add(self.auto)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.contexto.pop()
+        shutil.rmtree(self.temporal)
+
+    def _archivo(self, ruta, carpeta=None, viejo=True):
+        ruta_completa = os.path.join(carpeta or self.static, ruta)
+        os.makedirs(os.path.dirname(ruta_completa), exist_ok=True)
+        with open(ruta_completa, 'wb') as archivo:
+            archivo.write(b'x' * 10)
+        if viejo:
+            antes = time.time() - EDAD_MINIMA - 60
+            os.utime(ruta_completa, (antes, antes))
+        return ruta
+
+    def _foto(self, ruta, **campos):
+        foto = FotoAuto(ruta_archivo=ruta, **campos)
+        self.auto.fotos.append(foto)
+        db.session.commit()
+        return foto
+
+    def _limpiar(self, **opciones):
+        return limpiar_fotos(carpeta_static=self.static, carpeta_pendientes=self.pendientes, **opciones)
+
+    def test_informa_sin_borrar(self):
+        self._foto(self._archivo('uploads/autos/1/a.jpg'))
+        self._archivo(ruta_variante('uploads/autos/1/a.jpg', 'card', 'webp'))
+        self._archivo('uploads/autos/1/huerfana.jpg')
+        self._archivo('uploads/autos/1/recien_subida.jpg', viejo=False)
+
+        resultado = self._limpiar()
+        self.assertEqual(resultado['archivos'], 4)
+        self.assertEqual(resultado['huerfanos'], [('uploads/autos/1/huerfana.jpg', 10)])
+        self.assertEqual(resultado['bytes'], 10)
+        self.assertEqual(resultado['colgadas'], [])
+        self.assertTrue(os.path.exists(os.path.join(self.static, 'uploads/autos/1/huerfana.jpg')))
+
+    def test_borra_huerfanos_y_fotos_sin_archivo(self):
+        conservada = self._foto(self._archivo('uploads/autos/1/a.jpg'), orden=1)
+        colgada = self._foto('uploads/autos/1/borrada.jpg', orden=0)
+        self.auto.actualizar_foto_principal(colgada)
+        db.session.commit()
+        self._archivo('uploads/fotos/ab/huerfana.jpg')
+        self._archivo('vieja.subida', self.pendientes)
+
+        # Sin pedirlo explícitamente las fotos colgadas solo se informan
+        resultado = self._limpiar(borrar=True)
+        self.assertEqual(resultado['colgadas'], [colgada.id])
+        self.assertEqual((resultado['borrados'], resultado['filas_borradas']), (2, 0))
+        self.assertEqual(FotoAuto.query.count(), 2)
+
+        resultado = self._limpiar(borrar=True, filas=True)
+        self.assertEqual((resultado['borrados'], resultado['filas_borradas']), (0, 1))
+        self.assertEqual(FotoAuto.query.one().id, conservada.id)
+        self.assertEqual(Auto.query.one().foto_principal_id, conservada.id)
+        self.assertFalse(os.path.exists(os.path.join(self.static, 'uploads/fotos/ab/huerfana.jpg')))
+        self.assertEqual(os.listdir(self.pendientes), [])
+        self.assertEqual(self._limpiar()['huerfanos'], [])
+
+    def test_respeta_las_fotos_pendientes(self):
+        self._archivo('abc.jpg', self.pendientes)
+        self._foto('uploads/fotos/ab/abc.jpg', estado=EstadoFoto.PENDIENTE)
+        # Sin archivo en ningún lado la foto pendiente nunca se va a procesar
+        colgada = self._foto('uploads/fotos/cd/cde.jpg', estado=EstadoFoto.PENDIENTE)
+
+        resultado = buscar_huerfanos(self.static, self.pendientes)
+        self.assertEqual(resultado['pendientes_huerfanos'], [])
+        self.assertEqual(resultado['colgadas'], [colgada.id])
+
+    def test_recupera_las_trabadas(self):
+        hace_rato = datetime.utcnow() - timedelta(hours=1)
+        self._archivo('abc.jpg', self.pendientes)
+        recuperable = self._foto('uploads/fotos/ab/abc.jpg', estado=EstadoFoto.PROCESANDO, procesando_desde=hace_rato)
+        perdida = self._foto('uploads/fotos/cd/cde.jpg', estado=EstadoFoto.PROCESANDO, procesando_desde=hace_rato)
+        reciente = self._foto('uploads/fotos/ef/efg.jpg', estado=EstadoFoto.PROCESANDO, procesando_desde=datetime.utcnow())
+
+        self.assertEqual(self._limpiar()['trabadas'], [recuperable.id, perdida.id])
+        resultado = self._limpiar(borrar=True)
+        self.assertEqual((resultado['recuperadas'], resultado['con_error']), (1, 1))
+        self.assertEqual(db.session.get(FotoAuto, recuperable.id).estado, EstadoFoto.PENDIENTE)
+        self.assertEqual(db.session.get(FotoAuto, perdida.id).estado, EstadoFoto.ERROR)
+        self.assertEqual(db.session.get(FotoAuto, reciente.id).estado, EstadoFoto.PROCESANDO)
+        self.assertEqual(os.listdir(self.pendientes), ['abc.jpg'])
+
+    def test_libera_contenido_sin_referencias(self):
+        ruta = self._archivo('uploads/fotos/ab/abc.jpg')
+        db.session.add(ArchivoFoto(hash='abc', ruta_archivo=ruta, tamanio=10, referencias=0))
+        db.session.commit()
+
+        self._limpiar(borrar=True)
+        self.assertEqual(ArchivoFoto.query.count(), 0)
+        self.assertFalse(os.path.exists(os.path.join(self.static, ruta)))
+
+    def test_no_borra_nada_si_la_carpeta_no_es_la_correcta(self):
+        self._foto(self._archivo('uploads/fotos/ab/abc.jpg'))
+        self._foto('uploads/fotos/cd/cde.jpg')
+        self._foto('uploads/fotos/ef/efg.jpg')
+        self._archivo('uploads/fotos/gh/huerfana.jpg')
+        with self.assertRaises(ValueError):
+            self._limpiar(borrar=True, filas=True)
+        self.assertEqual(FotoAuto.query.count(), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.static, 'uploads/fotos/gh/huerfana.jpg')))
+
+        shutil.rmtree(os.path.join(self.static, 'uploads'))
+        with self.assertRaises(ValueError):
+            self._limpiar(borrar=True, filas=True)
+        self.assertEqual(FotoAuto.query.count(), 3)
+
+    def test_sigue_los_enlaces_a_directorios(self):
+        otro_disco = os.path.join(self.temporal, 'otro_disco')
+        self._archivo('ab/abc.jpg', otro_disco)
+        os.symlink(otro_disco, os.path.join(self.static, 'uploads', 'fotos'))
+        self._foto('uploads/fotos/ab/abc.jpg')
+        resultado = self._limpiar(borrar=True, filas=True)
+        self.assertEqual((resultado['colgadas'], resultado['filas_borradas']), ([], 0))
+        self.assertEqual(FotoAuto.query.count(), 1)
+
+    def test_limite_por_ejecucion(self):
+        for i in range(5):
+            self._archivo(f'uploads/autos/1/{i}.jpg')
+        self.assertEqual(self._limpiar(borrar=True, limite=3)['borrados'], 3)
+        self.assertEqual(self._limpiar(borrar=True, limite=3)['borrados'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from datetime import datetime
+from app_final import app, db
+from models import Auto, EstadoAuto
+from utils.paginacion import paginar, codificar_cursor, decodificar_cursor
+
+class PaginacionTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            for i in range(30):
+                db.session.add(Auto(marca='Ford' if i % 2 else 'Fiat', modelo=f'M{i}', anio=2015, precio=1000.0,
+                                    estado=EstadoAuto.VENDIDO if i % 10 == 0 else EstadoAuto.DISPONIBLE,
+                                    fecha_publicacion=datetime(2024, 1, 1 + i % 5) if i % 7 else None))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _recorrer(self, url, agregar_en=None):
+        ids, paginas = [], 0
+        with app.app_context():
+            while url:
+                datos = self.app.get(url).get_json()
+                ids += [auto['id'] for auto in datos['autos']]
+                url = datos['siguiente']
+                paginas += 1
+                if paginas == agregar_en:
+                    db.session.add(Auto(marca='Fiat', modelo='Nuevo', anio=2024, precio=1.0, estado=EstadoAuto.DISPONIBLE))
+                    db.session.commit()
+        return ids, paginas
+
+    def test_recorre_el_catalogo_sin_repetir(self):
+        ids, paginas = self._recorrer('/api/autos?por_pagina=7')
+        with app.app_context():
+            disponibles = [a.id for a in Auto.query.filter_by(estado=EstadoAuto.DISPONIBLE).order_by(Auto.id.desc())]
+        self.assertEqual(ids, disponibles)
+        self.assertEqual(paginas, 4)
+
+    def test_autos_nuevos_no_desplazan_las_paginas(self):
+        ids, _ = self._recorrer('/api/autos?por_pagina=5&marca=fiat', agregar_en=1)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), 12)
+
+    def test_pagina_html_y_cursor_invalido(self):
+        with app.app_context():
+            respuesta = self.app.get('/autos?por_pagina=10')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertIn(b'Ver m\xc3\xa1s autos', respuesta.data)
+            self.assertIn(b'cursor=', respuesta.data)
+
+            self.assertEqual(self.app.get('/api/autos?cursor=xyz').status_code, 400)
+            # Cursores bien formados pero con valores de otro tipo
+            for valores in ([{'a': 1}], [[1]], ['1'], [True], [1.5]):
+                self.assertEqual(self.app.get(f'/api/autos?cursor={codificar_cursor(valores)}').status_code, 400)
+            orden = [db.func.coalesce(Auto.fecha_publicacion, datetime(1970, 1, 1)), Auto.id]
+            for valores in ([1, 1], [{'a': 1}, 1], ['ayer', 1]):
+                with self.assertRaises(ValueError):
+                    decodificar_cursor(codificar_cursor(valores), orden)
+
+    def test_orden_por_fecha_con_nulos(self):
+        orden = [db.func.coalesce(Auto.fecha_publicacion, datetime(1970, 1, 1)), Auto.id]
+        with app.app_context():
+            esperado = sorted(Auto.query.all(), key=lambda a: (a.fecha_publicacion or datetime(1970, 1, 1), a.id), reverse=True)
+
+            vistos, cursor = [], None
+            while True:
+                autos, cursor = paginar(Auto.query, orden, cursor, por_pagina=4)
+                vistos += autos
+                if not cursor:
+                    break
+            self.assertEqual([a.id for a in vistos], [a.id for a in esperado])
+
+if __name__ == '__main__':
+    unittest.main()
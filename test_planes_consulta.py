@@ -0,0 +1,140 @@
+import re
+import unittest
+from datetime import datetime
+from sqlalchemy import text
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, FotoAuto, EstadoAuto, Usuario, Venta, EstadoPago, ORDEN_PUBLICACION
+from utils.cache import cache_estadisticas
+from utils.facetas import cache_facetas
+from utils.paginacion import paginar
+from utils.migraciones import aplicar_migraciones
+
+# Páginas con las consultas más frecuentes (catálogo, detalle, ventas y estadísticas)
+PAGINAS = [
+    '/autos',
+    '/autos?marca=fiat&moneda=USD&precio_min=100&anio_min=2010',
+    '/autos?q=fiat',
+    '/auto/1',
+    '/dashboard',
+    '/ventas',
+    '/ventas?anio=2024&mes=1&moneda=USD&estado=PAGADO',
+    '/ventas/exportar?anio=2024',
+    '/estadisticas',
+    '/estadisticas?periodo=mes&anio=2024&mes=1',
+    '/estadisticas/api/series?metric=ingresos&desde=2024-01&hasta=2024-12&group=vendedor',
+]
+
+# Tablas que se pueden recorrer completas: el personal de la agencia, los contadores de versión
+# y el resumen mensual (existe justamente para agregarse en lugar de venta)
+TABLAS_CHICAS = {'usuario', 'version_datos', 'venta_resumen_mensual'}
+
+def degradaciones(sql, plan):
+    """Pasos del plan que recorren completa una tabla grande"""
+    tablas = {tabla.name for tabla in db.metadata.sorted_tables}
+    detalles = [fila[3] for fila in plan]
+    # Un recorrido en el orden pedido con LIMIT se detiene en las primeras filas
+    acotado = ' LIMIT ' in sql and not any('FOR ORDER BY' in detalle for detalle in detalles)
+
+    resultado = []
+    for detalle in detalles:
+        recorrido = re.match(r'SCAN (?:TABLE )?(\w+)', detalle)
+        if recorrido and recorrido.group(1) in tablas - TABLAS_CHICAS and not acotado:
+            resultado.append(detalle)
+    return resultado
+
+class PlanesConsultaTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+        cache_estadisticas.limpiar()
+        cache_facetas.limpiar()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Usuario(username='jefe', password='x', nombre='J', apellido='J', email='j@a', rol='administrador_jefe'),
+                Usuario(username='vende', password='x', nombre='V', apellido='V', email='v@a', rol='vendedor'),
+            ])
+            for i in range(30):
+                auto = Auto(marca='Fiat' if i % 2 else 'Ford', modelo=f'M{i}', anio=2010 + i % 10, precio=1000.0 * i,
+                            moneda='USD' if i % 3 else 'ARS', estado=EstadoAuto.VENDIDO if i % 4 == 0 else EstadoAuto.DISPONIBLE,
+                            fecha_publicacion=datetime(2024, 1, 1 + i % 20) if i % 5 else None)
+                auto.fotos.append(FotoAuto(ruta_archivo=f'uploads/autos/{i}/a.jpg'))
+                db.session.add(auto)
+                db.session.flush()
+                auto.actualizar_foto_principal()
+                if i % 4 == 0:
+                    db.session.add(Venta(auto_id=auto.id, fecha_seña=datetime(2024, 1 + i % 12, 10), cliente_nombre='C',
+                                         cliente_apellido='D', precio_venta=2000.0 * i, moneda=auto.moneda,
+                                         estado_pago=EstadoPago.SEÑADO, vendedor_id=2))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _consultas(self, ejecutar):
+        """SELECT distintos (con sus parámetros) que emite ejecutar()"""
+        with ContadorConsultas(db.engine) as contador:
+            ejecutar()
+        consultas = {}
+        for sql, parametros in zip(contador.sentencias, contador.parametros):
+            if sql.lstrip().upper().startswith('SELECT'):
+                consultas.setdefault(sql, parametros)
+        return consultas
+
+    def _plan(self, sql, parametros):
+        return db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, parametros).fetchall()
+
+    def _verificar(self, consultas):
+        self.assertTrue(consultas)
+        for sql, parametros in consultas.items():
+            plan = self._plan(sql, parametros)
+            self.assertEqual(degradaciones(sql, plan), [], f'{sql}\n{plan}')
+
+    def test_paginas_sin_recorridos_completos(self):
+        with app.app_context():
+            siguiente = self.app.get('/api/autos?por_pagina=5').get_json()['siguiente']
+            for url in PAGINAS + [siguiente]:
+                with self.subTest(url=url):
+                    self._verificar(self._consultas(lambda: self.app.get(url).get_data()))
+
+    def test_stock_usa_el_indice_de_publicacion(self):
+        orden = [ORDEN_PUBLICACION, Auto.id]
+        with app.app_context():
+            _, cursor = paginar(Auto.query, orden, None, por_pagina=5)
+            consultas = self._consultas(lambda: paginar(Auto.query, orden, cursor, por_pagina=5))
+            self._verificar(consultas)
+            plan = ' '.join(fila[3] for sql, parametros in consultas.items() for fila in self._plan(sql, parametros))
+            self.assertIn('ix_auto_publicacion', plan)
+
+    def test_detecta_recorridos(self):
+        with app.app_context():
+            consulta = Auto.query.filter(Auto.color == 'Rojo').order_by(Auto.precio)
+            consultas = self._consultas(consulta.all)
+            sql, parametros = next(iter(consultas.items()))
+            self.assertEqual(degradaciones(sql, self._plan(sql, parametros)), ['SCAN auto'])
+
+    def test_migracion_crea_los_indices(self):
+        with app.app_context():
+            nombres = {indice.name for tabla in db.metadata.sorted_tables for indice in tabla.indexes}
+            for nombre in nombres:
+                db.session.execute(text(f'DROP INDEX {nombre}'))
+            db.session.commit()
+
+            aplicar_migraciones()
+            aplicar_migraciones()
+
+            existentes = {fila[0] for fila in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+            self.assertLessEqual({'ix_auto_estado_id', 'ix_auto_publicacion', 'ix_foto_auto_auto_id', 'ix_venta_vendedor_fecha'}, nombres)
+            self.assertLessEqual(nombres, existentes)
+
+if __name__ == '__main__':
+    unittest.main()
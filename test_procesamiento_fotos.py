@@ -0,0 +1,205 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+from PIL import Image
+from app_final import app, db
+from models import Auto, FotoAuto, EstadoAuto, EstadoFoto, version_auto
+from utils.cache_http import cache_paginas, obtener_sellos
+from utils.procesamiento_fotos import cola_fotos, ruta_pendiente, TIEMPO_MAXIMO_PROCESANDO
+
+def imagen_bytes(ancho=800, alto=600):
+    datos = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (30, 30, 200)).save(datos, 'JPEG')
+    return datos.getvalue()
+
+class EjecutorManual:
+    """Guarda los trabajos y los ejecuta recién cuando el test lo pide"""
+
+    def __init__(self):
+        self.trabajos = []
+
+    def submit(self, funcion, *args):
+        futuro = Future()
+        self.trabajos.append((futuro, funcion, args))
+        return futuro
+
+    def ejecutar(self):
+        trabajos, self.trabajos = self.trabajos, []
+        for futuro, funcion, args in trabajos:
+            futuro.set_result(funcion(*args))
+
+class ProcesamientoFotosTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.temporal = tempfile.mkdtemp()
+        # Base en archivo: los hilos de la cola usan sus propias conexiones
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(self.temporal, 'fotos.db')
+        self.app = app.test_client()
+        cache_paginas.limpiar()
+
+        self.static_original = app.static_folder
+        app.static_folder = os.path.join(self.temporal, 'static')
+        self.pendientes = os.path.join(self.temporal, 'pendientes')
+        self.ejecutor = EjecutorManual()
+        cola_fotos.configurar(app, self.pendientes, ejecutor=self.ejecutor)
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(Auto(marca='Fiat', modelo='Cronos', anio=2020, precio=1000.0, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        app.static_folder = self.static_original
+        cola_fotos.configurar(app, app.config['FOTOS_PENDIENTES_DIR'], hilos=app.config['FOTOS_HILOS'])
+        shutil.rmtree(self.temporal)
+
+    def _subir(self, *archivos):
+        return self.app.post('/auto/1/editar', data={
+            'marca': 'Fiat', 'modelo': 'Cronos', 'anio': '2020', 'precio': '1000', 'kilometraje': '0',
+            'fotos': [(io.BytesIO(contenido), nombre) for nombre, contenido in archivos],
+        }, content_type='multipart/form-data')
+
+    def test_subida_devuelve_antes_de_procesar(self):
+        respuesta = self._subir(('a.jpg', imagen_bytes()), ('b.jpg', imagen_bytes()))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertTrue(respuesta.location.endswith('/auto/1/editar'))
+
+        with app.app_context():
+            fotos = FotoAuto.query.order_by(FotoAuto.id).all()
+            self.assertEqual([foto.estado for foto in fotos], [EstadoFoto.PENDIENTE] * 2)
+            for foto in fotos:
+                self.assertTrue(os.path.exists(ruta_pendiente(self.pendientes, foto)))
+                self.assertFalse(os.path.exists(os.path.join(app.static_folder, foto.ruta_archivo)))
+            rutas = [foto.ruta_archivo for foto in fotos]
+
+        self.assertIn('Procesando foto', self.app.get('/auto/1/editar').get_data(as_text=True))
+        estado = self.app.get('/auto/1/fotos/estado').get_json()
+        self.assertEqual(estado['pendientes'], 2)
+        self.assertEqual({foto['estado'] for foto in estado['fotos']}, {'PENDIENTE'})
+        self.assertIsNone(self.app.get('/api/autos').get_json()['autos'][0]['foto'])
+
+        self.ejecutor.ejecutar()
+
+        estado = self.app.get('/auto/1/fotos/estado').get_json()
+        self.assertEqual(estado['pendientes'], 0)
+        self.assertTrue(all(foto['url'].split('?')[0].endswith('_thumb.jpg') for foto in estado['fotos']))
+        self.assertTrue(self.app.get('/api/autos').get_json()['autos'][0]['foto'].split('?')[0].endswith('_card.jpg'))
+        self.assertEqual(os.listdir(self.pendientes), [])
+        with app.app_context():
+            for foto in FotoAuto.query.all():
+                self.assertEqual(foto.estado, EstadoFoto.LISTA)
+                self.assertIn(foto.ruta_archivo, rutas)
+                self.assertTrue(os.path.exists(os.path.join(app.static_folder, foto.variantes['card']['webp'])))
+
+    def test_archivo_invalido_queda_con_error(self):
+        self._subir(('roto.jpg', b'no es una imagen'))
+        self.ejecutor.ejecutar()
+        with app.app_context():
+            foto = FotoAuto.query.one()
+            self.assertEqual(foto.estado, EstadoFoto.ERROR)
+            self.assertIsNone(foto.variantes)
+            self.assertTrue(os.path.exists(os.path.join(app.static_folder, foto.ruta_archivo)))
+        self.assertEqual(self.app.get('/auto/1/fotos/estado').get_json()['pendientes'], 0)
+
+    def _versiones(self):
+        with app.app_context():
+            return obtener_sellos(['catalogo', version_auto(1)])[0]
+
+    def test_error_inesperado_invalida_las_paginas_del_auto(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        antes = self._versiones()
+        with mock.patch('utils.procesamiento_fotos.procesar_foto', side_effect=RuntimeError('disco lleno')):
+            self.ejecutor.ejecutar()
+        with app.app_context():
+            self.assertEqual(FotoAuto.query.one().estado, EstadoFoto.ERROR)
+        self.assertTrue(all(despues > previa for despues, previa in zip(self._versiones(), antes)))
+
+    def test_foto_eliminada_antes_de_procesarse(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        with app.app_context():
+            foto_id = FotoAuto.query.one().id
+        self.app.post(f'/auto/1/fotos/eliminar/{foto_id}')
+        self.assertEqual(os.listdir(self.pendientes), [])
+
+        self.ejecutor.ejecutar()
+        with app.app_context():
+            self.assertEqual(FotoAuto.query.count(), 0)
+
+    def test_cada_foto_se_procesa_una_sola_vez(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        with app.app_context():
+            foto_id = FotoAuto.query.one().id
+        cola_fotos.encolar([foto_id])
+        # El segundo trabajo no encuentra la foto pendiente (el archivo ya se movió) y no la marca con error
+        self.ejecutor.ejecutar()
+        with app.app_context():
+            self.assertEqual(FotoAuto.query.one().estado, EstadoFoto.LISTA)
+
+    def test_reanuda_pendientes_al_arrancar(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        self.ejecutor.trabajos = []  # El proceso se detuvo antes de procesarla
+        with app.app_context():
+            self.assertEqual(cola_fotos.reanudar_pendientes(), 1)
+        self.ejecutor.ejecutar()
+        with app.app_context():
+            self.assertEqual(FotoAuto.query.one().estado, EstadoFoto.LISTA)
+
+    def _trabar(self, hace):
+        """Deja la foto subida como si un proceso la hubiera tomado y se hubiera caído"""
+        with app.app_context():
+            foto = FotoAuto.query.one()
+            foto.estado = EstadoFoto.PROCESANDO
+            foto.procesando_desde = datetime.utcnow() - hace
+            db.session.commit()
+            return ruta_pendiente(self.pendientes, foto)
+
+    def test_trabada_con_archivo_vuelve_a_procesarse(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        self.ejecutor.trabajos = []
+        self._trabar(TIEMPO_MAXIMO_PROCESANDO / 2)
+        with app.app_context():
+            # Todavía puede estar procesándose en otro worker
+            self.assertEqual(cola_fotos.reanudar_pendientes(), 0)
+        self._trabar(TIEMPO_MAXIMO_PROCESANDO * 2)
+        with app.app_context():
+            self.assertEqual(cola_fotos.reanudar_pendientes(), 1)
+        self.ejecutor.ejecutar()
+        with app.app_context():
+            foto = FotoAuto.query.one()
+            self.assertEqual(foto.estado, EstadoFoto.LISTA)
+            self.assertIsNone(foto.procesando_desde)
+
+    def test_trabada_sin_archivo_queda_con_error(self):
+        self._subir(('a.jpg', imagen_bytes()))
+        self.ejecutor.trabajos = []
+        os.remove(self._trabar(TIEMPO_MAXIMO_PROCESANDO * 2))
+        antes = self._versiones()
+        with app.app_context():
+            self.assertEqual(cola_fotos.reanudar_pendientes(), 0)
+            self.assertEqual(FotoAuto.query.one().estado, EstadoFoto.ERROR)
+        self.assertTrue(all(despues > previa for despues, previa in zip(self._versiones(), antes)))
+        self.assertEqual(self.app.get('/auto/1/fotos/estado').get_json()['pendientes'], 0)
+
+    def test_grupo_de_hilos(self):
+        cola_fotos.configurar(app, self.pendientes, ejecutor=ThreadPoolExecutor(max_workers=2))
+        self._subir(*[(f'{i}.jpg', imagen_bytes(1200, 900)) for i in range(4)])
+        cola_fotos.esperar(timeout=30)
+        with app.app_context():
+            self.assertEqual({foto.estado for foto in FotoAuto.query.all()}, {EstadoFoto.LISTA})
+            self.assertEqual(FotoAuto.query.count(), 4)
+
+if __name__ == '__main__':
+    unittest.main()
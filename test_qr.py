@@ -0,0 +1,115 @@
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from flask import Flask
+from models import db, Auto, EstadoAuto
+from routes.autos import autos_bp
+from utils import qr
+
+PNG_FALSO = b'\x89PNG falso'
+
+class QrTests(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.app = Flask('agencia')
+        self.app.config.update(TESTING=True, QR_DIR=self.directorio, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:',
+                               SQLALCHEMY_TRACK_MODIFICATIONS=False)
+        db.init_app(self.app)
+        self.app.register_blueprint(autos_bp, url_prefix='/autos')
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Auto(marca='Fiat', modelo='Uno', anio=2015, precio=1000.0, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Fiat', modelo='Palio', anio=2016, precio=1000.0, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Ford', modelo='Ka', anio=2017, precio=1000.0, estado=EstadoAuto.VENDIDO),
+            ])
+            db.session.commit()
+
+        self.generar = mock.patch.object(qr, 'generar_png', return_value=PNG_FALSO).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def test_se_genera_una_sola_vez_por_contenido(self):
+        with self.app.app_context():
+            clave = qr.obtener_qr('https://agencia/autos/ficha/1')
+            self.assertEqual(qr.obtener_qr('https://agencia/autos/ficha/1'), clave)
+            self.assertNotEqual(qr.clave_qr('https://agencia/autos/ficha/2'), clave)
+            self.assertEqual(self.generar.call_count, 1)
+
+            with open(qr.ruta_qr(clave), 'rb') as archivo:
+                self.assertEqual(archivo.read(), PNG_FALSO)
+            self.assertEqual(os.listdir(self.directorio), [f'{clave}.png'])
+
+            self.assertIsNone(qr.ruta_qr('../../etc/passwd'))
+            self.assertIsNone(qr.ruta_qr('0' * 64))
+
+    def test_dos_hilos_con_el_mismo_codigo(self):
+        # Los dos pasan el chequeo de existencia antes de que alguno escriba
+        barrera = threading.Barrier(2, timeout=5)
+        def generar(contenido):
+            barrera.wait()
+            return PNG_FALSO
+        self.generar.side_effect = generar
+
+        errores = []
+        def obtener():
+            try:
+                with self.app.app_context():
+                    qr.obtener_qr('https://agencia/autos/ficha/1')
+            except Exception as e:
+                errores.append(e)
+        hilos = [threading.Thread(target=obtener) for _ in range(2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        clave = qr.clave_qr('https://agencia/autos/ficha/1')
+        self.assertEqual(os.listdir(self.directorio), [f'{clave}.png'])
+        with open(os.path.join(self.directorio, f'{clave}.png'), 'rb') as archivo:
+            self.assertEqual(archivo.read(), PNG_FALSO)
+
+    def test_url_cacheable(self):
+        cliente = self.app.test_client()
+        with self.app.test_request_context():
+            url = qr.url_qr('https://agencia/autos/ficha/1')
+
+        respuesta = cliente.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.mimetype, 'image/png')
+        self.assertEqual(respuesta.get_data(), PNG_FALSO)
+        self.assertIn('max-age=31536000', respuesta.headers['Cache-Control'])
+        self.assertIn('immutable', respuesta.headers['Cache-Control'])
+        respuesta.close()
+
+        self.assertEqual(cliente.get('/autos/qr/' + '0' * 64 + '.png').status_code, 404)
+
+    def test_precalentar_autos_disponibles(self):
+        runner = self.app.test_cli_runner()
+        resultado = runner.invoke(args=['autos', 'precalentar-qr', '--url-base', 'https://agencia.example/'])
+        self.assertEqual(resultado.exit_code, 0, resultado.output)
+        self.assertIn('2 generados', resultado.output)
+        self.assertEqual(sorted(c.args[0] for c in self.generar.call_args_list),
+                         ['https://agencia.example/autos/autos/ficha/1', 'https://agencia.example/autos/autos/ficha/2'])
+
+        resultado = runner.invoke(args=['autos', 'precalentar-qr', '--url-base', 'https://agencia.example/'])
+        self.assertIn('0 generados, 2 ya existían', resultado.output)
+
+    @unittest.skipUnless(importlib.util.find_spec('qrcode'), 'qrcode no está instalado')
+    def test_png_real(self):
+        mock.patch.stopall()
+        self.assertTrue(qr.generar_png('https://agencia/autos/ficha/1').startswith(b'\x89PNG'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+from datetime import datetime
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Usuario, Auto, Venta, EstadoAuto, EstadoPago
+from utils.reportes import calcular_estadisticas, obtener_ranking_vendedores
+from utils.helpers import rango_periodo
+
+def _filtro_mes(anio, mes):
+    return db.or_(
+        db.and_(db.extract('year', Venta.fecha_venta) == anio,
+               db.extract('month', Venta.fecha_venta) == mes),
+        db.and_(db.extract('year', Venta.fecha_seña) == anio,
+               db.extract('month', Venta.fecha_seña) == mes,
+               Venta.fecha_venta == None)
+    )
+
+def estadisticas_consulta_por_consulta(anio, mes_actual):
+    """Implementación original de /estadisticas (una consulta por cada cifra), usada como referencia"""
+    ventas_por_mes = [Venta.query.filter(_filtro_mes(anio, mes)).count() for mes in range(1, 13)]
+
+    ventas_por_vendedor = []
+    for vendedor in Usuario.query.filter(Usuario.rol.in_(['admin', 'vendedor'])).all():
+        count = Venta.query.filter_by(vendedor_id=vendedor.id).count()
+        if count > 0:
+            ventas_por_vendedor.append({
+                'nombre': f"{vendedor.nombre} {vendedor.apellido}",
+                'ventas': count,
+                'ventas_ars': Venta.query.filter_by(vendedor_id=vendedor.id, moneda='ARS').count(),
+                'ventas_usd': Venta.query.filter_by(vendedor_id=vendedor.id, moneda='USD').count(),
+                'monto_ars': db.session.query(db.func.sum(Venta.precio_venta))
+                             .filter_by(vendedor_id=vendedor.id, moneda='ARS').scalar() or 0,
+                'monto_usd': db.session.query(db.func.sum(Venta.precio_venta))
+                             .filter_by(vendedor_id=vendedor.id, moneda='USD').scalar() or 0
+            })
+    ventas_por_vendedor = sorted(ventas_por_vendedor, key=lambda x: x['ventas'], reverse=True)
+
+    def ingresos(moneda, *filtros):
+        return db.session.query(db.func.sum(Venta.precio_venta))\
+                 .filter(Venta.moneda == moneda, *filtros).scalar() or 0
+
+    def costos(moneda, *filtros):
+        return db.session.query(db.func.coalesce(db.func.sum(Auto.precio_compra), 0))\
+                 .join(Venta, Venta.auto_id == Auto.id)\
+                 .filter(Venta.moneda == moneda, *filtros).scalar() or 0
+
+    def cantidad(moneda, *filtros):
+        return Venta.query.filter(Venta.moneda == moneda, *filtros).count()
+
+    resultado = {
+        'ventas_por_mes': ventas_por_mes,
+        'ventas_por_vendedor': ventas_por_vendedor,
+        'total_ventas': Venta.query.count(),
+        'año_actual': anio
+    }
+    for moneda in ('ARS', 'USD'):
+        sufijo = moneda.lower()
+        resultado[f'ingresos_{sufijo}'] = ingresos(moneda)
+        resultado[f'costo_{sufijo}'] = costos(moneda)
+        resultado[f'ganancia_{sufijo}'] = resultado[f'ingresos_{sufijo}'] - resultado[f'costo_{sufijo}']
+        resultado[f'ventas_por_mes_{sufijo}'] = [cantidad(moneda, _filtro_mes(anio, m)) for m in range(1, 13)]
+        resultado[f'ingresos_por_mes_{sufijo}'] = [ingresos(moneda, _filtro_mes(anio, m)) for m in range(1, 13)]
+        resultado[f'ganancias_por_mes_{sufijo}'] = [
+            ingresos(moneda, _filtro_mes(anio, m)) - costos(moneda, _filtro_mes(anio, m)) for m in range(1, 13)
+        ]
+        resultado[f'ventas_mes_actual_{sufijo}'] = cantidad(moneda, _filtro_mes(anio, mes_actual))
+        resultado[f'ingresos_mes_actual_{sufijo}'] = ingresos(moneda, _filtro_mes(anio, mes_actual))
+        resultado[f'costos_mes_actual_{sufijo}'] = costos(moneda, _filtro_mes(anio, mes_actual))
+        resultado[f'ganancia_mes_actual_{sufijo}'] = (resultado[f'ingresos_mes_actual_{sufijo}'] -
+                                                      resultado[f'costos_mes_actual_{sufijo}'])
+
+    resultado['ventas_mes_actual'] = Venta.query.filter(_filtro_mes(anio, mes_actual)).count()
+    resultado['ingresos_totales'] = resultado['ingresos_ars'] + resultado['ingresos_usd']
+    resultado['costo_total'] = resultado['costo_ars'] + resultado['costo_usd']
+    resultado['ganancia_total'] = resultado['ganancia_ars'] + resultado['ganancia_usd']
+    resultado['ingresos_por_mes'] = [resultado['ingresos_por_mes_ars'][i] + resultado['ingresos_por_mes_usd'][i]
+                                     for i in range(12)]
+    resultado['ganancias_por_mes'] = [resultado['ganancias_por_mes_ars'][i] + resultado['ganancias_por_mes_usd'][i]
+                                      for i in range(12)]
+    return resultado
+
+class ReportesTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+        with app.app_context():
+            db.create_all()
+
+            vendedores = []
+            for i, rol in enumerate(['vendedor', 'admin', 'vendedor', 'administrador']):
+                usuario = Usuario(username=f'user{i}', password='x', nombre=f'Nombre{i}',
+                                  apellido='Test', email=f'user{i}@test.com', rol=rol)
+                db.session.add(usuario)
+                vendedores.append(usuario)
+            db.session.flush()
+
+            marcas = ['Toyota', 'Ford', 'Fiat', 'Peugeot', 'Renault', 'Chevrolet', 'VW']
+            for i in range(60):
+                auto = Auto(marca=marcas[i % len(marcas)], modelo=f'Modelo{i}', anio=2015 + i % 8,
+                            precio=1000.0 * (i + 1), precio_compra=750.0 * (i + 1),
+                            estado=EstadoAuto.VENDIDO)
+                db.session.add(auto)
+                db.session.flush()
+
+                # Mezcla de ventas pagadas (fecha_venta) y solo señadas, en varios años
+                anio = 2023 + i % 3
+                fecha_seña = datetime(anio, (i % 12) + 1, (i % 27) + 1)
+                fecha_venta = datetime(anio, ((i + 3) % 12) + 1, 5) if i % 4 else None
+                db.session.add(Venta(
+                    auto_id=auto.id,
+                    fecha_seña=fecha_seña,
+                    fecha_venta=fecha_venta,
+                    cliente_nombre='Cliente',
+                    cliente_apellido=str(i),
+                    precio_venta=1250.0 * (i + 1),
+                    moneda='USD' if i % 3 == 0 else 'ARS',
+                    estado_pago=EstadoPago.PAGADO if fecha_venta else EstadoPago.SEÑADO,
+                    vendedor_id=vendedores[i % len(vendedores)].id if i % 5 else None
+                ))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_mismas_cifras_que_la_version_original(self):
+        with app.test_request_context():
+            for anio in (2023, 2024, 2025, 2030):
+                for mes_actual in (1, 6, 12):
+                    esperado = estadisticas_consulta_por_consulta(anio, mes_actual)
+                    obtenido = calcular_estadisticas(anio, mes_actual)
+                    self.assertTrue(esperado['ventas_por_vendedor'])
+                    # El ranking agrega posición y comisiones a los campos originales
+                    obtenido['ventas_por_vendedor'] = [
+                        {clave: v[clave] for clave in esperado['ventas_por_vendedor'][0]}
+                        for v in obtenido['ventas_por_vendedor']
+                    ]
+                    for clave, valor in esperado.items():
+                        self.assertEqual(obtenido[clave], valor, f'{clave} ({anio}-{mes_actual})')
+
+    def test_marcas_vendidas(self):
+        with app.test_request_context():
+            marcas = calcular_estadisticas(2024, 1)['marcas_vendidas']
+            self.assertEqual(len(marcas), 5)
+            self.assertEqual(sum(1 for m in marcas if m['count'] > 0), 5)
+
+    def test_ranking_por_periodo_en_una_consulta(self):
+        with app.test_request_context():
+            with ContadorConsultas(db.engine) as contador:
+                ranking = obtener_ranking_vendedores(*rango_periodo('trimestre', anio=2024, trimestre=2), roles=None)
+            self.assertEqual(len(contador.sentencias), 1)
+
+            # Referencia: ventas con fecha efectiva en abril-junio de 2024
+            esperado = {}
+            for venta in Venta.query.filter(Venta.vendedor_id != None).all():
+                fecha = venta.fecha_venta or venta.fecha_seña
+                if fecha.year == 2024 and 4 <= fecha.month <= 6:
+                    esperado[venta.vendedor_id] = esperado.get(venta.vendedor_id, 0) + 1
+
+            self.assertEqual({v['id']: v['ventas'] for v in ranking}, esperado)
+            self.assertEqual([v['posicion'] for v in ranking], list(range(1, len(ranking) + 1)))
+            self.assertEqual([v['ventas'] for v in ranking], sorted(esperado.values(), reverse=True))
+
+    def test_rango_periodo(self):
+        self.assertEqual(rango_periodo('trimestre', anio=2024, trimestre=4), (datetime(2024, 10, 1), datetime(2025, 1, 1)))
+        self.assertEqual(rango_periodo('rango', desde='2024-02-10', hasta='2024-02-10'),
+                         (datetime(2024, 2, 10), datetime(2024, 2, 11)))
+        self.assertEqual(rango_periodo('total'), (None, None))
+        for periodo, kwargs in (('semana', {'anio': 2024}), ('mes', {'anio': 2024, 'mes': 13}),
+                                ('rango', {'desde': '2024-03-01', 'hasta': '2024-02-01'})):
+            with self.assertRaises(ValueError):
+                rango_periodo(periodo, **kwargs)
+
+if __name__ == '__main__':
+    unittest.main()
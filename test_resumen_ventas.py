@@ -0,0 +1,109 @@
+import unittest
+from datetime import datetime
+from app_final import app, db
+from models import Usuario, Auto, Venta, VentaResumenMensual, EstadoAuto, EstadoPago
+from utils.resumen_ventas import reconstruir_resumen, verificar_resumen
+
+class ResumenVentasTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+
+        with app.app_context():
+            db.create_all()
+
+            vendedor = Usuario(username='vendedor', password='x', nombre='Ana', apellido='Test',
+                               email='ana@test.com', rol='vendedor')
+            db.session.add(vendedor)
+            for marca in ('Toyota', 'Ford', 'Fiat'):
+                db.session.add(Auto(marca=marca, modelo='X', anio=2020, precio=100.0, precio_compra=60.0,
+                                    estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _vender(self, auto_id, precio=100.0, moneda='ARS', fecha_seña=datetime(2024, 3, 10), fecha_venta=None):
+        venta = Venta(auto_id=auto_id, fecha_seña=fecha_seña, fecha_venta=fecha_venta,
+                      cliente_nombre='Cliente', cliente_apellido='Test', precio_venta=precio,
+                      moneda=moneda, ganancia=precio - 60.0, monto_comision=2.0,
+                      estado_pago=EstadoPago.SEÑADO, vendedor_id=Usuario.query.first().id)
+        db.session.add(venta)
+        db.session.commit()
+        return venta
+
+    def test_insertar_suma_al_grupo(self):
+        with app.app_context():
+            self._vender(1)
+            self._vender(1, precio=200.0)
+
+            grupo = VentaResumenMensual.query.one()
+            self.assertEqual((grupo.anio, grupo.mes, grupo.moneda, grupo.marca), (2024, 3, 'ARS', 'Toyota'))
+            self.assertEqual(grupo.cantidad, 2)
+            self.assertEqual(grupo.total_venta, 300.0)
+            self.assertEqual(grupo.total_compra, 120.0)
+            self.assertEqual(grupo.total_ganancia, 180.0)
+            self.assertEqual(grupo.total_comision, 4.0)
+            self.assertEqual(verificar_resumen(), [])
+
+    def test_actualizar_mueve_la_venta_de_grupo(self):
+        with app.app_context():
+            venta = self._vender(1)
+            venta_id = venta.id
+            db.session.expire_all()
+
+            # Modificar un objeto expirado: el valor anterior se lee de la base
+            venta = Venta.query.get(venta_id)
+            db.session.expire(venta)
+            venta.fecha_venta = datetime(2024, 5, 2)
+            venta.moneda = 'USD'
+            db.session.commit()
+
+            grupo = VentaResumenMensual.query.one()
+            self.assertEqual((grupo.mes, grupo.moneda, grupo.cantidad), (5, 'USD', 1))
+            self.assertEqual(verificar_resumen(), [])
+
+            # Cambios que no afectan el resumen
+            venta.cliente_nombre = 'Otro'
+            db.session.commit()
+            self.assertEqual(verificar_resumen(), [])
+
+    def test_cambio_de_marca_o_costo_del_auto(self):
+        with app.app_context():
+            self._vender(2)
+            auto = Auto.query.get(2)
+            auto.marca = 'Peugeot'
+            auto.precio_compra = 80.0
+            db.session.commit()
+
+            grupo = VentaResumenMensual.query.one()
+            self.assertEqual((grupo.marca, grupo.total_compra), ('Peugeot', 80.0))
+            self.assertEqual(verificar_resumen(), [])
+
+    def test_eliminar_quita_el_grupo_vacio(self):
+        with app.app_context():
+            venta = self._vender(3)
+            self._vender(1)
+            db.session.delete(venta)
+            db.session.commit()
+
+            self.assertEqual([g.marca for g in VentaResumenMensual.query.all()], ['Toyota'])
+            self.assertEqual(verificar_resumen(), [])
+
+    def test_reconstruir_despues_de_cambios_masivos(self):
+        with app.app_context():
+            self._vender(1)
+            self._vender(2, moneda='USD', fecha_venta=datetime(2025, 1, 1))
+
+            # Las actualizaciones masivas no disparan eventos
+            Venta.query.update({Venta.precio_venta: 500.0})
+            db.session.commit()
+            self.assertTrue(verificar_resumen())
+
+            self.assertEqual(reconstruir_resumen(), 2)
+            self.assertEqual(verificar_resumen(), [])
+
+if __name__ == '__main__':
+    unittest.main()
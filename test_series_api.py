@@ -0,0 +1,101 @@
+import unittest
+from datetime import datetime
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Usuario, Auto, Venta, EstadoAuto, EstadoPago
+from utils.cache import cache_estadisticas
+
+class SeriesApiTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        cache_estadisticas.limpiar()
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            vendedores = []
+            for i in range(2):
+                usuario = Usuario(username=f'user{i}', password='x', nombre=f'Nombre{i}',
+                                  apellido='Test', email=f'user{i}@test.com', rol='vendedor')
+                db.session.add(usuario)
+                vendedores.append(usuario)
+            db.session.flush()
+
+            # (fecha, moneda, precio, vendedor)
+            ventas = [
+                (datetime(2023, 12, 10), 'USD', 100.0, 0),
+                (datetime(2024, 1, 5), 'USD', 200.0, 0),
+                (datetime(2024, 1, 20), 'USD', 300.0, 1),
+                (datetime(2024, 3, 1), 'ARS', 5000.0, 1),
+                (datetime(2024, 3, 2), 'USD', 400.0, None),
+                (datetime(2025, 1, 1), 'USD', 800.0, 0),
+            ]
+            for i, (fecha, moneda, precio, vendedor) in enumerate(ventas):
+                auto = Auto(marca='Ford' if i % 2 else 'Fiat', modelo='X', anio=2020, precio=precio,
+                            precio_compra=precio / 2, estado=EstadoAuto.VENDIDO)
+                db.session.add(auto)
+                db.session.flush()
+                db.session.add(Venta(auto_id=auto.id, fecha_seña=fecha, cliente_nombre='C', cliente_apellido=str(i),
+                                     precio_venta=precio, moneda=moneda, estado_pago=EstadoPago.SEÑADO,
+                                     vendedor_id=vendedores[vendedor].id if vendedor is not None else None))
+            db.session.commit()
+
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _series(self, **params):
+        with app.app_context():
+            respuesta = self.app.get('/estadisticas/api/series', query_string=params)
+            self.assertEqual(respuesta.status_code, 200)
+            return respuesta
+
+    def test_serie_total(self):
+        datos = self._series(metric='ingresos', moneda='USD', desde='2023-12', hasta='2024-03').get_json()
+        self.assertEqual(datos['meses'], ['2023-12', '2024-01', '2024-02', '2024-03'])
+        self.assertEqual(datos['series'], [{'clave': 'total', 'nombre': 'Total', 'valores': [100.0, 500.0, 0, 400.0]}])
+
+    def test_serie_por_vendedor_en_una_consulta(self):
+        with app.app_context(), ContadorConsultas(db.engine) as contador:
+            datos = self._series(metric='cantidad', desde='2023-01', hasta='2025-12', group='vendedor').get_json()
+
+        consultas = [sql for sql in contador.sentencias if 'venta_resumen_mensual' in sql]
+        self.assertEqual(len(consultas), 1)
+        self.assertEqual(len(datos['meses']), 36)
+        por_nombre = {serie['nombre']: sum(serie['valores']) for serie in datos['series']}
+        self.assertEqual(por_nombre, {'Nombre0 Test': 3, 'Nombre1 Test': 2, 'Sin vendedor': 1})
+
+    def test_etag_y_304(self):
+        params = dict(metric='ganancias', moneda='USD', desde='2024-01', hasta='2024-12', group='marca')
+        respuesta = self._series(**params)
+        etag = respuesta.headers['ETag']
+
+        with app.app_context():
+            repetida = self.app.get('/estadisticas/api/series', query_string=params, headers={'If-None-Match': etag})
+            self.assertEqual(repetida.status_code, 304)
+            self.assertEqual(repetida.data, b'')
+
+            # Una venta nueva cambia la versión y por lo tanto el ETag
+            venta = Venta.query.first()
+            venta.precio_venta = 999.0
+            db.session.commit()
+            cambiada = self.app.get('/estadisticas/api/series', query_string=params, headers={'If-None-Match': etag})
+            self.assertEqual(cambiada.status_code, 200)
+            self.assertNotEqual(cambiada.headers['ETag'], etag)
+
+    def test_parametros_invalidos(self):
+        with app.app_context():
+            for params in ({'metric': 'otra'}, {'moneda': 'EUR'}, {'group': 'cliente'},
+                           {'desde': '2024-13'}, {'desde': '2024-05', 'hasta': '2024-01'},
+                           {'desde': '2000-01', 'hasta': '2024-01'}):
+                respuesta = self.app.get('/estadisticas/api/series', query_string=params)
+                self.assertEqual(respuesta.status_code, 400, params)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, FotoAuto, EstadoAuto
+from utils.cache_http import cache_paginas
+from utils.similares import indice_similares, autos_similares
+
+class SimilaresTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+        indice_similares.limpiar()
+        cache_paginas.limpiar()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Auto(marca='Fiat', modelo='Cronos', anio=2020, precio=10000.0, moneda='USD', kilometraje=50000, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Fiat', modelo='Argo', anio=2019, precio=11000.0, moneda='USD', kilometraje=60000, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Ford', modelo='Ka', anio=2019, precio=10500.0, moneda='USD', kilometraje=55000, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Fiat', modelo='Uno', anio=2008, precio=3000.0, moneda='USD', kilometraje=200000, estado=EstadoAuto.DISPONIBLE),
+                Auto(marca='Fiat', modelo='Toro', anio=2020, precio=10000.0, moneda='USD', kilometraje=50000, estado=EstadoAuto.VENDIDO),
+                Auto(marca='Fiat', modelo='Mobi', anio=2021, precio=9000000.0, moneda='ARS', estado=EstadoAuto.DISPONIBLE),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _similares(self, auto_id, cantidad=3):
+        return [a.modelo for a in autos_similares(Auto.query.get(auto_id), cantidad)]
+
+    def test_ordena_por_cercania_sin_el_propio_ni_los_vendidos(self):
+        with app.app_context():
+            similares = self._similares(1, cantidad=10)
+            self.assertEqual(similares[0], 'Argo')
+            self.assertLess(similares.index('Ka'), similares.index('Uno'))
+            self.assertEqual(sorted(similares), ['Argo', 'Ka', 'Mobi', 'Uno'])
+            # Un auto vendido también tiene similares (los disponibles)
+            self.assertEqual(self._similares(5, cantidad=1), ['Cronos'])
+
+    def test_actualiza_solo_los_autos_cambiados(self):
+        with app.app_context():
+            self._similares(1)
+            self.assertEqual(len(indice_similares), 5)
+
+            Auto.query.get(2).estado = EstadoAuto.VENDIDO
+            db.session.add(Auto(marca='Fiat', modelo='Siena', anio=2020, precio=10100.0, moneda='USD',
+                                kilometraje=51000, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+
+            with ContadorConsultas(db.engine) as contador:
+                similares = self._similares(1)
+
+            self.assertEqual(similares[0], 'Siena')
+            self.assertNotIn('Argo', similares)
+            self.assertEqual(len(indice_similares), 5)
+            # Solo se releen los autos modificados (por id), no todo el catálogo
+            lecturas = [sql for sql in contador.sentencias if 'FROM auto' in sql and 'kilometraje' in sql and 'precio_compra' not in sql]
+            self.assertEqual(len(lecturas), 1)
+            self.assertIn('auto.id IN', lecturas[0])
+
+    def test_baja_de_autos(self):
+        with app.app_context():
+            self._similares(1)
+            db.session.delete(Auto.query.get(2))
+            db.session.commit()
+            self.assertNotIn('Argo', self._similares(1, cantidad=10))
+            self.assertEqual(len(indice_similares), 4)
+
+    def test_detalle_muestra_los_similares(self):
+        respuesta = self.app.get('/auto/1')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'Autos similares', respuesta.data)
+        self.assertIn(b'href="/auto/2"', respuesta.data)
+
+        # Vender un similar cambia la página aunque el auto mostrado no cambie
+        etag = respuesta.headers['ETag']
+        with app.app_context():
+            Auto.query.get(2).estado = EstadoAuto.VENDIDO
+            db.session.commit()
+        respuesta = self.app.get('/auto/1', headers={'If-None-Match': etag})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn(b'href="/auto/2"', respuesta.data)
+
+    def test_detalle_depende_solo_de_sus_similares(self):
+        etag = self.app.get('/auto/1').headers['ETag']
+        # Una foto de un auto que no aparece en la página (el vendido) no la invalida
+        with app.app_context():
+            db.session.add(FotoAuto(auto_id=5, ruta_archivo='uploads/autos/5/a.jpg'))
+            db.session.commit()
+        self.assertEqual(self.app.get('/auto/1', headers={'If-None-Match': etag}).status_code, 304)
+
+        # Un auto nuevo que entra en la franja sí
+        with app.app_context():
+            db.session.add(Auto(marca='Fiat', modelo='Pulse', anio=2020, precio=10100.0, moneda='USD',
+                                kilometraje=51000, estado=EstadoAuto.DISPONIBLE))
+            db.session.commit()
+        respuesta = self.app.get('/auto/1', headers={'If-None-Match': etag})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(b'Pulse', respuesta.data)
+
+if __name__ == '__main__':
+    unittest.main()
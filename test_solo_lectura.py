@@ -0,0 +1,100 @@
+import unittest
+from datetime import datetime
+from flask import url_for
+from jinja2 import TemplateNotFound
+from sqlalchemy import text
+from app_final import app, db
+from contador_consultas import ContadorConsultas
+from models import Auto, FotoAuto, EstadoAuto, Usuario, Venta, EstadoPago
+from utils.migraciones import aplicar_migraciones
+
+# Acciones que todavía se disparan con un GET desde enlaces (modifican datos a propósito)
+ACCIONES_GET = {'admin_emergency', 'marcar_pagado', 'eliminar_usuario', 'aprobar_usuario'}
+
+# Valores para las variables de las rutas
+VARIABLES = {'auto_id': 1, 'venta_id': 1, 'usuario_id': 2, 'foto_id': 1, 'rol': 'vendedor', 'filename': 'img/x.png'}
+
+ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+class SoloLecturaTests(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+        self.app = app.test_client()
+
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Usuario(username='jefe', password='x', nombre='J', apellido='J', email='j@a', rol='administrador_jefe'),
+                Usuario(username='vende', password='x', nombre='V', apellido='V', email='v@a', rol='vendedor'),
+            ])
+            # Un auto cargado antes de que existiera la URL para compartir, con una foto subida en Windows
+            auto = Auto(marca='Fiat', modelo='Uno', anio=2015, precio=1000.0, estado=EstadoAuto.DISPONIBLE)
+            db.session.add(auto)
+            db.session.flush()
+            db.session.add(Venta(auto_id=auto.id, fecha_seña=datetime(2024, 1, 10), cliente_nombre='C', cliente_apellido='D',
+                                 precio_venta=1000.0, monto_seña=100.0, estado_pago=EstadoPago.SEÑADO, vendedor_id=2))
+            db.session.commit()
+            db.session.execute(text(
+                "INSERT INTO foto_auto (auto_id, ruta_archivo, es_principal, orden) VALUES (1, 'uploads\\autos\\1\\a.jpg', 1, 0)"
+            ))
+            db.session.commit()
+
+    def tearDown(self):
+        app.config.pop('URL_PUBLICA', None)
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _escrituras(self, url):
+        with app.app_context(), ContadorConsultas(db.engine) as contador:
+            try:
+                respuesta = self.app.get(url)
+            except TemplateNotFound:
+                # Vistas cuya plantilla no está en el repositorio (editar_usuario.html): igual se revisan las consultas
+                respuesta = None
+        return respuesta, [sql for sql in contador.sentencias if sql.lstrip().upper().startswith(ESCRITURAS)]
+
+    def test_detalle_no_escribe(self):
+        for _ in range(2):
+            respuesta, escrituras = self._escrituras('/auto/1')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(escrituras, [])
+
+    def test_ningun_get_escribe(self):
+        with self.app.session_transaction() as sesion:
+            sesion['user_id'] = 1
+            sesion['rol'] = 'administrador_jefe'
+
+        with app.test_request_context():
+            urls = {
+                regla.endpoint: url_for(regla.endpoint, **{v: VARIABLES[v] for v in regla.arguments})
+                for regla in app.url_map.iter_rules()
+                if 'GET' in regla.methods and regla.endpoint not in ACCIONES_GET
+            }
+
+        for endpoint, url in sorted(urls.items()):
+            with self.subTest(endpoint=endpoint):
+                respuesta, escrituras = self._escrituras(url)
+                if respuesta is not None:
+                    respuesta.close()
+                    self.assertLess(respuesta.status_code, 500)
+                self.assertEqual(escrituras, [])
+
+    def test_rutas_normalizadas_al_guardar(self):
+        with app.app_context():
+            foto = FotoAuto(auto_id=1, ruta_archivo='uploads\\autos\\1\\b.jpg')
+            self.assertEqual(foto.ruta_archivo, 'uploads/autos/1/b.jpg')
+
+    def test_migracion_completa_los_datos(self):
+        app.config['URL_PUBLICA'] = 'https://agencia.example'
+        with app.app_context():
+            aplicar_migraciones()
+            aplicar_migraciones()
+            db.session.expire_all()
+            auto = Auto.query.get(1)
+            self.assertEqual(auto.url_compartir, 'https://agencia.example/auto/1')
+            self.assertEqual(auto.fotos[0].ruta_archivo, 'uploads/autos/1/a.jpg')
+
+if __name__ == '__main__':
+    unittest.main()
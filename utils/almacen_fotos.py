@@ -0,0 +1,91 @@
+import os
+import hashlib
+import logging
+from flask import current_app
+from sqlalchemy.dialects.sqlite import insert
+from models import db, ArchivoFoto
+from utils.imagenes import VARIANTES, FORMATOS, ruta_variante
+
+logger = logging.getLogger(__name__)
+
+# Almacén de fotos por contenido: cada archivo se guarda una sola vez en uploads/fotos/<ab>/<sha256>.<ext>
+# y las FotoAuto que lo usan lo referencian por su hash (ArchivoFoto.referencias las cuenta).
+# Subir la misma foto en otro auto no ocupa más disco, y el archivo se borra con la última referencia.
+
+CARPETA = 'uploads/fotos'
+BLOQUE = 1024 * 1024
+
+def ruta_contenido(hash_archivo, extension):
+    """Ruta (relativa a static) del contenido: dos niveles para no juntar miles de archivos en una carpeta"""
+    return f'{CARPETA}/{hash_archivo[:2]}/{hash_archivo}{extension.lower()}'
+
+def guardar_hasheando(flujo, destino):
+    """Copia el flujo al destino en bloques calculando el SHA-256 al pasar; devuelve (hash, bytes)"""
+    sha = hashlib.sha256()
+    tamanio = 0
+    with open(destino, 'wb') as archivo:
+        for bloque in iter(lambda: flujo.read(BLOQUE), b''):
+            sha.update(bloque)
+            archivo.write(bloque)
+            tamanio += len(bloque)
+    return sha.hexdigest(), tamanio
+
+def hash_archivo(ruta):
+    """SHA-256 de un archivo ya guardado"""
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(BLOQUE), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def registrar_archivo(hash_contenido, extension, tamanio):
+    """Crea el ArchivoFoto si no existe (en la transacción en curso) y devuelve su ruta.
+
+    Si el contenido ya estaba se conserva la ruta original, aunque la nueva subida tenga otra extensión.
+    Las referencias las suman los eventos de FotoAuto al guardarla.
+    """
+    db.session.execute(insert(ArchivoFoto.__table__).values(
+        hash=hash_contenido, ruta_archivo=ruta_contenido(hash_contenido, extension), tamanio=tamanio, referencias=0
+    ).on_conflict_do_nothing())
+    return db.session.query(ArchivoFoto.ruta_archivo).filter_by(hash=hash_contenido).scalar()
+
+def rutas_contenido(ruta):
+    """El archivo y todas sus variantes posibles (relativas a static)"""
+    return [ruta] + [ruta_variante(ruta, variante, formato) for variante in VARIANTES for formato in FORMATOS]
+
+def liberar_archivos(hashes, carpeta_static=None, carpeta_pendientes=None):
+    """Borra el contenido que quedó sin referencias. Llamar después del commit que eliminó las fotos.
+
+    Devuelve la cantidad de archivos de contenido borrados.
+    """
+    carpeta = carpeta_static or current_app.static_folder
+    pendientes = carpeta_pendientes or current_app.config.get('FOTOS_PENDIENTES_DIR')
+    borrados = 0
+    for hash_contenido in set(filter(None, hashes)):
+        archivo = ArchivoFoto.query.get(hash_contenido)
+        if archivo is None or archivo.referencias > 0:
+            continue
+        ruta = archivo.ruta_archivo
+        # Condicional: si otra subida volvió a usar el contenido mientras tanto, se conserva
+        if not ArchivoFoto.query.filter_by(hash=hash_contenido, referencias=0).delete(synchronize_session=False):
+            db.session.rollback()
+            continue
+
+        # Los archivos se borran antes del commit: mientras tanto la fila sigue bloqueada y una subida
+        # del mismo contenido espera en registrar_archivo; después ya no encuentra el archivo y guarda
+        # su propia copia en lugar de apuntar a uno que se está borrando
+        rutas = [os.path.join(carpeta, r) for r in rutas_contenido(ruta)]
+        if pendientes:
+            # También la copia que esperaba ser procesada, si la foto se eliminó antes
+            rutas.append(os.path.join(pendientes, os.path.basename(ruta)))
+        try:
+            for ruta_completa in rutas:
+                try:
+                    if os.path.exists(ruta_completa):
+                        os.remove(ruta_completa)
+                except OSError as e:
+                    logger.error(f"Error al eliminar archivo: {e}")
+        finally:
+            db.session.commit()
+        borrados += 1
+    return borrados
@@ -0,0 +1,29 @@
+import re
+from models import db, Auto
+
+# Búsqueda del catálogo sobre el índice FTS5 auto_fts (ver DDL_BUSQUEDA_AUTOS en models)
+
+_fts = db.table('auto_fts', db.column('rowid'), db.column('rank', db.Float))
+
+def expresion_fts(texto):
+    """Convierte el texto ingresado en una consulta FTS5: cada palabra, como prefijo, tiene que aparecer"""
+    palabras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+def buscar_autos(query, texto):
+    """Restringe query a los autos que coinciden con el texto.
+
+    Devuelve (query, relevancia): relevancia es la columna por la que ordenar de mayor a menor
+    (bm25 con signo invertido), o None si el texto no tiene palabras y query queda igual.
+    """
+    expresion = expresion_fts(texto)
+    if not expresion:
+        return query, None
+
+    coincidencias = db.select(
+        _fts.c.rowid.label('auto_id'),
+        (-_fts.c.rank).label('relevancia')
+    ).where(db.literal_column('auto_fts').op('MATCH')(expresion)).subquery()
+
+    query = query.join(coincidencias, coincidencias.c.auto_id == Auto.id)
+    return query, coincidencias.c.relevancia
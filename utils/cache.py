@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+from models import db, VersionDatos
+
+def obtener_version(nombre):
+    """Versión actual de un grupo de datos (0 si nunca se modificó)"""
+    return db.session.query(VersionDatos.version).filter_by(nombre=nombre).scalar() or 0
+
+class CacheVersionada:
+    """Cache LRU en memoria cuyas claves incluyen la versión de los datos.
+
+    Cada escritura en los modelos registrados incrementa la versión en la base,
+    así que todos los workers dejan de usar los resultados viejos sin coordinarse.
+    Los valores devueltos se comparten entre requests: no deben modificarse.
+    """
+
+    def __init__(self, nombre_version, max_entradas=64):
+        self.nombre_version = nombre_version
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self._entradas = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor cacheado para la clave o lo calcula con calcular()"""
+        # La versión se lee antes que los datos: si cambian mientras se calcula,
+        # el resultado queda guardado con la versión vieja y no se vuelve a usar
+        version = obtener_version(self.nombre_version)
+        clave_completa = (version,) + tuple(clave)
+
+        with self._lock:
+            if version != self._version:
+                # Las entradas de otras versiones ya no sirven
+                self._entradas.clear()
+                self._version = version
+
+            if clave_completa in self._entradas:
+                self._entradas.move_to_end(clave_completa)
+                self.hits += 1
+                return self._entradas[clave_completa]
+            self.misses += 1
+
+        valor = calcular()
+
+        with self._lock:
+            self._entradas[clave_completa] = valor
+            self._entradas.move_to_end(clave_completa)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+        return valor
+
+    def limpiar(self):
+        """Vacía la cache y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+            self.hits = 0
+            self.misses = 0
+
+    def estadisticas(self):
+        """Contadores de uso de la cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'version': self._version,
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'hits': self.hits,
+                'misses': self.misses,
+                'tasa_aciertos': round(self.hits / total, 3) if total else 0
+            }
+
+# Cache compartida por las páginas de estadísticas
+cache_estadisticas = CacheVersionada('estadisticas', max_entradas=64)
@@ -0,0 +1,247 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import timedelta, timezone
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request, session, make_response
+from models import db, VersionDatos
+
+# GET condicional para las páginas públicas del catálogo. Cada respuesta lleva un ETag fuerte (derivado
+# de las versiones de version_datos de las que depende, la URL y el usuario) y Last-Modified. Si el
+# cliente ya tiene la versión actual se responde 304 con una sola consulta, sin ORM ni plantillas.
+# Para visitantes anónimos además se guarda la respuesta completa (ver CacheRespuestas).
+
+# Política de Cache-Control para los endpoints sin una propia en app.config['CACHE_CONTROL']
+POLITICA_DEFECTO = 'no-cache'
+
+def obtener_sellos(nombres):
+    """Versiones de los grupos de datos (en el orden de nombres, 0 si no existen) y su última modificación (UTC)"""
+    tabla = VersionDatos.__table__
+    filas = {
+        nombre: (version, actualizado)
+        for nombre, version, actualizado in db.session.execute(
+            db.select(tabla.c.nombre, tabla.c.version, tabla.c.actualizado).where(tabla.c.nombre.in_(nombres))
+        )
+    }
+    versiones = tuple(filas.get(nombre, (0, None))[0] for nombre in nombres)
+    fechas = [actualizado for _, actualizado in filas.values() if actualizado]
+    return versiones, max(fechas).replace(tzinfo=timezone.utc) if fechas else None
+
+class CacheRespuestas:
+    """Cache de respuestas completas: LRU en memoria limitada en bytes y, opcionalmente, en disco.
+
+    Las claves incluyen las versiones de los datos (son los ETag), así que una modificación solo deja
+    de usar las páginas que dependen de lo modificado. El directorio en disco se comparte entre los
+    workers de gunicorn; las entradas viejas no se vuelven a leer y se borran las menos usadas.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, directorio=None, max_archivos=2000):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.max_archivos = max_archivos
+        self.hits = 0
+        self.hits_disco = 0
+        self.misses = 0
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._escrituras = 0
+        self._lock = threading.Lock()
+
+    def configurar(self, max_bytes=None, directorio=None, max_archivos=None):
+        """Cambia los límites y el directorio en disco (None lo desactiva)"""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_archivos is not None:
+                self.max_archivos = max_archivos
+            self.directorio = directorio
+            self._recortar()
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def obtener(self, clave):
+        """(tipo de contenido, cuerpo) guardado para la clave, o None"""
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.hits += 1
+                return self._entradas[clave]
+
+        entrada = self._leer_disco(clave)
+        with self._lock:
+            if entrada is None:
+                self.misses += 1
+                return None
+            self.hits_disco += 1
+            self._agregar(clave, entrada)
+        return entrada
+
+    def guardar(self, clave, tipo, cuerpo):
+        entrada = (tipo, cuerpo)
+        with self._lock:
+            self._agregar(clave, entrada)
+        self._escribir_disco(clave, entrada)
+
+    def _agregar(self, clave, entrada):
+        # Se llama con el lock tomado
+        if len(entrada[1]) > self.max_bytes:
+            return
+        anterior = self._entradas.pop(clave, None)
+        if anterior:
+            self._bytes -= len(anterior[1])
+        self._entradas[clave] = entrada
+        self._bytes += len(entrada[1])
+        self._recortar()
+
+    def _recortar(self):
+        while self._bytes > self.max_bytes and self._entradas:
+            _, (_, cuerpo) = self._entradas.popitem(last=False)
+            self._bytes -= len(cuerpo)
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        ruta = os.path.join(self.directorio, clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                tipo, cuerpo = archivo.read().split(b'\n', 1)
+            os.utime(ruta)  # Marca de uso para el recorte por antigüedad
+        except (OSError, ValueError):
+            return None
+        return tipo.decode(), cuerpo
+
+    def _escribir_disco(self, clave, entrada):
+        if not self.directorio:
+            return
+        tipo, cuerpo = entrada
+        try:
+            # Archivo temporal y os.replace: otro worker nunca lee un archivo a medio escribir
+            descriptor, temporal = tempfile.mkstemp(dir=self.directorio, suffix='.tmp')
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(tipo.encode() + b'\n' + cuerpo)
+            os.replace(temporal, os.path.join(self.directorio, clave))
+        except OSError as e:
+            current_app.logger.warning(f"No se pudo guardar la página en la cache en disco: {e}")
+            return
+
+        with self._lock:
+            self._escrituras += 1
+            recortar = self._escrituras % 100 == 0
+        if recortar:
+            self._recortar_disco()
+
+    def _recortar_disco(self):
+        """Borra los archivos menos usados si hay más de max_archivos"""
+        try:
+            archivos = [entrada for entrada in os.scandir(self.directorio) if entrada.is_file()]
+            archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+            for entrada in archivos[:max(0, len(archivos) - self.max_archivos)]:
+                os.remove(entrada.path)
+        except OSError:
+            pass
+
+    def limpiar(self):
+        """Vacía la memoria y el directorio en disco y reinicia los contadores"""
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+            self.hits = self.hits_disco = self.misses = 0
+        if self.directorio and os.path.isdir(self.directorio):
+            for entrada in os.scandir(self.directorio):
+                try:
+                    os.remove(entrada.path)
+                except OSError:
+                    pass
+
+    def estadisticas(self):
+        """Contadores de uso de la cache"""
+        with self._lock:
+            total = self.hits + self.hits_disco + self.misses
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disco': self.directorio,
+                'hits': self.hits,
+                'hits_disco': self.hits_disco,
+                'misses': self.misses,
+                'tasa_aciertos': round((self.hits + self.hits_disco) / total, 3) if total else 0
+            }
+
+# Páginas del catálogo para visitantes anónimos
+cache_paginas = CacheRespuestas()
+
+def url_normalizada():
+    """Host, ruta y parámetros ordenados: el mismo listado con los parámetros en otro orden es la misma página"""
+    return request.host_url + request.path.lstrip('/') + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+def politica_cache(endpoint, autenticado=False):
+    """Cache-Control configurado para el endpoint; las respuestas de usuarios logueados siempre son privadas"""
+    politica = current_app.config.get('CACHE_CONTROL', {}).get(endpoint) \
+        or current_app.config.get('CACHE_CONTROL_DEFECTO', POLITICA_DEFECTO)
+    if autenticado:
+        directivas = [d.strip() for d in politica.split(',') if d.strip() not in ('public', '')]
+        politica = ', '.join(['private'] + [d for d in directivas if d != 'private' and not d.startswith('s-maxage')])
+    return politica
+
+def respuesta_condicional(sellos):
+    """Decorador de vistas GET: ETag, Last-Modified, Cache-Control y 304 Not Modified.
+
+    sellos es la lista de nombres de versión de los que depende la página, o una función que la
+    devuelve a partir de los argumentos de la vista (p. ej. lambda auto_id: [version_auto(auto_id)]).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            # Con mensajes flash pendientes la página es única: se arma siempre
+            if session.get('_flashes'):
+                return vista(*args, **kwargs)
+
+            nombres = sellos(**kwargs) if callable(sellos) else sellos
+            versiones, modificado = obtener_sellos(nombres)
+            usuario = (session.get('user_id'), session.get('rol'))
+            # La fecha completa distingue versiones con el mismo número si la base se recrea
+            # Los nombres también: con sellos calculados (p. ej. los autos similares) pueden cambiar
+            etag = hashlib.sha1(repr((
+                nombres, versiones, modificado, url_normalizada(), usuario, current_app.config.get('VERSION_DESPLIEGUE', '')
+            )).encode()).hexdigest()
+            # Los visitantes anónimos ven todos la misma página: se guarda completa con el ETag como clave
+            anonimo = usuario[0] is None
+
+            # Last-Modified va en segundos enteros: se redondea hacia arriba para que nunca quede antes
+            # de la modificación real y el cliente pueda devolverlo tal cual en If-Modified-Since
+            if modificado and modificado.microsecond:
+                modificado = modificado.replace(microsecond=0) + timedelta(seconds=1)
+
+            # If-None-Match tiene prioridad; If-Modified-Since solo se usa si el cliente no manda ETag
+            if request.if_none_match:
+                no_modificado = request.if_none_match.contains(etag)
+            else:
+                no_modificado = modificado is not None and request.if_modified_since is not None \
+                    and modificado <= request.if_modified_since
+
+            guardada = cache_paginas.obtener(etag) if anonimo and not no_modificado else None
+            if no_modificado:
+                respuesta = current_app.response_class(status=304)
+            elif guardada:
+                respuesta = current_app.response_class(guardada[1], content_type=guardada[0])
+            else:
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+                # Si la vista tocó la sesión la respuesta lleva una cookie propia del visitante
+                if anonimo and not session.modified and not respuesta.is_streamed:
+                    cache_paginas.guardar(etag, respuesta.content_type, respuesta.get_data())
+
+            respuesta.set_etag(etag)
+            if modificado:
+                respuesta.last_modified = modificado
+            respuesta.headers['Cache-Control'] = politica_cache(request.endpoint, usuario[0] is not None)
+            # El contenido cambia con la sesión (menú, precios de compra, etc.)
+            respuesta.vary.add('Cookie')
+            return respuesta
+        return envoltura
+    return decorador
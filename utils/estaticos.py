@@ -0,0 +1,86 @@
+import os
+import hashlib
+import mimetypes
+from urllib.parse import quote
+from flask import current_app, request, send_file, abort, make_response
+from werkzeug.utils import safe_join
+
+# Archivos estáticos (logos, assets y fotos subidas) con cache de un año. url_for('static') agrega
+# a la URL la huella del archivo (?v=...): si el archivo cambia, cambia la URL, así que el navegador
+# no necesita revalidarlo. Se sirven las versiones precomprimidas (.br/.gz, ver comprimir_estaticos.py)
+# y, si se configura ENVIO_ARCHIVOS, el envío de los bytes queda a cargo del servidor de adelante.
+
+UN_ANIO = 31536000
+
+# Extensiones de texto que vale la pena comprimir de antemano
+COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+
+# Codificaciones precomprimidas en orden de preferencia: (nombre en Accept-Encoding, extensión)
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+def huella(ruta):
+    """Huella corta del archivo (tamaño y fecha de modificación): cambia cuando el archivo se reemplaza"""
+    datos = os.stat(ruta)
+    return hashlib.sha1(f'{datos.st_size}-{datos.st_mtime_ns}'.encode()).hexdigest()[:12]
+
+def _agregar_huella(endpoint, valores):
+    # url_defaults de la aplicación: solo toca las URL de static
+    if endpoint != 'static' or 'v' in valores or not valores.get('filename'):
+        return
+    ruta = safe_join(current_app.static_folder, valores['filename'])
+    if ruta and os.path.isfile(ruta):
+        valores['v'] = huella(ruta)
+
+def _precomprimido(ruta):
+    """Versión .br o .gz del archivo que acepte el navegador (y que no sea más vieja), o None"""
+    if os.path.splitext(ruta)[1].lower() not in COMPRIMIBLES:
+        return None, None
+    aceptadas = request.accept_encodings
+    modificado = os.path.getmtime(ruta)
+    for codificacion, extension in CODIFICACIONES:
+        candidata = ruta + extension
+        if aceptadas[codificacion] and os.path.isfile(candidata) and os.path.getmtime(candidata) >= modificado:
+            return candidata, codificacion
+    return None, None
+
+def servir_estatico(filename):
+    """Reemplaza la vista static de Flask: cache inmutable con la huella correcta, precomprimidos y envío delegado"""
+    ruta = safe_join(current_app.static_folder, filename)
+    if ruta is None or not os.path.isfile(ruta):
+        abort(404)
+
+    # Solo la URL con la huella actual se cachea un año; otra (vieja o sin huella) se revalida
+    inmutable = request.args.get('v') == huella(ruta)
+    mimetype = mimetypes.guess_type(ruta)[0] or 'application/octet-stream'
+    envio = current_app.config.get('ENVIO_ARCHIVOS')
+
+    if envio == 'x-accel':
+        # nginx sirve el archivo desde una location internal (con gzip_static/brotli_static si se quiere)
+        respuesta = make_response('')
+        respuesta.headers['X-Accel-Redirect'] = current_app.config.get('X_ACCEL_PREFIJO', '/_static/') + quote(
+            os.path.relpath(ruta, current_app.static_folder).replace(os.sep, '/'))
+        respuesta.mimetype = mimetype
+    else:
+        comprimido, codificacion = _precomprimido(ruta)
+        # Con ENVIO_ARCHIVOS = 'x-sendfile' Flask (USE_X_SENDFILE) solo manda el encabezado X-Sendfile
+        respuesta = send_file(comprimido or ruta, mimetype=mimetype, conditional=True,
+                              max_age=UN_ANIO if inmutable else current_app.get_send_file_max_age(filename))
+        if os.path.splitext(ruta)[1].lower() in COMPRIMIBLES:
+            respuesta.vary.add('Accept-Encoding')
+        if comprimido:
+            respuesta.headers['Content-Encoding'] = codificacion
+
+    if inmutable:
+        respuesta.cache_control.public = True
+        respuesta.cache_control.max_age = UN_ANIO
+        respuesta.cache_control.immutable = True
+    elif envio == 'x-accel':
+        respuesta.cache_control.no_cache = True
+    return respuesta
+
+def configurar_estaticos(app):
+    """Agrega la huella a las URL de static y reemplaza su vista"""
+    if app.config.get('ENVIO_ARCHIVOS') == 'x-sendfile':
+        app.config['USE_X_SENDFILE'] = True
+    app.url_defaults(_agregar_huella)
+    app.view_functions['static'] = servir_estatico
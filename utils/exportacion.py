@@ -0,0 +1,111 @@
+import csv
+import io
+import tempfile
+import zlib
+from models import db, Venta, Auto, Usuario
+
+# Las exportaciones recorren las ventas con una única consulta (venta + auto + vendedor)
+# que se lee por lotes, sin cargar entidades ni todo el resultado en memoria.
+
+TAMANIO_LOTE = 1000
+
+COLUMNAS_EXPORTACION = [
+    'ID', 'Fecha Seña', 'Fecha Venta', 'Auto', 'Cliente', 'Vendedor', 'Precio Compra',
+    'Precio Venta', 'Moneda', 'Seña', 'Saldo', 'Estado', 'Ganancia', 'Comisión'
+]
+
+def consulta_exportacion(*filtros):
+    """SELECT de las columnas exportadas, filtrado, ordenado por id y leído de a TAMANIO_LOTE filas"""
+    return db.session.query(
+        Venta.id,
+        Venta.fecha_seña,
+        Venta.fecha_venta,
+        Auto.marca,
+        Auto.modelo,
+        Auto.anio,
+        Venta.cliente_nombre,
+        Venta.cliente_apellido,
+        Usuario.nombre,
+        Usuario.apellido,
+        Venta.precio_compra,
+        Venta.precio_venta,
+        Venta.moneda,
+        Venta.monto_seña,
+        Venta.saldo_restante,
+        Venta.estado_pago,
+        Venta.ganancia,
+        Venta.monto_comision
+    ).select_from(Venta)\
+     .outerjoin(Auto, Venta.auto_id == Auto.id)\
+     .outerjoin(Usuario, Venta.vendedor_id == Usuario.id)\
+     .filter(*filtros)\
+     .order_by(Venta.id)\
+     .yield_per(TAMANIO_LOTE)
+
+def filas_exportacion(consulta):
+    """Convierte cada registro de consulta_exportacion en una fila con el orden de COLUMNAS_EXPORTACION"""
+    for (venta_id, fecha_seña, fecha_venta, marca, modelo, anio, cliente_nombre, cliente_apellido,
+         vendedor_nombre, vendedor_apellido, precio_compra, precio_venta, moneda, monto_seña,
+         saldo_restante, estado_pago, ganancia, monto_comision) in consulta:
+        yield [
+            venta_id,
+            fecha_seña,
+            fecha_venta,
+            f"{marca} {modelo} ({anio})" if marca else "Auto no disponible",
+            f"{cliente_nombre} {cliente_apellido}",
+            f"{vendedor_nombre} {vendedor_apellido}" if vendedor_nombre else "Sin vendedor",
+            precio_compra,
+            precio_venta,
+            moneda,
+            monto_seña,
+            saldo_restante,
+            estado_pago.value if estado_pago else "Desconocido",
+            ganancia,
+            monto_comision
+        ]
+
+def generar_excel_ventas(filas, titulo_hoja='Ventas'):
+    """Escribe las filas en un .xlsx (modo write-only de openpyxl) y devuelve el archivo temporal listo para leer.
+
+    Hasta 8 MB el archivo queda en memoria; si crece pasa a disco.
+    """
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(titulo_hoja[:31])
+    hoja.append(COLUMNAS_EXPORTACION)
+    for fila in filas:
+        hoja.append(fila)
+
+    archivo = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+def generar_csv_ventas(filas, filas_por_bloque=500):
+    """Genera el CSV por bloques de texto: el encabezado sale enseguida y las filas a medida que se leen"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    # BOM para que Excel detecte UTF-8
+    buffer.write('\ufeff')
+    escritor.writerow(COLUMNAS_EXPORTACION)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for i, fila in enumerate(filas, start=1):
+        escritor.writerow(fila)
+        if i % filas_por_bloque == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def comprimir_gzip(bloques, encoding='utf-8'):
+    """Comprime en gzip un generador de bloques de texto sin juntarlos en memoria"""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        # Z_SYNC_FLUSH entrega cada bloque completo al cliente en cuanto está listo
+        yield compresor.compress(bloque.encode(encoding)) + compresor.flush(zlib.Z_SYNC_FLUSH)
+    yield compresor.flush()
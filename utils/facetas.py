@@ -0,0 +1,86 @@
+from models import db, Auto, EstadoAuto
+from utils.cache import CacheVersionada
+
+# Facetas del catálogo: cantidad de autos por marca, tramo de año, tramo de precio (por moneda)
+# y estado para el conjunto de filtros actual. Se calculan con una sola consulta agrupada y se
+# guardan por firma de filtros; cualquier cambio en Auto incrementa la versión 'autos' y las invalida.
+
+# Límites inferiores de los tramos de año (el último tramo queda abierto)
+TRAMOS_ANIO = [2010, 2015, 2020]
+
+# Límites de los tramos de precio de cada moneda
+TRAMOS_PRECIO = {
+    'ARS': [5000000, 10000000, 20000000],
+    'USD': [5000, 10000, 20000],
+}
+
+# Parámetros de paginación: no cambian el conjunto de autos
+PARAMETROS_IGNORADOS = ('cursor', 'por_pagina')
+
+cache_facetas = CacheVersionada('autos', max_entradas=128)
+
+def firma_filtros(alcance, args):
+    """Clave de cache: el alcance (catálogo, stock) y los filtros no vacíos, en orden"""
+    return (alcance,) + tuple(sorted(
+        (clave, valor) for clave, valor in args.items(multi=True) if valor and clave not in PARAMETROS_IGNORADOS
+    ))
+
+def _indice_tramo(columna, limites):
+    """Expresión con el índice del tramo de columna (0 = menor al primer límite)"""
+    return db.case(*[(columna < limite, indice) for indice, limite in enumerate(limites)], else_=len(limites))
+
+def _tramos(limites, formato):
+    """Tramos [desde, limite) con su etiqueta para mostrar; hasta es el último valor entero incluido"""
+    bordes = [None] + limites + [None]
+    tramos = []
+    for desde, hasta in zip(bordes, bordes[1:]):
+        if desde is None:
+            etiqueta = f'Hasta {formato(hasta - 1)}'
+        elif hasta is None:
+            etiqueta = f'Desde {formato(desde)}'
+        else:
+            etiqueta = f'{formato(desde)} a {formato(hasta - 1)}'
+        tramos.append({'etiqueta': etiqueta, 'desde': desde, 'hasta': hasta - 1 if hasta else None, 'limite': hasta})
+    return tramos
+
+def _formato_precio(moneda):
+    simbolo = 'US$' if moneda == 'USD' else '$'
+    return lambda valor: f'{simbolo}{valor:,.0f}'.replace(',', '.')
+
+def calcular_facetas(query):
+    """Cuenta los autos de query por marca, tramo de año, tramo de precio por moneda y estado en una consulta"""
+    # Los autos sin moneda (o con otra) se cuentan como ARS, igual que en el resto de la aplicación
+    moneda = db.case((Auto.moneda == 'USD', 'USD'), else_='ARS')
+    tramo_precio = db.case(
+        (Auto.moneda == 'USD', _indice_tramo(Auto.precio, TRAMOS_PRECIO['USD'])),
+        else_=_indice_tramo(Auto.precio, TRAMOS_PRECIO['ARS'])
+    )
+    columnas = [Auto.marca, _indice_tramo(Auto.anio, TRAMOS_ANIO), moneda, tramo_precio, Auto.estado]
+
+    filas = query.order_by(None).with_entities(*columnas, db.func.count(Auto.id)).group_by(*columnas).all()
+
+    marcas, anios, estados = {}, [0] * (len(TRAMOS_ANIO) + 1), {}
+    precios = {m: [0] * (len(limites) + 1) for m, limites in TRAMOS_PRECIO.items()}
+    for marca, tramo_anio, moneda_auto, tramo, estado, cantidad in filas:
+        marcas[marca] = marcas.get(marca, 0) + cantidad
+        anios[tramo_anio] += cantidad
+        precios[moneda_auto][tramo] += cantidad
+        estados[estado] = estados.get(estado, 0) + cantidad
+
+    def con_cantidades(tramos, cantidades):
+        return [dict(tramo, cantidad=cantidad) for tramo, cantidad in zip(tramos, cantidades) if cantidad]
+
+    return {
+        'total': sum(marcas.values()),
+        'marcas': [{'valor': m, 'cantidad': c} for m, c in sorted(marcas.items(), key=lambda x: (x[0] or '').lower())],
+        'anios': con_cantidades(_tramos(TRAMOS_ANIO, str), anios),
+        'precios': {
+            m: con_cantidades(_tramos(TRAMOS_PRECIO[m], _formato_precio(m)), precios[m])
+            for m in TRAMOS_PRECIO if any(precios[m])
+        },
+        'estados': [{'valor': e.value, 'cantidad': estados[e]} for e in EstadoAuto if e in estados],
+    }
+
+def obtener_facetas(alcance, args, query):
+    """Facetas de query para los filtros de args, desde la cache si ya se calcularon para esta versión"""
+    return cache_facetas.obtener(firma_filtros(alcance, args), lambda: calcular_facetas(query))
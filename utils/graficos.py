@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, url_for
+
+# Los gráficos se dibujan en procesos aparte con el backend Agg y se guardan en disco
+# con el hash de su especificación como nombre: el mismo gráfico nunca se dibuja dos veces
+# y su URL puede cachearse para siempre.
+
+PATRON_CLAVE = re.compile(r'[0-9a-f]{64}')
+
+_pool = None
+_pendientes = {}
+_lock = threading.Lock()
+
+def clave_grafico(especificacion):
+    """Hash SHA-256 de la especificación (tipo, títulos, etiquetas y series)"""
+    contenido = json.dumps(especificacion, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+def directorio_graficos():
+    directorio = current_app.config.get('GRAFICOS_DIR') or os.path.join(current_app.root_path, 'cache', 'graficos')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+def _obtener_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=current_app.config.get('GRAFICOS_PROCESOS', 2))
+        return _pool
+
+def renderizar_png(especificacion, ruta):
+    """Dibuja el gráfico y lo guarda en ruta (se ejecuta en un proceso del pool)"""
+    # Figure + FigureCanvasAgg no usan el estado global de pyplot
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    figura = Figure(figsize=tuple(especificacion.get('tamanio', (12, 6))))
+    FigureCanvasAgg(figura)
+    ejes = figura.subplots()
+
+    x = especificacion['x']
+    for serie in especificacion['series']:
+        if especificacion['tipo'] == 'barras':
+            ejes.bar(x, serie['valores'], label=serie.get('nombre'))
+        else:
+            ejes.plot(x, serie['valores'], marker=serie.get('marcador'), label=serie.get('nombre'))
+
+    ejes.set_title(especificacion.get('titulo', ''))
+    ejes.set_xlabel(especificacion.get('etiqueta_x', ''))
+    ejes.set_ylabel(especificacion.get('etiqueta_y', ''))
+    if especificacion.get('rotacion'):
+        ejes.tick_params(axis='x', labelrotation=especificacion['rotacion'])
+    ejes.grid(axis=especificacion.get('grilla', 'both'), linestyle='--', alpha=0.7)
+    if len(especificacion['series']) > 1:
+        ejes.legend()
+    if especificacion.get('ajustar'):
+        figura.tight_layout()
+
+    # Escribir en un temporal y renombrar para no servir nunca un PNG a medias
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    figura.savefig(temporal, format='png')
+    os.replace(temporal, ruta)
+    return ruta
+
+def _rutas(clave):
+    directorio = directorio_graficos()
+    return os.path.join(directorio, f'{clave}.png'), os.path.join(directorio, f'{clave}.json')
+
+def _encolar(clave, especificacion, ruta_png):
+    """Envía el gráfico al pool si no hay ya un trabajo pendiente para esa clave"""
+    with _lock:
+        futuro = _pendientes.get(clave)
+    if futuro is not None:
+        return futuro
+
+    futuro = _obtener_pool().submit(renderizar_png, especificacion, ruta_png)
+    with _lock:
+        futuro = _pendientes.setdefault(clave, futuro)
+    futuro.add_done_callback(lambda _: _pendientes.pop(clave, None))
+    return futuro
+
+def solicitar_grafico(especificacion):
+    """Devuelve la clave del gráfico y, si todavía no existe en disco, lo encola para dibujarlo"""
+    clave = clave_grafico(especificacion)
+    ruta_png, ruta_json = _rutas(clave)
+    if os.path.exists(ruta_png):
+        return clave
+
+    # La especificación queda en disco para que cualquier worker pueda dibujarlo
+    if not os.path.exists(ruta_json):
+        temporal = f"{ruta_json}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(especificacion, archivo, ensure_ascii=False, default=str)
+        os.replace(temporal, ruta_json)
+
+    _encolar(clave, especificacion, ruta_png)
+    return clave
+
+def url_grafico(especificacion):
+    """URL estable del PNG del gráfico; el request no espera a que se dibuje"""
+    return url_for('estadisticas.grafico', clave=solicitar_grafico(especificacion))
+
+def ruta_grafico(clave, espera=30):
+    """Ruta del PNG ya dibujado, esperando al pool si hace falta. None si la clave no existe.
+
+    Lanza TimeoutError si no se termina de dibujar en espera segundos, o el error del proceso que lo dibujaba.
+    """
+    if not PATRON_CLAVE.fullmatch(clave):
+        return None
+
+    ruta_png, ruta_json = _rutas(clave)
+    if os.path.exists(ruta_png):
+        return ruta_png
+    if not os.path.exists(ruta_json):
+        return None
+
+    with open(ruta_json, encoding='utf-8') as archivo:
+        especificacion = json.load(archivo)
+    _encolar(clave, especificacion, ruta_png).result(timeout=espera)
+    return ruta_png
@@ -2,6 +2,7 @@ import os
 import uuid
 from werkzeug.utils import secure_filename
 from flask import current_app
+from datetime import datetime, timedelta
 
 def formato_precio(valor):
     """Formatea un número como precio en formato $X,XXX.XX"""
@@ -37,3 +38,65 @@ def guardar_imagen(archivo, directorio_destino):
 def generar_url_compartir(request, auto_id):
     """Genera una URL para compartir un auto"""
     return f"{request.host_url}auto/{auto_id}"
+
+# Años aceptados en los filtros (el fin del intervalo tiene que seguir siendo una fecha válida)
+ANIO_MINIMO, ANIO_MAXIMO = 1900, 9998
+
+def rango_fechas(anio, mes=None):
+    """Devuelve el año (o el mes) como intervalo semiabierto [inicio, fin) para filtrar por fecha.
+
+    Lanza ValueError si el año está fuera de ANIO_MINIMO..ANIO_MAXIMO.
+    """
+    if not ANIO_MINIMO <= anio <= ANIO_MAXIMO:
+        raise ValueError(f'Año fuera de rango: {anio}')
+    if mes is None:
+        return datetime(anio, 1, 1), datetime(anio + 1, 1, 1)
+    if mes == 12:
+        return datetime(anio, 12, 1), datetime(anio + 1, 1, 1)
+    return datetime(anio, mes, 1), datetime(anio, mes + 1, 1)
+
+def parsear_mes(texto):
+    """Convierte 'YYYY-MM' en (anio, mes). Lanza ValueError si el formato no es válido"""
+    fecha = datetime.strptime(texto or '', '%Y-%m')
+    return fecha.year, fecha.month
+
+PERIODOS = ('mes', 'trimestre', 'anio', 'rango', 'total')
+
+def rango_periodo(periodo, anio=None, mes=None, trimestre=None, desde=None, hasta=None):
+    """Convierte un período en un intervalo semiabierto [inicio, fin). 'total' no tiene límites.
+
+    'rango' recibe desde y hasta como 'YYYY-MM-DD', ambos inclusive. Lanza ValueError si falta algún dato.
+    """
+    if periodo == 'total':
+        return None, None
+    if periodo == 'rango':
+        inicio = datetime.strptime(desde or '', '%Y-%m-%d')
+        fin = datetime.strptime(hasta or '', '%Y-%m-%d') + timedelta(days=1)
+        if fin <= inicio:
+            raise ValueError('La fecha hasta es anterior a desde')
+        return inicio, fin
+    if periodo not in PERIODOS or anio is None:
+        raise ValueError(f'Período inválido: {periodo}')
+    if periodo == 'anio':
+        return rango_fechas(anio)
+    if periodo == 'mes':
+        if mes is None or not 1 <= mes <= 12:
+            raise ValueError('Mes inválido')
+        return rango_fechas(anio, mes)
+    if trimestre is None or not 1 <= trimestre <= 4:
+        raise ValueError('Trimestre inválido')
+    return datetime(anio, trimestre * 3 - 2, 1), rango_fechas(anio, trimestre * 3)[1]
+
+def periodo_desde_args(args, periodo_defecto='anio'):
+    """Lee periodo, anio, mes, trimestre, desde y hasta de request.args y devuelve (periodo, inicio, fin)"""
+    ahora = datetime.now()
+    periodo = args.get('periodo', periodo_defecto)
+    inicio, fin = rango_periodo(
+        periodo,
+        anio=args.get('anio', type=int, default=ahora.year),
+        mes=args.get('mes', type=int, default=ahora.month),
+        trimestre=args.get('trimestre', type=int, default=(ahora.month - 1) // 3 + 1),
+        desde=args.get('desde'),
+        hasta=args.get('hasta')
+    )
+    return periodo, inicio, fin
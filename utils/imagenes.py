@@ -0,0 +1,95 @@
+import os
+import logging
+import threading
+from flask import current_app, url_for
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Variantes de cada foto subida: ancho máximo en píxeles (el original nunca se agranda).
+# thumb para la franja de similares, card para las tarjetas del catálogo y full para el carrusel
+VARIANTES = {'thumb': 320, 'card': 640, 'full': 1600}
+
+# WebP para los navegadores que lo aceptan y JPEG de respaldo (extensión y opciones de Pillow)
+FORMATOS = {
+    'webp': ('webp', {'format': 'WEBP', 'quality': 80, 'method': 6}),
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+def ruta_variante(ruta_archivo, variante, formato):
+    """Ruta (relativa a static) de una variante: junto al original, con sufijo y extensión propios"""
+    base, _ = os.path.splitext(ruta_archivo)
+    return f'{base}_{variante}.{FORMATOS[formato][0]}'
+
+def _abrir(ruta):
+    """Abre la imagen derecha (las fotos de celular vienen giradas por EXIF) y en RGB"""
+    with Image.open(ruta) as original:
+        imagen = ImageOps.exif_transpose(original)
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            # JPEG no tiene transparencia: fondo blanco en lugar de negro
+            imagen = imagen.convert('RGBA')
+            fondo = Image.new('RGB', imagen.size, 'white')
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            return fondo
+        return imagen.convert('RGB')
+
+def _guardar(imagen, ruta, opciones):
+    # Se escribe aparte y se renombra: nunca se sirve una variante a medio escribir.
+    # El temporal es propio del hilo: dos fotos con el mismo contenido pueden procesarse a la vez
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    imagen.save(temporal, **opciones)
+    os.replace(temporal, ruta)
+
+def generar_variantes(ruta_archivo, carpeta_static=None):
+    """Genera las variantes de la foto en todos los formatos y devuelve su descripción.
+
+    El resultado es lo que se guarda en FotoAuto.variantes:
+    {'card': {'ancho': 640, 'alto': 480, 'webp': 'uploads/...', 'jpeg': 'uploads/...'}, ...}
+    """
+    carpeta = carpeta_static or current_app.static_folder
+    imagen = _abrir(os.path.join(carpeta, ruta_archivo))
+    ancho_original, alto_original = imagen.size
+
+    variantes = {}
+    # De la más grande a la más chica: cada una se reduce desde la anterior, que ya pesa menos
+    # (el alto se calcula sobre el original para no acumular redondeos)
+    for variante, ancho in sorted(VARIANTES.items(), key=lambda item: -item[1]):
+        if imagen.width > ancho:
+            imagen = imagen.resize((ancho, max(1, round(alto_original * ancho / ancho_original))),
+                                   Image.LANCZOS, reducing_gap=3.0)
+
+        datos = {'ancho': imagen.width, 'alto': imagen.height}
+        for formato, (_, opciones) in FORMATOS.items():
+            datos[formato] = ruta_variante(ruta_archivo, variante, formato)
+            _guardar(imagen, os.path.join(carpeta, datos[formato]), opciones)
+        variantes[variante] = datos
+    return variantes
+
+def procesar_foto(foto, carpeta_static=None):
+    """Genera las variantes de una FotoAuto y las registra; si el archivo no es una imagen válida queda el original"""
+    try:
+        foto.variantes = generar_variantes(foto.ruta_archivo, carpeta_static)
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning(f"No se pudieron generar las variantes de {foto.ruta_archivo}: {e}")
+        foto.variantes = None
+    return foto.variantes is not None
+
+def archivos_foto(foto):
+    """Rutas (relativas a static) del original y de todas sus variantes, para borrarlas juntas"""
+    rutas = [foto.ruta_archivo]
+    for datos in (foto.variantes or {}).values():
+        rutas.extend(datos[formato] for formato in FORMATOS if formato in datos)
+    return rutas
+
+def url_foto(foto, variante='card', formato='jpeg'):
+    """URL de una variante de la foto, o del original si todavía no tiene variantes"""
+    datos = (foto.variantes or {}).get(variante)
+    return url_for('static', filename=datos[formato] if datos else foto.ruta_archivo)
+
+def srcset_foto(foto, formato='jpeg'):
+    """Atributo srcset con todas las variantes de la foto en el formato pedido"""
+    anchos = {}
+    for datos in (foto.variantes or {}).values():
+        # Si el original es chico varias variantes tienen el mismo ancho: basta una
+        anchos.setdefault(datos['ancho'], datos[formato])
+    return ', '.join(f"{url_for('static', filename=ruta)} {ancho}w" for ancho, ruta in sorted(anchos.items()))
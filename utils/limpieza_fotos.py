@@ -0,0 +1,170 @@
+import os
+import time
+import logging
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.orm import selectinload
+from models import db, FotoAuto, ArchivoFoto, EstadoFoto
+from utils.almacen_fotos import rutas_contenido, liberar_archivos
+from utils.procesamiento_fotos import recuperar_trabadas, TIEMPO_MAXIMO_PROCESANDO
+
+logger = logging.getLogger(__name__)
+
+# Limpieza de static/uploads: archivos que ninguna FotoAuto usa (huérfanos) y FotoAuto cuyo archivo
+# ya no existe (colgadas). Se recorre el disco una vez con os.scandir, se leen todas las rutas de
+# la base en una consulta y se comparan como conjuntos; así alcanza con segundos para 100.000 archivos.
+
+CARPETA = 'uploads'
+
+# Un archivo recién escrito puede no tener todavía su FotoAuto confirmada (subida o variantes en curso)
+EDAD_MINIMA = 60 * 60
+
+# Cada ejecución borra como mucho esta cantidad de archivos: lo que falte queda para la siguiente
+LIMITE_BORRADOS = 1000
+
+# Si falta el archivo de más de esta fracción de las fotos, lo más probable es que la carpeta sea
+# otra (static mal configurado, deploy nuevo, disco sin montar): no se borra nada
+FRACCION_MAXIMA_COLGADAS = 0.5
+
+def recorrer(carpeta, prefijo=''):
+    """Rutas relativas (con /) de todos los archivos bajo la carpeta, siguiendo enlaces a directorios una sola vez"""
+    pendientes = [(carpeta, prefijo)]
+    visitados = set()
+    while pendientes:
+        directorio, relativo = pendientes.pop()
+        real = os.path.realpath(directorio)
+        if real in visitados:
+            continue
+        visitados.add(real)
+        try:
+            entradas = os.scandir(directorio)
+        except FileNotFoundError:
+            continue
+        with entradas:
+            for entrada in entradas:
+                ruta = f'{relativo}{entrada.name}'
+                if entrada.is_dir():
+                    pendientes.append((entrada.path, f'{ruta}/'))
+                elif entrada.is_file():
+                    yield ruta
+
+def _antiguos(carpeta, rutas, limite_edad):
+    """Las rutas con más de EDAD_MINIMA, con su tamaño (el stat se hace solo sobre los candidatos)"""
+    antiguos = []
+    for ruta in sorted(rutas):
+        try:
+            datos = os.stat(os.path.join(carpeta, ruta))
+        except FileNotFoundError:
+            continue
+        if datos.st_mtime < limite_edad:
+            antiguos.append((ruta, datos.st_size))
+    return antiguos
+
+def buscar_huerfanos(carpeta_static=None, carpeta_pendientes=None, ahora=None):
+    """Compara los archivos de uploads y de la carpeta de pendientes con las FotoAuto.
+
+    Devuelve un dict con 'archivos' (cantidad recorrida), 'huerfanos' y 'pendientes_huerfanos'
+    (listas de (ruta relativa, bytes)), 'colgadas' (ids de FotoAuto sin archivo) y 'trabadas'
+    (ids de FotoAuto en PROCESANDO desde hace más de TIEMPO_MAXIMO_PROCESANDO) y 'fotos' (total).
+    Lanza ValueError si no existe la carpeta uploads: sin ella todas las fotos parecerían colgadas.
+    """
+    carpeta = carpeta_static or current_app.static_folder
+    pendientes = carpeta_pendientes or current_app.config.get('FOTOS_PENDIENTES_DIR')
+    limite_edad = (ahora or time.time()) - EDAD_MINIMA
+    if not os.path.isdir(os.path.join(carpeta, CARPETA)):
+        raise ValueError(f'No existe la carpeta {os.path.join(carpeta, CARPETA)}')
+
+    archivos = set(recorrer(os.path.join(carpeta, CARPETA), f'{CARPETA}/'))
+    en_espera = set(recorrer(pendientes)) if pendientes else set()
+
+    limite_procesando = datetime.utcnow() - TIEMPO_MAXIMO_PROCESANDO
+    usados, esperados, colgadas, trabadas = set(), set(), [], []
+    fotos = 0
+    consulta = db.session.query(FotoAuto.id, FotoAuto.ruta_archivo, FotoAuto.estado, FotoAuto.procesando_desde)
+    for foto_id, ruta, estado, procesando_desde in consulta:
+        fotos += 1
+        if estado == EstadoFoto.PROCESANDO and (procesando_desde is None or procesando_desde < limite_procesando):
+            trabadas.append(foto_id)
+        if not ruta:
+            continue
+        # El original y todas las variantes posibles: también las que se están generando
+        usados.update(rutas_contenido(ruta))
+        if estado in (EstadoFoto.PENDIENTE, EstadoFoto.PROCESANDO):
+            esperados.add(os.path.basename(ruta))
+            if ruta not in archivos and os.path.basename(ruta) not in en_espera and estado == EstadoFoto.PENDIENTE:
+                colgadas.append(foto_id)
+        elif ruta not in archivos:
+            colgadas.append(foto_id)
+
+    return {
+        'archivos': len(archivos) + len(en_espera),
+        'huerfanos': _antiguos(carpeta, archivos - usados, limite_edad),
+        'pendientes_huerfanos': _antiguos(pendientes, en_espera - esperados, limite_edad) if pendientes else [],
+        'colgadas': colgadas,
+        'trabadas': trabadas,
+        'fotos': fotos,
+    }
+
+def _borrar(carpeta, rutas):
+    borrados = 0
+    for ruta, _ in rutas:
+        try:
+            os.remove(os.path.join(carpeta, ruta))
+            borrados += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Error al eliminar archivo: {e}")
+    return borrados
+
+def borrar_colgadas(foto_ids, carpeta_static=None, carpeta_pendientes=None):
+    """Elimina las FotoAuto sin archivo (eligiendo otra principal si hacía falta) y libera su contenido"""
+    fotos = FotoAuto.query.options(selectinload(FotoAuto.auto)).filter(FotoAuto.id.in_(foto_ids)).all()
+    hashes = [foto.archivo_hash for foto in fotos]
+    autos = set()
+    for foto in fotos:
+        auto = foto.auto
+        auto.fotos.remove(foto)
+        autos.add(auto)
+    for auto in autos:
+        auto.actualizar_foto_principal()
+    db.session.commit()
+    liberar_archivos(hashes, carpeta_static, carpeta_pendientes)
+    return len(fotos)
+
+def limpiar_fotos(borrar=False, limite=LIMITE_BORRADOS, carpeta_static=None, carpeta_pendientes=None, filas=False):
+    """Informa (y si se pide, borra) los huérfanos y las fotos colgadas; devuelve el resultado de la búsqueda.
+
+    Con borrar se eliminan hasta `limite` archivos huérfanos por ejecución ('borrados'); las fotos
+    colgadas ('filas_borradas') solo si además se pide filas. Lanza ValueError si no existe la carpeta
+    uploads o si la fracción de colgadas es tan alta que la carpeta no debe ser la correcta.
+    """
+    carpeta = carpeta_static or current_app.static_folder
+    pendientes = carpeta_pendientes or current_app.config.get('FOTOS_PENDIENTES_DIR')
+    resultado = buscar_huerfanos(carpeta, pendientes)
+    resultado['bytes'] = sum(tamanio for _, tamanio in resultado['huerfanos'] + resultado['pendientes_huerfanos'])
+    resultado['borrados'] = resultado['filas_borradas'] = 0
+    if not borrar:
+        return resultado
+    if len(resultado['colgadas']) > FRACCION_MAXIMA_COLGADAS * resultado['fotos']:
+        raise ValueError(f"A {len(resultado['colgadas'])} de {resultado['fotos']} fotos les falta el archivo: "
+                         f"revisar la carpeta {carpeta} antes de borrar")
+
+    # Las trabadas vuelven a PENDIENTE (las encola la aplicación al arrancar) o quedan en ERROR
+    if resultado['trabadas']:
+        resultado['recuperadas'], resultado['con_error'] = recuperar_trabadas(carpeta, pendientes)
+
+    # Primero las filas: un contenido que queda sin referencias lo borra liberar_archivos
+    if filas and resultado['colgadas']:
+        resultado['filas_borradas'] = borrar_colgadas(resultado['colgadas'][:limite], carpeta, pendientes)
+    # Contenido sin referencias que quedó de una eliminación interrumpida
+    sin_referencias = [hash_contenido for hash_contenido, in
+                       db.session.query(ArchivoFoto.hash).filter(ArchivoFoto.referencias <= 0)]
+    liberar_archivos(sin_referencias, carpeta, pendientes)
+
+    huerfanos = resultado['huerfanos'][:limite]
+    resultado['borrados'] = _borrar(carpeta, huerfanos)
+    restantes = limite - len(huerfanos)
+    if pendientes and restantes > 0:
+        resultado['borrados'] += _borrar(pendientes, resultado['pendientes_huerfanos'][:restantes])
+    return resultado
@@ -0,0 +1,115 @@
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from models import db, DDL_BUSQUEDA_AUTOS
+
+# db.create_all() crea tablas nuevas pero no modifica las existentes.
+# Cada migración agrega lo que falta en una base ya creada y debe poder ejecutarse varias veces.
+
+def _columnas(conexion, tabla):
+    return {columna['name'] for columna in inspect(conexion).get_columns(tabla)}
+
+def migrar_fecha_efectiva(conexion):
+    """Agrega venta.fecha_efectiva, la completa para las filas existentes y crea su índice"""
+    if 'fecha_efectiva' not in _columnas(conexion, 'venta'):
+        conexion.execute(text("ALTER TABLE venta ADD COLUMN fecha_efectiva DATETIME"))
+
+    # También corrige filas desincronizadas por actualizaciones masivas
+    conexion.execute(text(
+        "UPDATE venta SET fecha_efectiva = COALESCE(fecha_venta, fecha_seña) "
+        "WHERE fecha_efectiva IS NOT COALESCE(fecha_venta, fecha_seña)"
+    ))
+    conexion.execute(text("CREATE INDEX IF NOT EXISTS ix_venta_fecha_efectiva ON venta (fecha_efectiva)"))
+
+def migrar_foto_principal(conexion):
+    """Agrega auto.foto_principal_id y lo completa con la foto principal (o la primera) de cada auto"""
+    if 'foto_principal_id' not in _columnas(conexion, 'auto'):
+        conexion.execute(text("ALTER TABLE auto ADD COLUMN foto_principal_id INTEGER"))
+
+    # También repara punteros a fotos que ya no existen
+    conexion.execute(text(
+        "UPDATE auto SET foto_principal_id = ("
+        "  SELECT f.id FROM foto_auto f WHERE f.auto_id = auto.id"
+        "  ORDER BY f.es_principal DESC, f.orden, f.id LIMIT 1"
+        ") "
+        "WHERE foto_principal_id IS NULL "
+        "   OR foto_principal_id NOT IN (SELECT id FROM foto_auto WHERE foto_auto.auto_id = auto.id)"
+    ))
+
+def migrar_busqueda_autos(conexion):
+    """Crea el índice FTS5 del catálogo con sus triggers y lo llena la primera vez"""
+    if conexion.dialect.name != 'sqlite':
+        return
+    existia = conexion.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'auto_fts'"
+    )).first() is not None
+    for sentencia in DDL_BUSQUEDA_AUTOS:
+        conexion.execute(text(sentencia))
+    if not existia:
+        conexion.execute(text("INSERT INTO auto_fts(auto_fts) VALUES ('rebuild')"))
+
+def migrar_version_actualizado(conexion):
+    """Agrega version_datos.actualizado (fecha de la última modificación de cada grupo)"""
+    if 'actualizado' not in _columnas(conexion, 'version_datos'):
+        conexion.execute(text("ALTER TABLE version_datos ADD COLUMN actualizado DATETIME"))
+
+def migrar_datos_compartir(conexion):
+    """Normaliza las rutas de fotos con \\ y completa auto.url_compartir si se configuró URL_PUBLICA"""
+    conexion.execute(text(
+        "UPDATE foto_auto SET ruta_archivo = REPLACE(ruta_archivo, '\\', '/') WHERE ruta_archivo LIKE '%\\%'"
+    ))
+
+    # Sin la URL pública no se puede armar la dirección: la página usa la del request hasta que se edite el auto
+    url_publica = current_app.config.get('URL_PUBLICA')
+    if url_publica:
+        conexion.execute(text(
+            "UPDATE auto SET url_compartir = :base || 'auto/' || id WHERE url_compartir IS NULL OR url_compartir = ''"
+        ), {'base': url_publica.rstrip('/') + '/'})
+
+def migrar_indices(conexion):
+    """Crea los índices declarados en los modelos que falten en tablas ya existentes"""
+    # IF NOT EXISTS en lugar de checkfirst: la reflexión de SQLite no informa los índices por expresión
+    for tabla in db.metadata.sorted_tables:
+        for indice in tabla.indexes:
+            sentencia = str(CreateIndex(indice).compile(dialect=conexion.dialect))
+            conexion.execute(text(sentencia.replace('CREATE INDEX', 'CREATE INDEX IF NOT EXISTS', 1)))
+
+def migrar_variantes_fotos(conexion):
+    """Agrega foto_auto.variantes (las fotos existentes se completan con generar_variantes.py)"""
+    if 'variantes' not in _columnas(conexion, 'foto_auto'):
+        conexion.execute(text("ALTER TABLE foto_auto ADD COLUMN variantes JSON"))
+
+def migrar_estado_fotos(conexion):
+    """Agrega foto_auto.estado (procesamiento en segundo plano); las fotos existentes ya están listas"""
+    if 'estado' not in _columnas(conexion, 'foto_auto'):
+        conexion.execute(text("ALTER TABLE foto_auto ADD COLUMN estado VARCHAR(10) NOT NULL DEFAULT 'LISTA'"))
+
+def migrar_archivo_fotos(conexion):
+    """Agrega foto_auto.archivo_hash (la tabla archivo_foto la crea create_all; deduplicar_fotos.py pasa las fotos existentes)"""
+    if 'archivo_hash' not in _columnas(conexion, 'foto_auto'):
+        conexion.execute(text("ALTER TABLE foto_auto ADD COLUMN archivo_hash VARCHAR(64) REFERENCES archivo_foto (hash)"))
+
+def migrar_procesando_fotos(conexion):
+    """Agrega foto_auto.procesando_desde (para recuperar las fotos trabadas en PROCESANDO)"""
+    if 'procesando_desde' not in _columnas(conexion, 'foto_auto'):
+        conexion.execute(text("ALTER TABLE foto_auto ADD COLUMN procesando_desde DATETIME"))
+
+MIGRACIONES = [
+    migrar_fecha_efectiva,
+    migrar_foto_principal,
+    migrar_busqueda_autos,
+    migrar_version_actualizado,
+    migrar_datos_compartir,
+    migrar_variantes_fotos,
+    migrar_estado_fotos,
+    migrar_archivo_fotos,
+    migrar_procesando_fotos,
+    # Al final: los índices pueden usar columnas que agregan las migraciones anteriores
+    migrar_indices,
+]
+
+def aplicar_migraciones():
+    """Aplica todas las migraciones en una sola transacción"""
+    with db.engine.begin() as conexion:
+        for migracion in MIGRACIONES:
+            migracion(conexion)
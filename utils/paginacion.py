@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app
+from models import db
+
+# Paginación por cursor (keyset): cada página continúa después de la última fila de la anterior
+# con un WHERE sobre las columnas de orden, en lugar de OFFSET. El costo no crece con el número
+# de página y los autos que se agregan mientras se navega no desplazan las páginas siguientes.
+
+MAX_POR_PAGINA = 100
+
+def codificar_cursor(valores):
+    """Cursor opaco (base64 de JSON) con los valores de orden de la última fila"""
+    valores = [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, orden):
+    """Valores del cursor convertidos al tipo de cada columna de orden. Lanza ValueError si es inválido"""
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Cursor inválido: {e}')
+    if not isinstance(valores, list) or len(valores) != len(orden):
+        raise ValueError('Cursor inválido')
+
+    return [_valor_cursor(columna, valor) for columna, valor in zip(orden, valores)]
+
+def _valor_cursor(columna, valor):
+    """Valor del cursor con el tipo de la columna; un cursor armado a mano no llega a la consulta"""
+    tipo = columna.type
+    if isinstance(tipo, db.DateTime):
+        if not isinstance(valor, str):
+            raise ValueError('Cursor inválido')
+        return datetime.fromisoformat(valor)
+    if isinstance(valor, bool):
+        raise ValueError('Cursor inválido')
+    if isinstance(tipo, db.Integer):
+        permitidos = (int,)
+    elif isinstance(tipo, (db.Float, db.Numeric)):
+        permitidos = (int, float)
+    elif isinstance(tipo, db.String):
+        permitidos = (str,)
+    else:
+        permitidos = (int, float, str)
+    if not isinstance(valor, permitidos):
+        raise ValueError('Cursor inválido')
+    return valor
+
+def parametros_pagina(args):
+    """Lee cursor y por_pagina de request.args (por defecto PAGINA_TAMANIO de la configuración)"""
+    por_pagina = args.get('por_pagina', type=int) or current_app.config.get('PAGINA_TAMANIO', 24)
+    return args.get('cursor') or None, max(1, min(por_pagina, MAX_POR_PAGINA))
+
+def paginar(query, orden, cursor=None, por_pagina=24):
+    """Página de query en orden descendente por las expresiones de orden (la última debe ser única, p. ej. el id).
+
+    Devuelve (items, cursor de la página siguiente o None si es la última).
+    """
+    if cursor:
+        valores = decodificar_cursor(cursor, orden)
+        # (a, b) < (x, y): comparación de filas, equivale a a < x OR (a = x AND b < y)
+        query = query.filter(db.tuple_(*orden) < db.tuple_(*valores))
+
+    filas = query.add_columns(*orden)\
+                 .order_by(*[columna.desc() for columna in orden])\
+                 .limit(por_pagina + 1)\
+                 .all()
+
+    siguiente = codificar_cursor(filas[por_pagina - 1][1:]) if len(filas) > por_pagina else None
+    return [fila[0] for fila in filas[:por_pagina]], siguiente
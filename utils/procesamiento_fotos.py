@@ -0,0 +1,184 @@
+import os
+import uuid
+import shutil
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from sqlalchemy import or_
+from werkzeug.utils import secure_filename
+from models import db, FotoAuto, EstadoFoto, incrementar_catalogo
+from utils.imagenes import procesar_foto
+from utils.almacen_fotos import guardar_hasheando, registrar_archivo, liberar_archivos
+
+logger = logging.getLogger(__name__)
+
+# Procesamiento de fotos en segundo plano. El request solo guarda el archivo subido en la carpeta
+# de pendientes (calculando su hash, ver utils.almacen_fotos) y crea la FotoAuto en estado PENDIENTE;
+# un grupo acotado de hilos lo mueve a static,
+# genera las variantes (utils.imagenes) y deja la foto en LISTA (o ERROR si no es una imagen válida).
+# El estado está en la base: la página de edición lo consulta y cualquier worker puede retomar
+# los pendientes al arrancar.
+
+def ruta_pendiente(directorio, foto):
+    """Archivo subido que espera ser procesado: mismo nombre (el hash) que tendrá en static"""
+    return os.path.join(directorio, os.path.basename(foto.ruta_archivo))
+
+# Una foto en PROCESANDO desde hace más que esto quedó trabada: el proceso que la tomó se cayó
+TIEMPO_MAXIMO_PROCESANDO = timedelta(minutes=10)
+
+def _archivo_disponible(foto, carpeta_static, directorio):
+    """El archivo de la foto todavía se puede procesar: sigue pendiente o ya está en static"""
+    return os.path.exists(ruta_pendiente(directorio, foto)) or \
+        os.path.exists(os.path.join(carpeta_static, foto.ruta_archivo))
+
+def recuperar_trabadas(carpeta_static, directorio, ahora=None):
+    """Devuelve a PENDIENTE las fotos trabadas en PROCESANDO si su archivo sigue disponible; si no, las marca ERROR.
+
+    Devuelve (recuperadas, con_error). Las recuperadas las encola reanudar_pendientes.
+    """
+    limite = (ahora or datetime.utcnow()) - TIEMPO_MAXIMO_PROCESANDO
+    # Sin fecha: las tomó una versión anterior a procesando_desde
+    vencida = or_(FotoAuto.procesando_desde < limite, FotoAuto.procesando_desde.is_(None))
+    recuperadas, con_error = 0, 0
+    for foto in FotoAuto.query.filter(FotoAuto.estado == EstadoFoto.PROCESANDO, vencida).all():
+        disponible = _archivo_disponible(foto, carpeta_static, directorio)
+        # Condicional: si mientras tanto un hilo la terminó, no se toca
+        cambiadas = FotoAuto.query.filter(FotoAuto.id == foto.id, FotoAuto.estado == EstadoFoto.PROCESANDO, vencida).update(
+            {'estado': EstadoFoto.PENDIENTE if disponible else EstadoFoto.ERROR, 'procesando_desde': None},
+            synchronize_session=False)
+        if cambiadas and disponible:
+            recuperadas += 1
+        elif cambiadas:
+            # El UPDATE en lote no dispara los eventos del modelo: la página deja de mostrar la espera
+            incrementar_catalogo(db.session.connection(), foto.auto_id)
+            con_error += 1
+    db.session.commit()
+    return recuperadas, con_error
+
+class ColaFotos:
+    """Cola de trabajos de fotos con un máximo de hilos por proceso"""
+
+    def __init__(self):
+        self._app = None
+        self.directorio = None
+        self._ejecutor = None
+        self._trabajos = set()
+        self._lock = threading.Lock()
+
+    def configurar(self, app, directorio, hilos=2, ejecutor=None):
+        """Fija la aplicación, la carpeta de pendientes y el grupo de hilos (o un ejecutor propio)"""
+        self._app = app
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+        self._ejecutor = ejecutor or ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='fotos')
+
+    def guardar_subida(self, archivo, foto):
+        """Guarda el archivo subido en la carpeta de pendientes y apunta la foto a su contenido.
+
+        Se copia en bloques calculando el SHA-256 al pasar; si el contenido ya existe (en static o
+        pendiente de otra subida) no se guarda otra copia.
+        """
+        temporal = os.path.join(self.directorio, f'{uuid.uuid4().hex}.subida')
+        hash_contenido, tamanio = guardar_hasheando(archivo.stream, temporal)
+        extension = os.path.splitext(secure_filename(archivo.filename or ''))[1] or '.jpg'
+
+        foto.archivo_hash = hash_contenido
+        foto.ruta_archivo = registrar_archivo(hash_contenido, extension, tamanio)
+        foto.estado = EstadoFoto.PENDIENTE
+
+        pendiente = ruta_pendiente(self.directorio, foto)
+        if os.path.exists(pendiente) or os.path.exists(os.path.join(self._app.static_folder, foto.ruta_archivo)):
+            os.remove(temporal)
+        else:
+            os.replace(temporal, pendiente)
+
+    def encolar(self, foto_ids):
+        """Encola las fotos ya confirmadas en la base (el hilo tiene que poder leerlas)"""
+        for foto_id in foto_ids:
+            trabajo = self._ejecutor.submit(self.procesar, foto_id)
+            with self._lock:
+                self._trabajos.add(trabajo)
+            trabajo.add_done_callback(self._terminado)
+
+    def _terminado(self, trabajo):
+        with self._lock:
+            self._trabajos.discard(trabajo)
+
+    def esperar(self, timeout=None):
+        """Espera a que terminen los trabajos encolados (tests y scripts)"""
+        with self._lock:
+            trabajos = list(self._trabajos)
+        wait(trabajos, timeout=timeout)
+
+    def procesar(self, foto_id):
+        """Trabajo de una foto: la reclama, la mueve a static, genera las variantes y fija el estado"""
+        with self._app.app_context():
+            try:
+                # Solo un hilo (de cualquier worker) toma cada foto
+                reclamada = FotoAuto.query.filter_by(id=foto_id, estado=EstadoFoto.PENDIENTE).update(
+                    {'estado': EstadoFoto.PROCESANDO, 'procesando_desde': datetime.utcnow()}, synchronize_session=False)
+                db.session.commit()
+                if not reclamada:
+                    # Ya la tomó otro hilo o se eliminó (liberar_archivos borra el archivo pendiente)
+                    return
+                foto = FotoAuto.query.get(foto_id)
+
+                self._mover_contenido(foto)
+
+                # Si el contenido ya tiene variantes (otra foto con el mismo archivo) se reutilizan
+                procesada = FotoAuto.query.filter(
+                    FotoAuto.archivo_hash == foto.archivo_hash, FotoAuto.id != foto.id,
+                    FotoAuto.estado == EstadoFoto.LISTA, FotoAuto.variantes.isnot(None)
+                ).first() if foto.archivo_hash else None
+                if procesada:
+                    foto.variantes = procesada.variantes
+                    foto.estado = EstadoFoto.LISTA
+                else:
+                    foto.estado = EstadoFoto.LISTA if procesar_foto(foto) else EstadoFoto.ERROR
+                foto.procesando_desde = None
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Error al procesar la foto {foto_id}: {e}")
+                db.session.rollback()
+                cambiadas = FotoAuto.query.filter_by(id=foto_id).update(
+                    {'estado': EstadoFoto.ERROR, 'procesando_desde': None}, synchronize_session=False)
+                if cambiadas:
+                    # Sin eventos del modelo: se invalidan a mano las páginas que mostraban la espera
+                    auto_id = db.session.query(FotoAuto.auto_id).filter_by(id=foto_id).scalar()
+                    incrementar_catalogo(db.session.connection(), auto_id)
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def _mover_contenido(self, foto):
+        """Mueve el archivo pendiente a static, salvo que el contenido ya esté ahí"""
+        pendiente = ruta_pendiente(self.directorio, foto)
+        destino = os.path.join(self._app.static_folder, foto.ruta_archivo)
+        if os.path.exists(destino):
+            if os.path.exists(pendiente):
+                os.remove(pendiente)
+            return
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            shutil.move(pendiente, destino)
+        except FileNotFoundError:
+            # Otro hilo movió el mismo contenido (dos subidas iguales pendientes a la vez)
+            if not os.path.exists(destino):
+                raise
+
+    def liberar(self, hashes):
+        """Borra el contenido sin referencias, incluido el que seguía pendiente (después del commit)"""
+        return liberar_archivos(hashes, self._app.static_folder, self.directorio)
+
+    def reanudar_pendientes(self):
+        """Encola las fotos que quedaron pendientes o trabadas (p. ej. si el proceso se reinició)"""
+        recuperar_trabadas(self._app.static_folder, self.directorio)
+        # El archivo puede estar ya en static si otra subida con el mismo contenido se procesó antes
+        ids = [foto.id for foto in FotoAuto.query.filter_by(estado=EstadoFoto.PENDIENTE)
+               if _archivo_disponible(foto, self._app.static_folder, self.directorio)]
+        self.encolar(ids)
+        return len(ids)
+
+# Cola compartida por las rutas de subida de fotos
+cola_fotos = ColaFotos()
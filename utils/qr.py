@@ -0,0 +1,81 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+from flask import current_app, url_for
+
+# Códigos QR generados una sola vez y guardados en disco con el hash de su contenido como nombre:
+# la misma URL siempre produce el mismo archivo, que se sirve con cache de un año.
+
+PATRON_CLAVE = re.compile(r'[0-9a-f]{64}')
+
+# Parámetros del código (si cambian, cambia la clave)
+VERSION_QR = 1
+CORRECCION = 'L'
+TAMANIO_MODULO = 10
+BORDE = 4
+
+def clave_qr(contenido):
+    """Hash SHA-256 del contenido y de los parámetros de dibujo"""
+    firma = f'{VERSION_QR}|{CORRECCION}|{TAMANIO_MODULO}|{BORDE}|{contenido}'
+    return hashlib.sha256(firma.encode('utf-8')).hexdigest()
+
+def directorio_qr():
+    directorio = current_app.config.get('QR_DIR') or os.path.join(current_app.root_path, 'cache', 'qr')
+    os.makedirs(directorio, exist_ok=True)
+    return directorio
+
+def _ruta(clave):
+    return os.path.join(directorio_qr(), f'{clave}.png')
+
+def generar_png(contenido):
+    """PNG del código QR en memoria"""
+    import qrcode
+    from qrcode.constants import ERROR_CORRECT_L
+
+    qr = qrcode.QRCode(version=VERSION_QR, error_correction=ERROR_CORRECT_L, box_size=TAMANIO_MODULO, border=BORDE)
+    qr.add_data(contenido)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer)
+    return buffer.getvalue()
+
+def obtener_qr(contenido):
+    """Clave del código QR del contenido, generándolo si todavía no está en disco"""
+    clave = clave_qr(contenido)
+    ruta = _ruta(clave)
+    if not os.path.exists(ruta):
+        png = generar_png(contenido)
+        # Temporal propio de cada hilo y os.replace: nunca se sirve un PNG a medias
+        descriptor, parcial = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.parcial')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                archivo.write(png)
+            os.replace(parcial, ruta)
+        except OSError:
+            if os.path.exists(parcial):
+                os.remove(parcial)
+            raise
+    return clave
+
+def ruta_qr(clave):
+    """Ruta del PNG ya generado, o None si la clave no existe"""
+    if not PATRON_CLAVE.fullmatch(clave):
+        return None
+    ruta = _ruta(clave)
+    return ruta if os.path.exists(ruta) else None
+
+def url_qr(contenido):
+    """URL estable del PNG del código QR"""
+    return url_for('autos.qr', clave=obtener_qr(contenido))
+
+def precalentar_qr(contenidos):
+    """Genera los códigos que falten; devuelve cuántos se generaron"""
+    generados = 0
+    for contenido in contenidos:
+        if ruta_qr(clave_qr(contenido)) is None:
+            obtener_qr(contenido)
+            generados += 1
+    return generados
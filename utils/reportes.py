@@ -0,0 +1,268 @@
+from flask import current_app
+from models import db, Usuario, Venta, VentaResumenMensual
+
+MONEDAS = ('ARS', 'USD')
+
+def _serie_vacia():
+    return {moneda: [0] * 12 for moneda in MONEDAS}
+
+def obtener_series_mensuales(anio):
+    """Cantidad, ingresos y costos por mes y moneda para un año, leídos del resumen mensual"""
+    R = VentaResumenMensual
+    filas = db.session.query(
+        R.mes,
+        R.moneda,
+        db.func.sum(R.cantidad),
+        db.func.sum(R.total_venta),
+        db.func.sum(R.total_compra)
+    ).filter(R.anio == anio)\
+     .group_by(R.mes, R.moneda)\
+     .all()
+
+    cantidades = [0] * 12
+    cantidades_moneda = _serie_vacia()
+    ingresos = _serie_vacia()
+    costos = _serie_vacia()
+
+    for mes_fila, moneda, cantidad, ingreso, costo in filas:
+        idx = int(mes_fila) - 1
+        cantidades[idx] += cantidad
+        if moneda in MONEDAS:
+            cantidades_moneda[moneda][idx] = cantidad
+            ingresos[moneda][idx] = ingreso or 0
+            costos[moneda][idx] = costo or 0
+
+    return {
+        'cantidades': cantidades,
+        'cantidades_moneda': cantidades_moneda,
+        'ingresos': ingresos,
+        'costos': costos
+    }
+
+def obtener_totales_por_moneda():
+    """Cantidad, ingresos y costos históricos agrupados por moneda"""
+    R = VentaResumenMensual
+    filas = db.session.query(
+        R.moneda,
+        db.func.sum(R.cantidad),
+        db.func.sum(R.total_venta),
+        db.func.sum(R.total_compra)
+    ).group_by(R.moneda).all()
+
+    totales = {'cantidad': 0}
+    for moneda in MONEDAS:
+        totales[moneda] = {'ingresos': 0, 'costos': 0}
+
+    for moneda, cantidad, ingreso, costo in filas:
+        totales['cantidad'] += cantidad
+        if moneda in MONEDAS:
+            totales[moneda] = {'ingresos': ingreso or 0, 'costos': costo or 0}
+
+    return totales
+
+def _por_moneda(expresion, moneda):
+    return db.func.coalesce(db.func.sum(db.case((Venta.moneda == moneda, expresion), else_=0)), 0)
+
+def obtener_ranking_vendedores(inicio=None, fin=None, roles=('admin', 'vendedor'), orden='ventas'):
+    """Ranking de vendedores con ventas, montos y comisiones por moneda en el período [inicio, fin).
+
+    Sin inicio ni fin cubre todo el historial. Es una sola consulta agrupada sobre venta y usuario.
+    """
+    ventas = db.func.count(Venta.id)
+    comision = db.func.coalesce(db.func.sum(Venta.monto_comision), 0)
+
+    consulta = db.session.query(
+        Usuario.id,
+        Usuario.nombre,
+        Usuario.apellido,
+        Usuario.porcentaje_comision,
+        ventas,
+        _por_moneda(1, 'ARS'),
+        _por_moneda(1, 'USD'),
+        _por_moneda(Venta.precio_venta, 'ARS'),
+        _por_moneda(Venta.precio_venta, 'USD'),
+        comision,
+        _por_moneda(Venta.monto_comision, 'ARS'),
+        _por_moneda(Venta.monto_comision, 'USD')
+    ).join(Venta, Venta.vendedor_id == Usuario.id)
+
+    # fecha_efectiva está indexada: el período es un rango sobre el índice
+    if inicio is not None:
+        consulta = consulta.filter(Venta.fecha_efectiva >= inicio)
+    if fin is not None:
+        consulta = consulta.filter(Venta.fecha_efectiva < fin)
+    if roles:
+        consulta = consulta.filter(Usuario.rol.in_(roles))
+
+    criterio = comision.desc() if orden == 'comision' else ventas.desc()
+    filas = consulta.group_by(Usuario.id).order_by(criterio, Usuario.id).all()
+
+    ranking = []
+    for posicion, fila in enumerate(filas, start=1):
+        (usuario_id, nombre, apellido, porcentaje, cantidad, ventas_ars, ventas_usd,
+         monto_ars, monto_usd, total_comision, comision_ars, comision_usd) = fila
+        ranking.append({
+            'id': usuario_id,
+            'posicion': posicion,
+            'nombre': f"{nombre} {apellido}",
+            'porcentaje_comision': porcentaje,
+            'ventas': cantidad,
+            'ventas_ars': ventas_ars,
+            'ventas_usd': ventas_usd,
+            'monto_ars': monto_ars,
+            'monto_usd': monto_usd,
+            'comision': total_comision,
+            'comision_ars': comision_ars,
+            'comision_usd': comision_usd
+        })
+    return ranking
+
+def obtener_marcas_vendidas(limite=5):
+    """Marcas con más ventas"""
+    R = VentaResumenMensual
+    marcas = db.session.query(
+        R.marca,
+        db.func.sum(R.cantidad).label('count')
+    ).filter(R.marca != None).group_by(R.marca).order_by(db.desc('count')).limit(limite).all()
+
+    return [{'marca': marca, 'count': count} for marca, count in marcas]
+
+def calcular_estadisticas(anio, mes_actual, periodo_vendedores=(None, None)):
+    """Arma el contexto completo de la plantilla estadisticas.html.
+
+    periodo_vendedores es el rango [inicio, fin) del ranking de vendedores (por defecto todo el historial).
+    """
+    series = obtener_series_mensuales(anio)
+    totales = obtener_totales_por_moneda()
+
+    try:
+        marcas_vendidas = obtener_marcas_vendidas()
+    except Exception as e:
+        current_app.logger.error(f"Error al obtener marcas vendidas: {e}")
+        marcas_vendidas = []
+
+    ingresos_ars = totales['ARS']['ingresos']
+    ingresos_usd = totales['USD']['ingresos']
+    costo_ars = totales['ARS']['costos']
+    costo_usd = totales['USD']['costos']
+    ganancia_ars = ingresos_ars - costo_ars
+    ganancia_usd = ingresos_usd - costo_usd
+
+    ingresos_por_mes_ars = series['ingresos']['ARS']
+    ingresos_por_mes_usd = series['ingresos']['USD']
+    ganancias_por_mes_ars = [i - c for i, c in zip(ingresos_por_mes_ars, series['costos']['ARS'])]
+    ganancias_por_mes_usd = [i - c for i, c in zip(ingresos_por_mes_usd, series['costos']['USD'])]
+
+    # El bloque del mes actual sale de las mismas series
+    idx = mes_actual - 1
+
+    return {
+        'ventas_por_mes': series['cantidades'],
+        'ventas_por_vendedor': obtener_ranking_vendedores(*periodo_vendedores),
+        'marcas_vendidas': marcas_vendidas,
+        'ingresos_totales': ingresos_ars + ingresos_usd,
+        'ingresos_por_mes': [ingresos_por_mes_ars[i] + ingresos_por_mes_usd[i] for i in range(12)],
+        'ganancias_por_mes': [ganancias_por_mes_ars[i] + ganancias_por_mes_usd[i] for i in range(12)],
+        'año_actual': anio,
+        'total_ventas': totales['cantidad'],
+        'costo_total': costo_ars + costo_usd,
+        'ganancia_total': ganancia_ars + ganancia_usd,
+        # Variables por moneda
+        'ingresos_ars': ingresos_ars,
+        'ingresos_usd': ingresos_usd,
+        'costo_ars': costo_ars,
+        'costo_usd': costo_usd,
+        'ganancia_ars': ganancia_ars,
+        'ganancia_usd': ganancia_usd,
+        'ingresos_por_mes_ars': ingresos_por_mes_ars,
+        'ingresos_por_mes_usd': ingresos_por_mes_usd,
+        'ganancias_por_mes_ars': ganancias_por_mes_ars,
+        'ganancias_por_mes_usd': ganancias_por_mes_usd,
+        'ventas_por_mes_ars': series['cantidades_moneda']['ARS'],
+        'ventas_por_mes_usd': series['cantidades_moneda']['USD'],
+        # Variables del mes actual
+        'ventas_mes_actual': series['cantidades'][idx],
+        'ventas_mes_actual_ars': series['cantidades_moneda']['ARS'][idx],
+        'ventas_mes_actual_usd': series['cantidades_moneda']['USD'][idx],
+        'ingresos_mes_actual_ars': ingresos_por_mes_ars[idx],
+        'ingresos_mes_actual_usd': ingresos_por_mes_usd[idx],
+        'costos_mes_actual_ars': series['costos']['ARS'][idx],
+        'costos_mes_actual_usd': series['costos']['USD'][idx],
+        'ganancia_mes_actual_ars': ganancias_por_mes_ars[idx],
+        'ganancia_mes_actual_usd': ganancias_por_mes_usd[idx]
+    }
+
+# Métricas y agrupaciones disponibles en la API de series
+METRICAS_SERIE = {
+    'cantidad': VentaResumenMensual.cantidad,
+    'ingresos': VentaResumenMensual.total_venta,
+    'costos': VentaResumenMensual.total_compra,
+    'ganancias': VentaResumenMensual.total_ganancia,
+    'comisiones': VentaResumenMensual.total_comision
+}
+AGRUPACIONES_SERIE = ('vendedor', 'marca', 'moneda')
+MAX_MESES_SERIE = 120
+
+def meses_entre(desde, hasta):
+    """Lista de (anio, mes) desde y hasta inclusive"""
+    (anio, mes), meses = desde, []
+    while (anio, mes) <= hasta:
+        meses.append((anio, mes))
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return meses
+
+def obtener_serie(metrica, desde, hasta, moneda=None, agrupar=None):
+    """Serie mensual de una métrica entre dos meses (anio, mes), opcionalmente por grupo.
+
+    Cualquier rango cuesta una sola consulta agrupada sobre el resumen mensual.
+    """
+    R = VentaResumenMensual
+    columnas = [R.anio, R.mes]
+    if agrupar == 'vendedor':
+        columnas += [R.vendedor_id, Usuario.nombre, Usuario.apellido]
+    elif agrupar == 'marca':
+        columnas.append(R.marca)
+    elif agrupar == 'moneda':
+        columnas.append(R.moneda)
+
+    consulta = db.session.query(*columnas, db.func.sum(METRICAS_SERIE[metrica]))
+    if agrupar == 'vendedor':
+        consulta = consulta.outerjoin(Usuario, Usuario.id == R.vendedor_id)
+
+    # anio acota por el índice único; anio * 100 + mes recorta los meses de los extremos
+    consulta = consulta.filter(
+        R.anio.between(desde[0], hasta[0]),
+        (R.anio * 100 + R.mes).between(desde[0] * 100 + desde[1], hasta[0] * 100 + hasta[1])
+    )
+    if moneda:
+        consulta = consulta.filter(R.moneda == moneda)
+
+    filas = consulta.group_by(*columnas).all()
+
+    meses = meses_entre(desde, hasta)
+    posiciones = {clave: i for i, clave in enumerate(meses)}
+    series = {}
+    for fila in filas:
+        anio, mes, valor = fila[0], fila[1], fila[-1] or 0
+        if agrupar == 'vendedor':
+            clave = fila[2]
+            nombre = f"{fila[3]} {fila[4]}" if fila[3] else 'Sin vendedor'
+        elif agrupar:
+            clave = nombre = fila[2] if fila[2] is not None else 'Sin dato'
+        else:
+            clave, nombre = 'total', 'Total'
+
+        serie = series.setdefault(clave, {'clave': clave, 'nombre': nombre, 'valores': [0] * len(meses)})
+        serie['valores'][posiciones[(int(anio), int(mes))]] += valor
+
+    if not agrupar and not series:
+        series['total'] = {'clave': 'total', 'nombre': 'Total', 'valores': [0] * len(meses)}
+
+    return {
+        'metrica': metrica,
+        'moneda': moneda,
+        'agrupar': agrupar,
+        'meses': [f'{anio:04d}-{mes:02d}' for anio, mes in meses],
+        # Las series con más total primero
+        'series': sorted(series.values(), key=lambda s: sum(s['valores']), reverse=True)
+    }
@@ -0,0 +1,74 @@
+from models import db, Venta, Auto, VentaResumenMensual
+
+def _agregado_desde_ventas():
+    """Agrupa la tabla venta con la misma clave que el resumen mensual"""
+    fecha = db.func.coalesce(Venta.fecha_venta, Venta.fecha_seña)
+    anio = db.extract('year', fecha)
+    mes = db.extract('month', fecha)
+    return db.session.query(
+        anio.label('anio'),
+        mes.label('mes'),
+        Venta.moneda,
+        Venta.vendedor_id,
+        Auto.marca,
+        db.func.count(Venta.id),
+        db.func.coalesce(db.func.sum(Venta.precio_venta), 0),
+        db.func.coalesce(db.func.sum(Auto.precio_compra), 0),
+        db.func.coalesce(db.func.sum(Venta.ganancia), 0),
+        db.func.coalesce(db.func.sum(Venta.monto_comision), 0)
+    ).outerjoin(Auto, Venta.auto_id == Auto.id)\
+     .filter(fecha != None)\
+     .group_by(anio, mes, Venta.moneda, Venta.vendedor_id, Auto.marca)\
+     .all()
+
+def reconstruir_resumen():
+    """Recalcula desde cero la tabla venta_resumen_mensual. Devuelve la cantidad de grupos"""
+    filas = _agregado_desde_ventas()
+
+    VentaResumenMensual.query.delete()
+    db.session.bulk_insert_mappings(VentaResumenMensual, [
+        {
+            'anio': int(anio),
+            'mes': int(mes),
+            'moneda': moneda,
+            'vendedor_id': vendedor_id,
+            'marca': marca,
+            'cantidad': cantidad,
+            'total_venta': total_venta,
+            'total_compra': total_compra,
+            'total_ganancia': total_ganancia,
+            'total_comision': total_comision
+        }
+        for anio, mes, moneda, vendedor_id, marca, cantidad, total_venta, total_compra, total_ganancia, total_comision in filas
+    ])
+    db.session.commit()
+
+    return len(filas)
+
+def verificar_resumen(tolerancia=0.01):
+    """Compara el resumen con un recálculo desde venta. Devuelve la lista de diferencias encontradas"""
+    campos = ('cantidad', 'total_venta', 'total_compra', 'total_ganancia', 'total_comision')
+
+    esperado = {}
+    for fila in _agregado_desde_ventas():
+        esperado[(int(fila[0]), int(fila[1])) + tuple(fila[2:5])] = dict(zip(campos, fila[5:]))
+
+    actual = {}
+    for r in VentaResumenMensual.query.all():
+        actual[(r.anio, r.mes, r.moneda, r.vendedor_id, r.marca)] = {c: getattr(r, c) or 0 for c in campos}
+
+    vacio = dict.fromkeys(campos, 0)
+    diferencias = []
+    for clave in sorted(set(esperado) | set(actual), key=str):
+        valores_esperados = esperado.get(clave, vacio)
+        valores_actuales = actual.get(clave, vacio)
+        for campo in campos:
+            if abs(valores_esperados[campo] - valores_actuales[campo]) > tolerancia:
+                diferencias.append({
+                    'clave': clave,
+                    'campo': campo,
+                    'esperado': valores_esperados[campo],
+                    'actual': valores_actuales[campo]
+                })
+
+    return diferencias
@@ -0,0 +1,196 @@
+import threading
+from datetime import timedelta
+import numpy as np
+from sqlalchemy.orm import selectinload
+from models import db, Auto, EstadoAuto, VersionDatos, version_auto
+
+# "Autos similares": cada auto disponible es un vector con su precio (normalizado dentro de su
+# moneda), año, kilometraje y marca (one-hot). Los vectores viven en una matriz NumPy en memoria
+# y los vecinos más cercanos se calculan de una vez sobre toda la matriz.
+
+# Peso de cada columna numérica: precio, año y kilometraje
+PESOS = np.array([1.0, 1.0, 0.5])
+
+# Distancia al cuadrado entre dos marcas distintas: en one-hot difieren en dos coordenadas (1 + 1).
+# Se suma aparte para no guardar una columna por marca
+PESO_MARCA = 2.0
+
+MONEDAS = {'ARS': 0, 'USD': 1}
+
+# Las escrituras toman la hora antes de esperar el lock de SQLite: al releer los autos cambiados
+# se mira un poco hacia atrás para no perder una transacción que confirmó más tarde
+MARGEN_CAMBIOS = timedelta(seconds=5)
+
+# Con más cambios que estos conviene recargar todo (y la lista IN no crece sin límite)
+MAX_CAMBIOS_INCREMENTALES = 500
+
+COLUMNAS = (Auto.id, Auto.marca, Auto.precio, Auto.moneda, Auto.anio, Auto.kilometraje, Auto.estado)
+
+def _clave_marca(marca):
+    return (marca or '').strip().lower()
+
+def _crudo(precio, anio, kilometraje):
+    """Vector sin normalizar; el kilometraje faltante queda en NaN (se toma como el promedio)"""
+    return [np.log1p(max(precio or 0, 0)), anio or np.nan, np.nan if kilometraje is None else kilometraje]
+
+class IndiceSimilares:
+    """Matriz de vectores de los autos disponibles para buscar los más parecidos.
+
+    Se actualiza en forma incremental: cuando cambia la versión 'autos' solo se releen los autos
+    cuya versión 'auto:<id>' cambió desde la última actualización (sirve también entre workers).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limpiar()
+
+    def limpiar(self):
+        """Descarta la matriz: la próxima búsqueda la vuelve a cargar completa"""
+        with self._lock:
+            self._sello = None
+            self._desde = None
+            self._ids = np.empty(0, dtype=np.int64)
+            self._monedas = np.empty(0, dtype=np.int8)
+            self._marcas = np.empty(0, dtype=np.int32)
+            self._crudos = np.empty((0, 3))
+            self._posiciones = {}
+            self._codigos_marca = {}
+            self._matriz = np.empty((0, 3), dtype=np.float32)
+            self._medias = np.zeros((len(MONEDAS), 3))
+            self._desvios = np.ones((len(MONEDAS), 3))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def actualizar(self):
+        """Aplica los cambios de Auto desde la última actualización"""
+        # La versión se lee antes que los autos: si cambia mientras tanto, la próxima vez se relee.
+        # La fecha distingue versiones con el mismo número si la base se recrea
+        sello = db.session.query(VersionDatos.version, VersionDatos.actualizado).filter_by(nombre='autos').first()
+        sello = tuple(sello) if sello else (0, None)
+        if sello == self._sello:
+            return
+
+        with self._lock:
+            if sello == self._sello:
+                return
+
+            cambiados = self._autos_cambiados() if self._desde is not None else None
+            if cambiados is None or len(cambiados) > MAX_CAMBIOS_INCREMENTALES:
+                self._cargar(Auto.query.with_entities(*COLUMNAS).filter(Auto.estado == EstadoAuto.DISPONIBLE))
+            elif cambiados:
+                filas = Auto.query.with_entities(*COLUMNAS).filter(Auto.id.in_(cambiados)).all()
+                vigentes = {fila.id for fila in filas if fila.estado == EstadoAuto.DISPONIBLE}
+                # Los vendidos, reservados o eliminados salen de la matriz
+                for auto_id in cambiados - vigentes:
+                    self._quitar(auto_id)
+                for fila in filas:
+                    if fila.id in vigentes:
+                        self._guardar(fila)
+                self._normalizar()
+
+            self._sello = sello
+            self._desde = sello[1]
+
+    def _autos_cambiados(self):
+        """Ids con la versión 'auto:<id>' modificada desde la última actualización"""
+        nombres = db.session.query(VersionDatos.nombre).filter(
+            VersionDatos.nombre.like('auto:%'), VersionDatos.actualizado >= self._desde - MARGEN_CAMBIOS
+        )
+        return {int(nombre.split(':', 1)[1]) for nombre, in nombres}
+
+    def _cargar(self, filas):
+        filas = filas.all()
+        self._codigos_marca = {}
+        self._ids = np.array([fila.id for fila in filas], dtype=np.int64)
+        self._monedas = np.array([MONEDAS.get(fila.moneda, 0) for fila in filas], dtype=np.int8)
+        self._marcas = np.array([self._codigo_marca(fila.marca) for fila in filas], dtype=np.int32)
+        self._crudos = np.array([_crudo(fila.precio, fila.anio, fila.kilometraje) for fila in filas]).reshape(-1, 3)
+        self._posiciones = {auto_id: posicion for posicion, auto_id in enumerate(self._ids.tolist())}
+        self._normalizar()
+
+    def _codigo_marca(self, marca):
+        return self._codigos_marca.setdefault(_clave_marca(marca), len(self._codigos_marca))
+
+    def _guardar(self, fila):
+        """Actualiza la fila del auto en su lugar o la agrega al final"""
+        posicion = self._posiciones.get(fila.id)
+        if posicion is None:
+            posicion = len(self._ids)
+            self._posiciones[fila.id] = posicion
+            self._ids = np.append(self._ids, fila.id)
+            self._monedas = np.append(self._monedas, 0).astype(np.int8)
+            self._marcas = np.append(self._marcas, 0).astype(np.int32)
+            self._crudos = np.vstack([self._crudos, np.zeros((1, 3))])
+
+        self._monedas[posicion] = MONEDAS.get(fila.moneda, 0)
+        self._marcas[posicion] = self._codigo_marca(fila.marca)
+        self._crudos[posicion] = _crudo(fila.precio, fila.anio, fila.kilometraje)
+
+    def _quitar(self, auto_id):
+        """Saca el auto moviendo el último a su lugar (no hay que correr el resto)"""
+        posicion = self._posiciones.pop(auto_id, None)
+        if posicion is None:
+            return
+        ultima = len(self._ids) - 1
+        if posicion != ultima:
+            for arreglo in (self._ids, self._monedas, self._marcas, self._crudos):
+                arreglo[posicion] = arreglo[ultima]
+            self._posiciones[int(self._ids[posicion])] = posicion
+        self._ids, self._monedas, self._marcas = self._ids[:ultima], self._monedas[:ultima], self._marcas[:ultima]
+        self._crudos = self._crudos[:ultima]
+
+    def _normalizar(self):
+        """Recalcula medias y desvíos (el precio por moneda) y la matriz ponderada"""
+        for codigo in MONEDAS.values():
+            for columna, filas in ((0, self._monedas == codigo), (1, slice(None)), (2, slice(None))):
+                valores = self._crudos[filas, columna]
+                valores = valores[~np.isnan(valores)]
+                if len(valores):
+                    self._medias[codigo, columna] = valores.mean()
+                    self._desvios[codigo, columna] = valores.std() or 1.0
+        self._matriz = self._ponderar(self._crudos, self._monedas)
+
+    def _ponderar(self, crudos, monedas):
+        normalizados = (crudos - self._medias[monedas]) / self._desvios[monedas]
+        return (np.nan_to_num(normalizados) * np.sqrt(PESOS)).astype(np.float32)
+
+    def buscar(self, auto, cantidad=4):
+        """Ids de los autos disponibles más parecidos al dado (sin incluirlo), del más cercano al más lejano"""
+        self.actualizar()
+        with self._lock:
+            if not len(self._ids):
+                return []
+            moneda = MONEDAS.get(auto.moneda, 0)
+            vector = self._ponderar(np.array([_crudo(auto.precio, auto.anio, auto.kilometraje)]), np.array([moneda]))[0]
+            marca = self._codigos_marca.get(_clave_marca(auto.marca), -1)
+
+            distancias = ((self._matriz - vector) ** 2).sum(axis=1) + PESO_MARCA * (self._marcas != marca)
+            propia = self._posiciones.get(auto.id)
+            if propia is not None:
+                distancias[propia] = np.inf
+
+            cantidad = min(cantidad, len(distancias) - (propia is not None))
+            if cantidad <= 0:
+                return []
+            # argpartition separa los k más cercanos sin ordenar toda la matriz
+            cercanos = np.argpartition(distancias, cantidad - 1)[:cantidad]
+            cercanos = cercanos[np.argsort(distancias[cercanos], kind='stable')]
+            return self._ids[cercanos].tolist()
+
+# Índice compartido por las páginas de detalle y ficha
+indice_similares = IndiceSimilares()
+
+def autos_similares(auto, cantidad=4):
+    """Autos disponibles más parecidos al dado, con la foto principal ya cargada"""
+    ids = indice_similares.buscar(auto, cantidad)
+    if not ids:
+        return []
+    autos = {a.id: a for a in Auto.query.options(selectinload(Auto.foto_principal)).filter(Auto.id.in_(ids))}
+    return [autos[auto_id] for auto_id in ids if auto_id in autos]
+
+def sellos_similares(auto_id, cantidad=4):
+    """Versiones de las que depende la página de un auto: la suya y la de los similares que muestra"""
+    auto = db.session.get(Auto, auto_id)
+    vecinos = indice_similares.buscar(auto, cantidad) if auto else []
+    return [version_auto(auto_id)] + [version_auto(vecino) for vecino in vecinos]
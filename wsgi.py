@@ -1,7 +1,7 @@
 import os
 import threading
 import logging
-from app_final import app
+from app_final import app, arrancar
 
 # Configurar logging
 logging.basicConfig(
@@ -37,6 +37,9 @@ def run_keep_alive():
         import traceback
         logger.error(traceback.format_exc())
 
+# Preparar la base y retomar las fotos pendientes (al importar app_final no se hace)
+arrancar()
+
 # Iniciar el scheduler en un hilo separado
 try:
     scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)